@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+End-to-end crawler benchmark against local district fixtures and the stub LLM
+Run from the repo root: python -m bench.crawl_bench [run|record] ...
+
+    python -m bench.crawl_bench run --sites 3 --pages 15 --llm-latency 0.4
+    python -m bench.crawl_bench run --fixtures bench/fixtures/sites --mode main --runs 2
+    python -m bench.crawl_bench run --sites 6 --mode main --workers 3
+    python -m bench.crawl_bench record https://www.boone.kyschools.us --pages 40
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import zipfile
+import resource
+import tempfile
+import subprocess
+import threading
+from datetime import datetime
+from urllib.parse import urljoin, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'sites')
+
+SECTIONS = ['departments/finance', 'departments/transportation', 'departments/food-services',
+            'departments/technology', 'about', 'calendar', 'staff', 'athletics']
+TOPICS = [('Roof Replacement', 'Construction'), ('Network Switches', 'Technology'),
+          ('Bus Fuel Supply', 'Transportation'), ('Milk and Dairy Products', 'Food Services'),
+          ('Annual Audit Services', 'Professional Services'), ('Property Insurance', 'Insurance'),
+          ('Custodial Supplies', 'Other'), ('Student Laptops', 'Technology')]
+FILLER = ("The district serves students across elementary, middle and high schools. Families can find "
+          "calendars, menus, enrollment forms and transportation information here. Board meetings are "
+          "held monthly and are open to the public. ").split()
+
+class FixtureSiteServer(ThreadingHTTPServer):
+    """Serves one district's pages from memory: {path: (content_type, body bytes)}"""
+
+    daemon_threads = True
+
+    def __init__(self, pages, latency=0.0):
+        super().__init__(('127.0.0.1', 0), FixtureSiteHandler)
+        self.pages = pages
+        self.latency = latency
+        self.hits = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_background(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+class FixtureSiteHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits += 1
+        if server.latency:
+            time.sleep(server.latency)
+        path = urlparse(self.path).path.rstrip('/') or '/'
+        page = server.pages.get(path)
+        if page is None:
+            self.send_response(404)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', '9')
+            self.end_headers()
+            self.wfile.write(b'Not found')
+            return
+        content_type, body = page
+        # Absolute links in recorded pages point at this server
+        body = body.replace(b'{{origin}}', server.base_url.encode())
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def paragraph(rng, words=60):
+    return ' '.join(rng.choice(FILLER) for _ in range(words)).capitalize() + '.'
+
+def html_page(title, body, links):
+    nav = ''.join(f'<li><a href="{href}">{text}</a></li>' for href, text in links)
+    return (f"<!DOCTYPE html><html><head><title>{title}</title></head><body>"
+            f"<header><nav><ul>{nav}</ul></nav></header><main><h1>{title}</h1>{body}</main>"
+            f"<footer>Copyright District Schools</footer></body></html>")
+
+def pdf_bytes(lines):
+    """A minimal one-page text PDF"""
+    text = ' '.join(f"({line.replace('(', '[').replace(')', ']')}) Tj T*" for line in lines)
+    stream = f"BT /F1 11 Tf 14 TL 50 750 Td {text} ET".encode('latin-1', 'replace')
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>",
+               b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+               b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 4 0 R >> >> "
+               b"/Contents 5 0 R >>",
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+               b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def docx_bytes(lines):
+    """A minimal Word document with one paragraph per line"""
+    ns = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    body = ''.join(f'<w:p><w:r><w:t>{line}</w:t></w:r></w:p>' for line in lines)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('[Content_Types].xml', '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/'
+                         'package/2006/content-types"/>')
+        archive.writestr('word/document.xml', f'<?xml version="1.0"?><w:document xmlns:w="{ns}"><w:body>{body}'
+                         '</w:body></w:document>')
+    return buffer.getvalue()
+
+def synthesize_site(seed, pages):
+    """A deterministic district with a bids section, news and departments, about `pages` pages"""
+    rng = random.Random(seed)
+    site = {}
+    bids = max(1, pages // 5)
+    news = max(1, pages // 4)
+    nav = [('/', 'Home'), ('/bids', 'Bids & RFPs'), ('/news', 'News'), ('/board', 'Board')]
+    nav += [(f"/{section}", section.split('/')[-1].replace('-', ' ').title()) for section in SECTIONS]
+
+    def add(path, title, body, links):
+        site[path] = ('text/html; charset=utf-8', html_page(title, body, links).encode())
+
+    bid_links = []
+    for i in range(bids):
+        topic, _ = TOPICS[(seed + i) % len(TOPICS)]
+        path = f"/bids/rfp-{seed}-{i}"
+        bid_links.append((path, f"RFP: {topic}"))
+        deadline = f"{rng.choice(['January', 'March', 'May', 'September'])} {rng.randint(1, 28)}, 2027"
+        # The specification itself is a linked PDF, as on most district bid pages
+        spec = f"/files/rfp-{seed}-{i}-specifications.pdf"
+        site[spec] = ('application/pdf', pdf_bytes([
+            f"REQUEST FOR PROPOSALS: {topic.upper()}", "Scope of work and specifications.",
+            f"Sealed proposals are due {deadline} at 2:00 PM.", f"Contact: purchasing{seed}@district.example.org",
+            paragraph(rng, 30)]))
+        add(path, f"Request for Proposals: {topic}",
+            f"<p>The Board of Education is accepting sealed proposals for {topic.lower()}. "
+            f"Proposals are due {deadline} at 2:00 PM in the Central Office.</p>"
+            f"<p>Questions may be directed to purchasing{seed}@district.example.org or (859) 555-01{i % 100:02d}.</p>"
+            f"<p><a href=\"{spec}\">Specifications (PDF)</a></p><p>{paragraph(rng)}</p>", nav)
+    add('/bids', 'Bids and Requests for Proposals',
+        '<p>Current invitations to bid and requests for proposals.</p><ul>'
+        + ''.join(f'<li><a href="{href}">{text}</a></li>' for href, text in bid_links) + '</ul>', nav)
+
+    news_links = []
+    for i in range(news):
+        path = f"/news/story-{i}"
+        news_links.append((path, f"District news {i}"))
+        add(path, f"District News {i}", f"<p>{paragraph(rng, 120)}</p><p>{paragraph(rng, 80)}</p>", nav)
+    add('/news', 'News', '<ul>' + ''.join(f'<li><a href="{href}">{text}</a></li>'
+                                         for href, text in news_links) + '</ul>', nav)
+    add('/board', 'Board of Education',
+        f"<p>Agenda: approval of the RFP award for {TOPICS[seed % len(TOPICS)][0].lower()}. {paragraph(rng)}</p>",
+        nav)
+    form = f"/files/vendor-registration-{seed}.docx"
+    site[form] = ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', docx_bytes([
+        "Vendor Registration Form", "Company name, address and tax identification number.", paragraph(rng, 20)]))
+    # The first specification again under another name: read once, thanks to the content hash
+    site['/files/current-bid.pdf'] = site[f"/files/rfp-{seed}-0-specifications.pdf"]
+    add('/purchasing', 'Purchasing', f"<p>Vendors can find open solicitations on the <a href=\"/bids\">bids page</a>. "
+        f"<a href=\"{form}\">Vendor registration form</a>, <a href=\"/files/current-bid.pdf\">current bid</a>. "
+        f"{paragraph(rng, 60)}</p>", nav)
+    for section in SECTIONS:
+        add(f"/{section}", section.split('/')[-1].replace('-', ' ').title(), f"<p>{paragraph(rng, 90)}</p>", nav)
+    add('/', 'District Schools', f"<p>Welcome to the district. {paragraph(rng, 80)}</p>", nav)
+
+    site['/robots.txt'] = ('text/plain', b"User-agent: *\nDisallow: /staff\n")
+    return site
+
+def load_recorded_site(directory):
+    """Pages of a site written by `record`"""
+    with open(os.path.join(directory, 'manifest.json'), 'r') as f:
+        manifest = json.load(f)
+    site = {}
+    for path, entry in manifest['pages'].items():
+        with open(os.path.join(directory, entry['file']), 'rb') as f:
+            site[path] = (entry['content_type'], f.read())
+    return site
+
+def record_site(start_url, directory, max_pages=40):
+    """Save up to max_pages same-host HTML pages (plus robots.txt) as a replayable fixture"""
+    import requests
+    from crawler.extraction import parse_links
+    from crawler.crawl_with_playwright import USER_AGENT
+
+    host = urlparse(start_url).netloc.lower()
+    origin_pattern = re.compile(r'https?://(?:www\.)?' + re.escape(host.removeprefix('www.')), re.IGNORECASE)
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    os.makedirs(directory, exist_ok=True)
+
+    manifest = {'origin': start_url, 'recorded_at': datetime.now().isoformat(), 'pages': {}}
+    queue, seen = [start_url], {start_url}
+    while queue and len(manifest['pages']) < max_pages:
+        url = queue.pop(0)
+        try:
+            response = session.get(url, timeout=30)
+        except requests.RequestException as e:
+            print(f"  skip {url}: {e}")
+            continue
+        content_type = response.headers.get('Content-Type', 'text/html')
+        if response.status_code != 200 or 'html' not in content_type.lower():
+            continue
+        path = urlparse(response.url).path.rstrip('/') or '/'
+        name = hashlib.sha1(path.encode()).hexdigest()[:16] + '.html'
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(origin_pattern.sub('{{origin}}', response.text).encode('utf-8'))
+        manifest['pages'][path] = {'file': name, 'content_type': content_type}
+        print(f"  {path}")
+        for href, _ in parse_links(response.text):
+            link = urljoin(response.url, href).split('#', 1)[0]
+            if urlparse(link).netloc.lower() in (host, f"www.{host}", host.removeprefix('www.')) and link not in seen:
+                seen.add(link)
+                queue.append(link)
+
+    robots = session.get(urljoin(start_url, '/robots.txt'), timeout=30)
+    if robots.status_code == 200:
+        with open(os.path.join(directory, 'robots.txt'), 'wb') as f:
+            f.write(robots.content)
+        manifest['pages']['/robots.txt'] = {'file': 'robots.txt', 'content_type': 'text/plain'}
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return len(manifest['pages'])
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def page_latency(result):
+    """Seconds a page spent being fetched, extracted and classified (politeness waits excluded)"""
+    timings = result.get('timings') or {}
+    return sum(seconds for stage, seconds in timings.items() if stage != 'delay')
+
+def peak_rss_mb():
+    """(this process, largest child e.g. Chromium) peak resident set in MB"""
+    scale = 1024 if sys.platform != 'darwin' else 1024 * 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+def run_shard_workers(workers, run_label, verbose=False):
+    """main_crawler.py in `workers` processes sharing one SHARD_MODE run"""
+    env = dict(os.environ, SHARD_MODE='true', SHARD_RUN_ID=run_label)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = None if verbose else subprocess.DEVNULL
+    processes = [subprocess.Popen([sys.executable, 'main_crawler.py'], cwd=root, stdout=output, stderr=output,
+                                  env=dict(env, SHARD_WORKER_ID=f"bench-{i}"))
+                 for i in range(workers)]
+    if any(process.wait() != 0 for process in processes):
+        raise SystemExit("a shard worker failed")
+
+def crawl_sites(mode, start_urls, max_depth, max_pages, shared_dir, workers=1, run_label='bench', verbose=False):
+    """Run the crawler the way production does; returns every page result"""
+    if mode == 'main':
+        import main_crawler
+        os.environ['SCHOOL_DISTRICTS'] = ','.join(start_urls)
+        os.environ['CRAWLER_MAX_DEPTH'] = str(max_depth)
+        os.environ['CRAWLER_MAX_PAGES'] = str(max_pages)
+        if workers > 1:
+            run_shard_workers(workers, run_label, verbose)
+        elif main_crawler.main() != 0:
+            raise SystemExit("main_crawler.main() failed")
+        with open(os.path.join(shared_dir, 'rfp_scan_results.json'), 'r') as f:
+            return json.load(f)['raw_results']
+
+    from crawler.crawl_with_playwright import crawl_site_with_playwright
+    results = []
+    for start_url in start_urls:
+        results.extend(crawl_site_with_playwright(start_url, max_depth, max_pages))
+    return results
+
+def summarize(results, seconds, stub, servers):
+    from crawler.records import count_rfps
+
+    latencies = [page_latency(result) for result in results if result.get('timings')]
+    stages = {}
+    for result in results:
+        for stage, value in (result.get('timings') or {}).items():
+            stages[stage] = stages.get(stage, 0) + value
+    rss_self, rss_children = peak_rss_mb()
+    rfps = count_rfps(results)
+    return {
+        'pages': len(results),
+        'documents': sum(1 for result in results if result.get('document')),
+        'rfps': rfps,
+        'seconds': round(seconds, 2),
+        'pages_per_sec': round(len(results) / seconds, 2) if seconds else None,
+        'p50_page_s': round(percentile(latencies, 0.5), 3) if latencies else None,
+        'p95_page_s': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'api_calls': stub.calls,
+        'api_requests': stub.requests,
+        'api_tokens': dict(stub.tokens),
+        'http_requests': sum(server.hits for server in servers),
+        'peak_rss_mb': rss_self,
+        'peak_child_rss_mb': rss_children,
+        'stage_seconds': {stage: round(value, 3) for stage, value in sorted(stages.items(), key=lambda i: -i[1])}
+    }
+
+def print_report(label, report):
+    print(f"\n== {label} ==")
+    print(f"pages            {report['pages']} ({report['documents']} documents, {report['rfps']} RFPs) "
+          f"in {report['seconds']}s "
+          f"-> {report['pages_per_sec']} pages/sec")
+    print(f"page latency     p50 {report['p50_page_s']}s   p95 {report['p95_page_s']}s")
+    print(f"API calls        {report['api_calls']} ({report['api_requests']} requests incl. throttled)")
+    tokens = report['api_tokens']
+    print(f"API tokens       {tokens['input_tokens']} input + {tokens['cache_read_input_tokens']} cache read + "
+          f"{tokens['cache_creation_input_tokens']} cache write, {tokens['output_tokens']} output")
+    print(f"HTTP requests    {report['http_requests']} to fixture sites")
+    print(f"peak RSS         {report['peak_rss_mb']} MB crawler, {report['peak_child_rss_mb']} MB largest child")
+    print("stage totals     " + ', '.join(f"{stage} {value}s" for stage, value in report['stage_seconds'].items()))
+
+def run(args):
+    from crawler.stub_anthropic import StubAnthropicServer
+
+    if args.fixtures:
+        directories = sorted(os.path.join(args.fixtures, name) for name in os.listdir(args.fixtures)
+                             if os.path.exists(os.path.join(args.fixtures, name, 'manifest.json')))
+        sites = [load_recorded_site(directory) for directory in directories]
+        if not sites:
+            raise SystemExit(f"No recorded sites under {args.fixtures} (see `record`)")
+    else:
+        sites = [synthesize_site(seed, args.pages) for seed in range(args.sites)]
+    servers = [FixtureSiteServer(site, args.site_latency).start_background() for site in sites]
+    stub = StubAnthropicServer(('127.0.0.1', 0), args.llm_latency, args.rate_limit_every).start_background()
+
+    # A fresh shared dir: no classification cache, crawl state or host modes from earlier runs
+    shared_dir = tempfile.mkdtemp(prefix='crawl-bench-')
+    os.environ.update({
+        'SHARED_DIR': shared_dir,
+        'ANTHROPIC_BASE_URL': stub.base_url,
+        'ANTHROPIC_API_KEY': os.getenv('ANTHROPIC_API_KEY', 'sk-ant-bench-stub'),
+        'PAGE_DELAY': str(args.page_delay),
+        'RESUME_RUNS': 'false'
+    })
+    if args.fetch_mode:
+        os.environ['FETCH_MODE'] = args.fetch_mode
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    start_urls = [server.base_url for server in servers]
+    reports = []
+    for i in range(args.runs):
+        for server in servers:
+            server.hits = 0
+        stub.calls = stub.requests = 0
+        stub.tokens = dict.fromkeys(stub.tokens, 0)
+        started = time.perf_counter()
+        results = crawl_sites(args.mode, start_urls, args.depth, args.max_pages, shared_dir,
+                              args.workers, f"bench-{os.getpid()}-{i}", args.verbose)
+        report = summarize(results, time.perf_counter() - started, stub, servers)
+        reports.append(report)
+        print_report(f"run {i + 1}/{args.runs}: {len(servers)} sites, mode={args.mode}, workers={args.workers}, "
+                     f"llm latency {args.llm_latency}s, page delay {args.page_delay}s", report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'runs': reports}, f, indent=2)
+        print(f"\nWrote {args.json}")
+    for server in servers:
+        server.shutdown()
+    stub.shutdown()
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help="crawl the fixtures and report throughput")
+    run_parser.add_argument('--mode', choices=('site', 'main'), default='site',
+                            help="crawl_site_with_playwright per site, or main_crawler.main end to end")
+    run_parser.add_argument('--fixtures', help=f"directory of recorded sites (e.g. {FIXTURES}); "
+                                               "synthetic sites otherwise")
+    run_parser.add_argument('--sites', type=int, default=3, help="synthetic sites")
+    run_parser.add_argument('--pages', type=int, default=20, help="pages per synthetic site")
+    run_parser.add_argument('--depth', type=int, default=2)
+    run_parser.add_argument('--max-pages', type=int, default=15)
+    run_parser.add_argument('--llm-latency', type=float, default=0.5, help="stub seconds per API call")
+    run_parser.add_argument('--rate-limit-every', type=int, default=0, help="stub answers every Nth call with 429")
+    run_parser.add_argument('--site-latency', type=float, default=0.02, help="fixture server seconds per request")
+    run_parser.add_argument('--page-delay', type=float, default=1.0, help="PAGE_DELAY (initial per-host delay) for the run")
+    run_parser.add_argument('--fetch-mode', choices=('auto', 'http', 'browser'))
+    run_parser.add_argument('--workers', type=int, default=1,
+                            help="with --mode main: crawler processes sharing one SHARD_MODE run")
+    run_parser.add_argument('--runs', type=int, default=1, help="repeat in the same process (warm caches)")
+    run_parser.add_argument('--json', help="also write the reports here")
+    run_parser.add_argument('--verbose', action='store_true', help="keep crawler logging")
+
+    record_parser = commands.add_parser('record', help="save a live district as a fixture")
+    record_parser.add_argument('url')
+    record_parser.add_argument('--pages', type=int, default=40)
+    record_parser.add_argument('--out', help=f"fixture directory (default {FIXTURES}/<host>)")
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        directory = args.out or os.path.join(FIXTURES, urlparse(args.url).netloc.lower())
+        count = record_site(args.url, directory, args.pages)
+        print(f"Recorded {count} files to {directory}")
+        return 0
+    if args.command == 'run':
+        return run(args)
+    parser.print_help()
+    return 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
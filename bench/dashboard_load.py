@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Load test for the dashboard's read endpoints, uncached vs cached
+Run from the repo root: python -m bench.dashboard_load [--rfps 2000] [--seconds 3] [--threads 4]
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import http.client
+from werkzeug.serving import make_server
+
+ENDPOINTS = ('/api/status', '/api/data', '/')
+
+def write_fixture(shared_dir, rfp_count):
+    """A dashboard_summary.json the size of a busy run"""
+    random.seed(1)
+    categories = ['Technology', 'Construction', 'Transportation', 'Food Services', 'Professional Services', 'Other']
+    rfps = [{
+        'url': f"https://district{i % 40}.example.org/purchasing/rfp-{i}",
+        'title': f"RFP {i}: {random.choice(['Roof replacement', 'Network switches', 'Bus fuel', 'Audit services'])}",
+        'summary': "Sealed proposals are requested for services described in the attached specifications. " * 3,
+        'category': random.choice(categories),
+        'confidence': random.choice(['High', 'Medium', 'Low']),
+        'deadline': f"November {i % 28 + 1}, 2026",
+        'contact_email': f"purchasing{i % 40}@example.org",
+        'contact_phone': '(859) 555-0100',
+        'budget_range': '',
+        'submission_location': 'Central Office',
+        'crawl_time': '2026-10-18T09:00:00',
+        'depth': 1,
+        'method': 'http'
+    } for i in range(rfp_count)]
+    counts = {}
+    for rfp in rfps:
+        counts[rfp['category']] = counts.get(rfp['category'], 0) + 1
+    with open(os.path.join(shared_dir, 'dashboard_summary.json'), 'w') as f:
+        json.dump({'timestamp': '2026-10-18T09:00:00', 'total_rfps': rfp_count, 'total_pages': rfp_count * 5,
+                   'categories': counts, 'active_rfps': rfps}, f, indent=2)
+
+def hammer(port, path, seconds, threads, conditional=False):
+    """Requests/sec from `threads` keep-alive clients for `seconds`"""
+    counts = [0] * threads
+    statuses = {}
+    deadline = time.perf_counter() + seconds
+
+    def client(slot):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        headers = {}
+        if conditional:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            headers = {'If-None-Match': response.getheader('ETag', '')}
+        while time.perf_counter() < deadline:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            counts[slot] += 1
+        conn.close()
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / seconds, statuses
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rfps', type=int, default=2000)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    shared_dir = tempfile.mkdtemp(prefix='dashboard-load-')
+    write_fixture(shared_dir, args.rfps)
+    os.environ['SHARED_DIR'] = shared_dir
+    os.environ['RFP_INDEX_PATH'] = os.path.join(shared_dir, 'rfp_index.db')
+    logging.disable(logging.INFO)
+    from dashboard import app as dashboard_app
+
+    server = make_server('127.0.0.1', 0, dashboard_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+
+    print(f"{args.rfps} RFPs, {args.threads} client threads, {args.seconds}s per case\n")
+    print(f"{'endpoint':<14} {'uncached':>12} {'cached':>12} {'cached 304':>12}")
+    for path in ENDPOINTS:
+        dashboard_app.loader.enabled = False
+        before, _ = hammer(port, path, args.seconds, args.threads)
+        dashboard_app.loader.enabled = True
+        after, _ = hammer(port, path, args.seconds, args.threads)
+        revalidated, statuses = hammer(port, path, args.seconds, args.threads, conditional=True)
+        print(f"{path:<14} {before:>10.0f}/s {after:>10.0f}/s {revalidated:>10.0f}/s"
+              + ('' if set(statuses) == {304} else f"  (statuses {statuses})"))
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the HTML-to-text extractors on saved fixture pages
+Run from the repo root: python -m bench.extract_bench [--repeat 50] [--browser]
+"""
+
+import os
+import glob
+import time
+import argparse
+import statistics
+
+from crawler.extraction import Bs4Extractor, BrowserExtractor, LxmlExtractor, lxml_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'pages')
+
+def load_fixtures(directory=FIXTURES):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+def time_call(func, repeat):
+    """Median milliseconds and the last output"""
+    timings = []
+    output = ''
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), output
+
+def html_extractors():
+    extractors = [('bs4 html.parser (legacy)', Bs4Extractor(), False)]
+    if lxml_html is not None:
+        extractors.append(('lxml full page', LxmlExtractor(), False))
+        extractors.append(('lxml main content', LxmlExtractor(), True))
+    return extractors
+
+def browser_rows(pages, repeat):
+    """innerText timings, including the page.content() round-trip it replaces"""
+    from playwright.sync_api import sync_playwright
+
+    rows = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        for name, html in pages.items():
+            page.set_content(html)
+            ms, text = time_call(lambda: BrowserExtractor().from_page(page), repeat)
+            rows.append((name, 'browser innerText', ms, len(text), text))
+            ms, text = time_call(lambda: LxmlExtractor().from_html(page.content()), repeat)
+            rows.append((name, 'page.content() + lxml', ms, len(text), text))
+        browser.close()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--browser', action='store_true', help="also time in-browser innerText (needs Chromium)")
+    parser.add_argument('--show', type=int, default=0, help="print the first N characters of each output")
+    args = parser.parse_args()
+
+    pages = load_fixtures()
+    rows = []
+    for name, html in pages.items():
+        for label, extractor, main_content in html_extractors():
+            ms, text = time_call(lambda: extractor.from_html(html, main_content), args.repeat)
+            rows.append((name, label, ms, len(text), text))
+    if args.browser:
+        rows.extend(browser_rows(pages, args.repeat))
+
+    print(f"{'fixture':<28} {'extractor':<26} {'median ms':>10} {'chars':>7}")
+    for name, label, ms, chars, text in rows:
+        print(f"{name:<28} {label:<26} {ms:>10.2f} {chars:>7}")
+        if args.show:
+            print(f"    {text[:args.show]!r}")
+
+    totals = {}
+    for _, label, ms, _, _ in rows:
+        totals[label] = totals.get(label, 0) + ms
+    baseline = totals.get('bs4 html.parser (legacy)')
+    print()
+    for label, total in totals.items():
+        speedup = f"{baseline / total:.1f}x" if baseline and total else ''
+        print(f"{label:<26} {total:>8.2f} ms total {speedup:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Asyncio-based Playwright crawler for school district websites
+One long-lived browser, a pool of reusable pages, N navigations in flight
+"""
+
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+from crawler.crawl_with_playwright import (
+    BROWSER_ARGS,
+    LINKS_SCRIPT,
+    USER_AGENT,
+    extract_clean_text,
+    get_anthropic_client,
+    get_school_priority_urls,
+    is_error_result,
+    log_classification,
+    page_order,
+    queue_documents,
+    track_result
+)
+from crawler.crawl_state import carried_forward, get_crawl_state
+from crawler.fetcher import get_fetcher, parse_static_page
+from crawler.frontier import Frontier, push_links
+from crawler.discovery import discover_if_enabled, seed_frontier
+from crawler.documents import SiteDocuments, get_document_stage
+from crawler.prefilter import screen_page
+from crawler.extraction import MIN_CONTENT_CHARS, extract_page_text_async
+from crawler.metrics import get_metrics
+from crawler.politeness import get_scheduler
+from crawler.resilience import Budget, CircuitOpenError, get_breakers, get_resilience_settings, navigate_async
+from crawler.browser_config import (
+    RUN_TOTALS,
+    ResourceBlockStats,
+    get_browser_settings,
+    launch_args,
+    new_lean_context_async
+)
+from crawler.classifier import ClassificationPipeline
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def get_settle_timeout():
+    """Max time (ms) to wait for the network to go idle after DOM load"""
+    return int(os.getenv('PAGE_SETTLE_TIMEOUT', '3000'))
+
+def get_navigation_timeout():
+    """Navigation timeout in ms (NAVIGATION_TIMEOUT is in seconds)"""
+    return int(os.getenv('NAVIGATION_TIMEOUT', '60')) * 1000
+
+class PagePool:
+    """A single Chromium instance handing out reusable pages
+
+    With DISABLE_JAVASCRIPT_WHEN_POSSIBLE, a second set of pages from
+    JavaScript-free contexts serves hosts not known to need rendering.
+    """
+
+    def __init__(self, size):
+        self.size = max(1, size)
+        self.settings = get_browser_settings()
+        self.stats = ResourceBlockStats()
+        self._playwright = None
+        self._browser = None
+        self._contexts = []
+        self._pages = {True: asyncio.Queue()}
+        if self.settings['disable_javascript']:
+            self._pages[False] = asyncio.Queue()
+
+    async def start(self):
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=self.settings['headless'],
+            args=launch_args(BROWSER_ARGS, self.settings)
+        )
+
+        for javascript, pages in self._pages.items():
+            for _ in range(self.size):
+                context = await new_lean_context_async(self._browser, USER_AGENT, self.stats, self.settings,
+                                                       javascript)
+                context.set_default_timeout(45000)
+                context.set_default_navigation_timeout(get_navigation_timeout())
+                self._contexts.append(context)
+                pages.put_nowait(await context.new_page())
+
+        logger.info(f"✅ Browser pool started with {self.size} pages")
+        return self
+
+    async def close(self):
+        for context in self._contexts:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.warning(f"Error closing browser context: {e}")
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+        self.stats.log_summary("Resource blocking")
+        RUN_TOTALS.merge(self.stats)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @asynccontextmanager
+    async def page(self, javascript=True):
+        """Borrow a page for one navigation; it is returned to the pool afterwards"""
+        pages = self._pages.get(javascript, self._pages[True])
+        page = await pages.get()
+        try:
+            yield page
+        finally:
+            pages.put_nowait(page)
+
+async def fetch_page(page, url, timer=None, budget=None):
+    """Navigate and return (response, title, clean_text, links) without fixed sleeps
+
+    Transient navigation failures are retried with jittered backoff inside the page budget.
+    """
+    timer = timer or get_metrics().page(url)
+    budget = budget or Budget(get_resilience_settings()['page_budget'], label='page budget')
+
+    async def goto(wait_until, timeout):
+        return await page.goto(url, wait_until=wait_until, timeout=timeout)
+
+    with timer.span('navigate'):
+        response = await navigate_async(goto, url, budget)
+    with timer.span('render_wait'):
+        try:
+            # Give dynamic content a bounded chance to settle instead of a fixed wait
+            settle = min(get_settle_timeout(), max(0, int(budget.remaining() * 1000)))
+            await page.wait_for_load_state("networkidle", timeout=settle)
+        except PlaywrightTimeoutError:
+            pass
+
+    with timer.span('extract'):
+        title = await page.title()
+        clean_text = await extract_page_text_async(page)
+        links = await page.eval_on_selector_all("a[href]", LINKS_SCRIPT)
+    return response, title, clean_text, links
+
+async def crawl_site_async(pool, classifier, start_url, max_depth=2, max_pages=20, per_site=2, on_result=None,
+                           on_stopped=None):
+    """Crawl one district best-first using pages borrowed from a shared pool
+
+    on_stopped(reason) is called if the district is abandoned early (time
+    budget spent, host breaker open).
+    """
+    results = []
+    pending = []
+    fresh = []
+    state = get_crawl_state(user_agent=USER_AGENT)
+    fetcher = get_fetcher(user_agent=USER_AGENT)
+
+    # robots.txt and sitemaps seed the frontier and set a per-site crawl delay
+    discovery = await asyncio.to_thread(discover_if_enabled, fetcher.session, start_url, USER_AGENT)
+    frontier = Frontier(start_url, allowed=discovery.allowed if discovery else None)
+    frontier.push(start_url, 0, hint=True)
+    scheduler = get_scheduler()
+    if discovery:
+        seed_frontier(frontier, discovery)
+        scheduler.set_crawl_delay(start_url, discovery.crawl_delay)
+    in_flight = 0
+    changed = asyncio.Condition()
+
+    # A slow or failing district gives up its remaining pages instead of stalling the run
+    resilience = get_resilience_settings()
+    district_budget = Budget(resilience['district_budget'], label='district budget')
+    breakers = get_breakers()
+    stopped = None
+
+    # Linked PDFs/DOCX are downloaded and read in the background, then classified like pages
+    stage = get_document_stage(fetcher.session)
+    documents = SiteDocuments(stage, allowed=frontier.allowed) if stage else None
+    document_results = []
+
+    def take_documents(finished):
+        for result, future in queue_documents(finished, classifier, on_result, len(document_results)):
+            document_results.append(result)
+            pending.append((result, asyncio.wrap_future(future)))
+
+    def grow_frontier(url, links, depth):
+        # Priority paths are only hints from the home page
+        if depth < max_depth:
+            if depth == 0:
+                for priority_url in get_school_priority_urls(start_url):
+                    frontier.push(priority_url, depth + 1, hint=True)
+            push_links(frontier, links, url, depth + 1)
+        # Documents are leaves, so they are read even from pages at the depth limit
+        if documents:
+            documents.push_links(links, url, depth)
+            take_documents(documents.ready())
+
+    async def crawl_one(url, depth):
+        logger.info(f"[Depth {depth}] Crawling: {url}")
+
+        # Cheap plain-HTTP fetch first; a pooled browser page only when it's needed.
+        # Waiting for this host's politeness slot leaves other sites' workers running
+        timer = get_metrics().page(url)
+        breakers.host(url).check()
+        page_budget = Budget(resilience['page_budget'], district_budget, 'page budget')
+        async with scheduler.slot_async(url, timer) as slot:
+            # Incremental mode: a conditional GET spots pages unchanged since the last run,
+            # and a changed page's response is used as its HTTP fetch
+            entry, response = None, None
+            if state:
+                with timer.span('http_fetch'):
+                    entry, response = await asyncio.to_thread(state.conditional_get, url, fetcher.session,
+                                                              fetcher.settings['timeout'])
+                if response is not None:
+                    slot.record(response.status_code, response.headers)
+            if not entry:
+                fetched = await asyncio.to_thread(fetcher.try_static, url, extract_clean_text, timer, response)
+                if fetched:
+                    static, clean_text = fetched
+                    slot.record(static.status, static.headers)
+                    with timer.span('extract'):
+                        title, links = parse_static_page(static.html)
+                    headers, body, method = static.headers, static.body, "http"
+                else:
+                    fetcher.count('browser')
+                    # Hosts not known to need JS can render without it (DISABLE_JAVASCRIPT_WHEN_POSSIBLE)
+                    async with pool.page(javascript=fetcher.needs_javascript(url)) as page:
+                        response, title, clean_text, links = await fetch_page(page, url, timer, page_budget)
+                        headers = response.headers if response is not None else {}
+                        if response is not None:
+                            slot.record(response.status, headers)
+                        body = await response.body() if state and response is not None else None
+                    method = "playwright-async"
+        breakers.record(url)
+
+        if entry:
+            logger.info("  ♻️ Unchanged since last run, reusing previous result")
+            results.append(carried_forward(entry))
+            state.touch(url)
+            if on_result:
+                on_result(results[-1], page_order(len(results) - 1))
+            grow_frontier(url, entry.get('links', []), depth)
+            return
+
+        if len(clean_text) < MIN_CONTENT_CHARS:
+            logger.info(f"  ⚠️ Skipping {url} - insufficient content")
+            # A bare list of bid files still links the documents themselves
+            if documents:
+                documents.push_links(links, url, depth)
+            return
+
+        logger.info(f"  ✅ Extracted {len(clean_text)} characters from: {title}")
+        grow_frontier(url, links, depth)
+
+        # Classification runs in the pipeline while this worker moves on (its place was reserved in worker())
+        result = {
+            "url": url,
+            "title": title,
+            "depth": depth,
+            "content_length": len(clean_text),
+            "claude_result": None,
+            "crawl_timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "method": method
+        }
+        verdict = screen_page(clean_text, url)
+        if verdict:
+            result["prefilter"] = verdict.as_dict()
+        results.append(result)
+        future = classifier.submit(clean_text, url, verdict)
+        future = track_result(result, future, timer, on_result, page_order(len(results) - 1))
+        pending.append((result, asyncio.wrap_future(future)))
+        if body is not None:
+            fresh.append((url, result, links, headers, body))
+
+    async def worker():
+        nonlocal in_flight, stopped
+        while True:
+            async with changed:
+                # In-flight pages count against max_pages, so nothing is fetched only to be dropped.
+                # Wait while they may still add links or, if one turns out empty, free its place
+                while in_flight and not stopped and (not frontier or len(results) + in_flight >= max_pages):
+                    await changed.wait()
+                if not stopped and district_budget.expired:
+                    stopped = f"time budget of {resilience['district_budget']:g}s spent"
+                if stopped or not frontier or len(results) + in_flight >= max_pages:
+                    changed.notify_all()
+                    return
+                url, depth = frontier.pop()
+                in_flight += 1
+            try:
+                await crawl_one(url, depth)
+            except CircuitOpenError as e:
+                stopped = str(e)
+            except Exception as e:
+                breakers.record(url, e)
+                logger.error(f"  ❌ Error crawling {url}: {e}")
+            finally:
+                async with changed:
+                    in_flight -= 1
+                    changed.notify_all()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, per_site))))
+    if stopped:
+        logger.warning(f"⏱️ Stopped crawling {start_url} early ({stopped}) with {len(results)} pages "
+                       f"and {len(frontier)} still queued")
+        if on_stopped:
+            on_stopped(stopped)
+
+    if documents:
+        take_documents(await asyncio.to_thread(documents.drain))
+    for result, future in pending:
+        result['claude_result'] = await future
+        log_classification(result['claude_result'])
+    logger.info(f"  ↪ Claude analysis complete for {len(pending)} pages")
+
+    # Remember what we fetched so the next run can skip unchanged pages
+    if state:
+        for url, result, links, headers, body in fresh:
+            if not is_error_result(result['claude_result']):
+                state.record(url, result, links, headers, body)
+        await asyncio.to_thread(state.save)
+    fetcher.save_modes()
+
+    results.extend(document_results)
+    logger.info(f"✅ Crawl completed for {start_url}. Found {len(results)} pages total"
+                + (f" ({len(document_results)} linked documents)" if document_results else ""))
+    return results
+
+async def crawl_sites_async(start_urls, max_depth=2, max_pages=20, concurrency=4, per_site=2,
+                            on_result=None, on_site_done=None, max_sites=None, on_stopped=None):
+    """Crawl several districts concurrently on one browser; returns {start_url: results}
+
+    At most max_sites districts (default: enough to keep the page pool busy)
+    are crawled at once, so frontiers, discovery and sitemap parsing don't
+    all start together. on_result(start_url, result, order) receives each page once
+    classified and on_site_done(start_url, results) each district as it finishes;
+    on_stopped(start_url, reason) comes first for a district abandoned early.
+    """
+    max_sites = max_sites or max(1, concurrency // max(1, per_site))
+    sites = asyncio.Semaphore(max_sites)
+    logger.info(f"⚙️ Crawling up to {max_sites} district(s) at once, {per_site} page(s) each")
+
+    async def crawl_site(pool, classifier, url):
+        sink = (lambda result, order: on_result(url, result, order)) if on_result else None
+        stop_sink = (lambda reason: on_stopped(url, reason)) if on_stopped else None
+        async with sites:
+            try:
+                results = await crawl_site_async(pool, classifier, url, max_depth, max_pages, per_site, sink,
+                                                 stop_sink)
+            except Exception as e:
+                logger.error(f"❌ Error crawling {url}: {e}")
+                results = []
+        if on_site_done:
+            on_site_done(url, results)
+        return results
+
+    with ClassificationPipeline() as classifier:
+        async with PagePool(concurrency) as pool:
+            site_results = await asyncio.gather(
+                *(crawl_site(pool, classifier, url) for url in start_urls),
+                return_exceptions=True
+            )
+
+    results_by_site = {}
+    for url, results in zip(start_urls, site_results):
+        if isinstance(results, Exception):
+            logger.error(f"❌ Error crawling {url}: {results}")
+            results = []
+        results_by_site[url] = results
+    return results_by_site
+
+def crawl_sites_with_async_engine(start_urls, max_depth=2, max_pages=20, concurrency=4,
+                                  on_result=None, on_site_done=None, on_stopped=None):
+    """Synchronous entry point for the async engine"""
+    # Test Anthropic client first
+    try:
+        get_anthropic_client()
+        logger.info("✅ Anthropic client test successful")
+    except Exception as e:
+        logger.error(f"❌ Anthropic client test failed: {e}")
+        return {url: [] for url in start_urls}
+
+    per_site = int(os.getenv('ASYNC_PAGES_PER_SITE', '2'))
+    max_sites = int(os.getenv('ASYNC_MAX_SITES', '0')) or None
+    return asyncio.run(crawl_sites_async(start_urls, max_depth, max_pages, concurrency, per_site,
+                                         on_result, on_site_done, max_sites, on_stopped))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Lean Playwright browser contexts and resource blocking
+Applies the BROWSER_* / DISABLE_IMAGES / ENABLE_BROWSER_CACHE settings and
+aborts images, fonts, media and third-party trackers during navigation
+"""
+
+import os
+import logging
+import threading
+from urllib.parse import urlparse
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Analytics / ad / tracking hosts whose beacons keep networkidle from settling
+TRACKER_DOMAINS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googleadservices.com',
+    'doubleclick.net',
+    'googlesyndication.com',
+    'facebook.net',
+    'facebook.com/tr',
+    'connect.facebook.net',
+    'hotjar.com',
+    'segment.io',
+    'segment.com',
+    'mixpanel.com',
+    'newrelic.com',
+    'nr-data.net',
+    'clarity.ms',
+    'quantserve.com',
+    'scorecardresearch.com',
+    'addthis.com',
+    'sharethis.com',
+    'twitter.com/i/adsct',
+    'analytics.twitter.com',
+    'linkedin.com/px',
+    'bat.bing.com',
+)
+
+# Rough average transfer sizes, used to estimate what blocking saved (responses
+# that were never fetched can't be measured)
+ESTIMATED_BYTES = {
+    'image': 60_000,
+    'font': 40_000,
+    'media': 500_000,
+    'tracker': 30_000,
+}
+
+def env_flag(name, default):
+    return os.getenv(name, default).lower() == 'true'
+
+def get_browser_settings():
+    """Browser settings declared in render.yaml"""
+    settings = {
+        'headless': env_flag('BROWSER_HEADLESS', 'true'),
+        'viewport': {
+            'width': int(os.getenv('BROWSER_VIEWPORT_WIDTH', '1920')),
+            'height': int(os.getenv('BROWSER_VIEWPORT_HEIGHT', '1080'))
+        },
+        'disable_images': env_flag('DISABLE_IMAGES', 'true'),
+        'block_resources': env_flag('BLOCK_HEAVY_RESOURCES', 'true'),
+        'enable_cache': env_flag('ENABLE_BROWSER_CACHE', 'false'),
+        'disable_javascript': env_flag('DISABLE_JAVASCRIPT_WHEN_POSSIBLE', 'false')
+    }
+    if settings['enable_cache'] and settings['block_resources']:
+        warn_cache_disabled()
+    return settings
+
+_warned_cache = False
+
+def warn_cache_disabled():
+    """Blocking trackers and media needs route interception, which turns Chromium's HTTP cache off"""
+    global _warned_cache
+    if not _warned_cache:
+        _warned_cache = True
+        logger.warning("⚠️ ENABLE_BROWSER_CACHE has no effect while BLOCK_HEAVY_RESOURCES=true: "
+                       "blocking trackers and media disables the browser cache")
+
+def is_tracker(url):
+    parsed = urlparse(url)
+    target = f"{parsed.netloc.lower()}{parsed.path}"
+    return any(domain in target for domain in TRACKER_DOMAINS)
+
+def blocked_kind(resource_type, url, settings):
+    """Why a request should be aborted, or None to let it through"""
+    if resource_type == 'image' and settings['disable_images']:
+        return 'image'
+    if settings['block_resources']:
+        if resource_type in ('font', 'media'):
+            return resource_type
+        if is_tracker(url):
+            return 'tracker'
+    return None
+
+def routing_needed(settings):
+    """Whether to intercept requests; route interception disables Chromium's HTTP cache
+
+    Trackers and media can only be blocked by routing, so BLOCK_HEAVY_RESOURCES
+    wins over ENABLE_BROWSER_CACHE. Images alone don't need it with the cache
+    on: launch_args switches them off at the renderer.
+    """
+    if settings['block_resources']:
+        return True
+    return settings['disable_images'] and not settings['enable_cache']
+
+def launch_args(base_args, settings=None):
+    """Chromium flags; images are also switched off at the renderer so it holds with caching on"""
+    settings = settings or get_browser_settings()
+    args = list(base_args)
+    if settings['disable_images']:
+        args.append('--blink-settings=imagesEnabled=false')
+    return args
+
+class ResourceBlockStats:
+    """Requests aborted during a crawl and an estimate of the bytes that saved (from ESTIMATED_BYTES)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.blocked = {}
+        self.allowed = 0
+
+    def record(self, kind):
+        with self._lock:
+            if kind:
+                self.blocked[kind] = self.blocked.get(kind, 0) + 1
+            else:
+                self.allowed += 1
+
+    @property
+    def requests_saved(self):
+        return sum(self.blocked.values())
+
+    @property
+    def estimated_bytes_saved(self):
+        return sum(ESTIMATED_BYTES.get(kind, 0) * count for kind, count in self.blocked.items())
+
+    def merge(self, other):
+        with self._lock:
+            for kind, count in other.blocked.items():
+                self.blocked[kind] = self.blocked.get(kind, 0) + count
+            self.allowed += other.allowed
+
+    def as_dict(self):
+        return {
+            'requests_blocked': self.requests_saved,
+            'requests_allowed': self.allowed,
+            'blocked_by_type': dict(self.blocked),
+            'estimated_bytes_saved': self.estimated_bytes_saved
+        }
+
+    def log_summary(self, label):
+        if self.requests_saved:
+            logger.info(f"  🚫 {label}: blocked {self.requests_saved} requests "
+                        f"(~{self.estimated_bytes_saved / 1_000_000:.1f} MB saved, estimated) {self.blocked}")
+
+# Totals across every crawl in this process, for the run summary
+RUN_TOTALS = ResourceBlockStats()
+
+def context_options(settings, user_agent, javascript=True):
+    """Keyword arguments for browser.new_context()"""
+    return {
+        'user_agent': user_agent,
+        'viewport': settings['viewport'],
+        'java_script_enabled': javascript,
+        'service_workers': 'block',
+    }
+
+def make_route_handler(settings, stats):
+    """Sync route handler aborting blocked resource types"""
+    def handle(route):
+        request = route.request
+        kind = blocked_kind(request.resource_type, request.url, settings)
+        stats.record(kind)
+        if kind:
+            route.abort()
+        else:
+            route.continue_()
+    return handle
+
+def make_async_route_handler(settings, stats):
+    """Async route handler aborting blocked resource types"""
+    async def handle(route):
+        request = route.request
+        kind = blocked_kind(request.resource_type, request.url, settings)
+        stats.record(kind)
+        if kind:
+            await route.abort()
+        else:
+            await route.continue_()
+    return handle
+
+def new_lean_context(browser, user_agent, stats, settings=None, javascript=True):
+    """Sync: a browser context with the configured viewport and resource blocking"""
+    settings = settings or get_browser_settings()
+    context = browser.new_context(**context_options(settings, user_agent, javascript))
+    if routing_needed(settings):
+        context.route("**/*", make_route_handler(settings, stats))
+    return context
+
+async def new_lean_context_async(browser, user_agent, stats, settings=None, javascript=True):
+    """Async: a browser context with the configured viewport and resource blocking"""
+    settings = settings or get_browser_settings()
+    context = await browser.new_context(**context_options(settings, user_agent, javascript))
+    if routing_needed(settings):
+        await context.route("**/*", make_async_route_handler(settings, stats))
+    return context
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Persistent content-hash cache for Claude classifications
+Unchanged pages reuse their stored claude_result instead of calling the API
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WHITESPACE = re.compile(r'\s+')
+
+def get_cache_settings():
+    """Cache location and eviction limits"""
+    shared_dir = os.getenv('SHARED_DIR', '/opt/render/project/src/shared')
+    return {
+        'enabled': os.getenv('CLASSIFY_CACHE', 'true').lower() == 'true',
+        'path': os.getenv('CLASSIFY_CACHE_PATH', os.path.join(shared_dir, 'classification_cache.db')),
+        'max_entries': int(os.getenv('CLASSIFY_CACHE_MAX_ENTRIES', '20000')),
+        'max_age_days': float(os.getenv('CLASSIFY_CACHE_MAX_AGE_DAYS', '30'))
+    }
+
+def normalize_text(text):
+    """Collapse whitespace and case so cosmetic changes still hit the cache"""
+    return WHITESPACE.sub(' ', text).strip().lower()
+
+def cache_key(text, prompt_version, model):
+    """Hash of normalized page text, prompt version and model"""
+    digest = hashlib.sha256()
+    for part in (prompt_version, model, normalize_text(text)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class ClassificationCache:
+    """SQLite-backed claude_result cache with size and age eviction"""
+
+    def __init__(self, path, max_entries=20000, max_age_days=30):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evicted': 0}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS classifications (
+                key TEXT PRIMARY KEY,
+                claude_result TEXT NOT NULL,
+                url TEXT,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_classifications_last_used ON classifications(last_used)")
+        self._conn.commit()
+        self.evict()
+
+    def get(self, key):
+        """Return the cached claude_result for key, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT claude_result, created_at FROM classifications WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute("UPDATE classifications SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats['hits'] += 1
+            return row[0]
+
+    def put(self, key, claude_result, url=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classifications (key, claude_result, url, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, claude_result, url, now, now)
+            )
+            self._conn.commit()
+            self.stats['stores'] += 1
+
+    def evict(self):
+        """Drop entries past max age, then the least recently used beyond max_entries"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM classifications WHERE created_at < ?", (time.time() - self.max_age,)
+            )
+            evicted = cursor.rowcount
+            cursor = self._conn.execute("""
+                DELETE FROM classifications WHERE key IN (
+                    SELECT key FROM classifications ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            evicted += cursor.rowcount
+            self._conn.commit()
+            self.stats['evicted'] += evicted
+        if evicted:
+            logger.info(f"🧹 Evicted {evicted} cached classifications")
+        return evicted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_classification_cache():
+    """Process-wide cache, or None when CLASSIFY_CACHE=false or it can't be opened"""
+    global _cache
+    settings = get_cache_settings()
+    if not settings['enabled']:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ClassificationCache(settings['path'], settings['max_entries'], settings['max_age_days'])
+            except Exception as e:
+                logger.warning(f"⚠️ Classification cache unavailable: {e}")
+                _cache = False
+        return _cache or None
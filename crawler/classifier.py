@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Claude classification stage, decoupled from page fetching
+Pages are queued by the crawler and classified by a pool of worker threads
+"""
+
+import os
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from concurrent.futures import Future
+
+import anthropic
+
+from crawler.classification_cache import get_classification_cache
+from crawler.metrics import district_of
+from crawler.resilience import CircuitOpenError, get_breakers, get_resilience_settings
+from crawler.prompt_builder import build_batch_prompt, build_prompt
+from crawler.crawl_with_playwright import (
+    call_claude,
+    classification_cache_key,
+    error_result,
+    extract_json,
+    get_shared_client
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying after a pause
+RETRYABLE_STATUS = {429, 500, 502, 503, 529}
+
+def get_pipeline_settings():
+    """Classification stage configuration"""
+    return {
+        'workers': max(1, int(os.getenv('CLASSIFY_WORKERS', '4'))),
+        'max_in_flight': max(1, int(os.getenv('CLASSIFY_MAX_IN_FLIGHT', '4'))),
+        'batch_size': max(1, int(os.getenv('CLASSIFY_BATCH_SIZE', '1'))),
+        'batch_wait': float(os.getenv('CLASSIFY_BATCH_WAIT', '0.5')),
+        'max_retries': int(os.getenv('CLASSIFY_MAX_RETRIES', '4'))
+    }
+
+def retry_after_seconds(error):
+    """Read a Retry-After hint from an API error, if the server sent one"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+class ClassificationPipeline:
+    """Queue of pages classified concurrently with a shared client"""
+
+    def __init__(self, client=None, workers=None, max_in_flight=None, batch_size=None):
+        settings = get_pipeline_settings()
+        self.workers = workers or settings['workers']
+        self.batch_size = batch_size or settings['batch_size']
+        self.batch_wait = settings['batch_wait']
+        self.max_retries = settings['max_retries']
+        self.requeues = get_resilience_settings()['classify_requeues']
+        self.breaker = get_breakers().api
+        self._client = client
+        self._cache = get_classification_cache()
+        self._queue = queue.Queue()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight or settings['max_in_flight'])
+        self._cooldown_until = 0.0
+        self._cooldown_lock = threading.Lock()
+        self._threads = []
+        self._outstanding = 0
+        self._idle = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self.stats = {'pages': 0, 'api_calls': 0, 'rate_limited': 0, 'errors': 0, 'requeued': 0,
+                      'cache_hits': 0, 'prefiltered': 0}
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    @property
+    def client(self):
+        if self._client is None:
+            # We handle retries ourselves so the backoff is shared across workers
+            self._client = get_shared_client().with_options(max_retries=0)
+        return self._client
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"classifier-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def close(self):
+        """Finish queued work (re-queued pages included) and stop the workers"""
+        with self._idle:
+            while self._threads and self._outstanding:
+                self._idle.wait()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, content, url, verdict=None):
+        """Queue a page; the returned Future resolves to the claude_result JSON string
+
+        A pre-filter verdict that says skip is answered locally after the cache.
+        """
+        future = Future()
+        key = classification_cache_key(content)
+        if self._cache:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._count('pages')
+                self._count('cache_hits')
+                future.set_result(cached)
+                return future
+        if verdict and verdict.skip:
+            self._count('pages')
+            self._count('prefiltered')
+            future.set_result(verdict.local_result())
+            return future
+        with self._idle:
+            self._outstanding += 1
+        self._queue.put((content, url, key, future, 0))
+        return future
+
+    def _resolve(self, future, result):
+        """Settle a queued page's future; a second call for the same page is a no-op"""
+        if future.done():
+            return
+        try:
+            future.set_result(result)
+        finally:
+            with self._idle:
+                self._outstanding -= 1
+                self._idle.notify_all()
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                # Leave the stop marker for this worker's next loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._process(batch)
+            except Exception as e:
+                # Whatever went wrong, no crawl may be left waiting on this batch's futures
+                logger.error(f"❌ Classification worker failed on a batch of {len(batch)}: {e}")
+                for _, url, _, future, _ in batch:
+                    if not future.done():
+                        self._count('errors')
+                        self._count('pages')
+                        self._resolve(future, error_result(str(e)))
+
+    def _process(self, batch):
+        try:
+            results = self._classify_batch([(content, url) for content, url, _, _, _ in batch])
+        except CircuitOpenError:
+            # Another worker is probing the API; put the pages back without using up a retry
+            for item in batch:
+                self._queue.put(item)
+            time.sleep(1)
+            return
+        except Exception as e:
+            self._requeue_or_fail(batch, e)
+            return
+        for (_, url, key, future, _), result in zip(batch, results):
+            if self._cache:
+                try:
+                    self._cache.put(key, result, url)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not cache the classification of {url}: {e}")
+            self._count('pages')
+            self._resolve(future, result)
+
+    def _requeue_or_fail(self, batch, error):
+        """Send failed pages to the back of the queue; only after CLASSIFY_REQUEUES tries are they errors"""
+        # A request the API rejected outright won't fare better the second time
+        status = getattr(error, 'status_code', None)
+        final = status is not None and status not in RETRYABLE_STATUS
+        for content, url, key, future, attempts in batch:
+            if attempts < self.requeues and not final:
+                logger.warning(f"  🔁 Classification of {url} failed ({error}), re-queued")
+                self._count('requeued')
+                self._queue.put((content, url, key, future, attempts + 1))
+            else:
+                logger.error(f"[CLAUDE ERROR] {url}: {error}")
+                self._count('errors')
+                self._count('pages')
+                self._resolve(future, error_result(str(error)))
+
+    def _classify_batch(self, pages):
+        # Batches can mix districts; their calls are labeled as such in metrics
+        districts = {district_of(url) for _, url in pages}
+        district = districts.pop() if len(districts) == 1 else 'mixed'
+        if len(pages) == 1:
+            content, url = pages[0]
+            return [extract_json(self._call(build_prompt(content, url), district=district))]
+
+        text = self._call(build_batch_prompt(pages), district=district)
+        try:
+            parsed = json.loads(extract_json(text, '[', ']'))
+            if isinstance(parsed, list) and len(parsed) == len(pages):
+                return [json.dumps(item) for item in parsed]
+        except Exception:
+            pass
+
+        logger.warning(f"Batch response unusable, classifying {len(pages)} pages individually")
+        return [self._classify_batch([page])[0] for page in pages]
+
+    def _wait_for_cooldown(self):
+        while True:
+            with self._cooldown_lock:
+                remaining = self._cooldown_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def _back_off(self, seconds):
+        with self._cooldown_lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + seconds)
+
+    def _call(self, prompt, max_tokens=None, district=''):
+        """One API call under the in-flight bound, with rate-limit-aware retries"""
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_cooldown()
+            self.breaker.check()
+            try:
+                with self._in_flight:
+                    self._count('api_calls')
+                    text = call_claude(self.client, prompt, max_tokens, district)
+                self.breaker.record_success()
+                return text
+            except (anthropic.APIStatusError, anthropic.APIConnectionError) as e:
+                status = getattr(e, 'status_code', None)
+                if status is None or (status in RETRYABLE_STATUS and status != 429):
+                    # Outages and overload trip the breaker; every worker then waits out its cooldown
+                    self.breaker.record_failure()
+                    if self.breaker.retry_in():
+                        self._back_off(self.breaker.retry_in())
+                if attempt == self.max_retries or (status is not None and status not in RETRYABLE_STATUS):
+                    raise
+                if status == 429:
+                    self._count('rate_limited')
+                delay = retry_after_seconds(e) or min(30, 2 ** attempt) + random.uniform(0, 1)
+                logger.warning(f"  ⏳ Claude API {status or 'connection error'}, backing off {delay:.1f}s")
+                self._back_off(delay)
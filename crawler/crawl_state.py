@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Per-URL crawl state for incremental re-crawls
+Stores ETag / Last-Modified / body hash and the last result for each page,
+so unchanged pages can be skipped with a cheap conditional GET
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import requests
+
+from crawler.politeness import THROTTLE_STATUSES
+from crawler.shared_files import update_json
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def is_incremental_enabled():
+    return os.getenv('INCREMENTAL_CRAWL', 'false').lower() == 'true'
+
+def get_state_path():
+    shared_dir = os.getenv('SHARED_DIR', '/opt/render/project/src/shared')
+    return os.path.join(shared_dir, 'crawl_state.json')
+
+def body_hash(body):
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.sha256(body or b'').hexdigest()
+
+class CrawlState:
+    """JSON-file backed map of url -> last crawl state"""
+
+    def __init__(self, path, max_age_days=30, user_agent=None):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        if user_agent:
+            self._session.headers['User-Agent'] = user_agent
+        self.entries = self._load()
+        self.stats = {'unchanged': 0, 'changed': 0, 'checks': 0}
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read crawl state {self.path}: {e}")
+            return {}
+        cutoff = time.time() - self.max_age
+        return {url: entry for url, entry in entries.items() if entry.get('updated_at', 0) >= cutoff}
+
+    def save(self):
+        """Merge this process's entries into the state file; the newer entry for a URL wins
+
+        Sharded workers share the file, so what another worker saved since
+        this one loaded it is kept rather than overwritten.
+        """
+        with self._lock:
+            entries = dict(self.entries)
+        cutoff = time.time() - self.max_age
+
+        def merge(current):
+            merged = {url: entry for url, entry in (current or {}).items() if entry.get('updated_at', 0) >= cutoff}
+            for url, entry in entries.items():
+                if entry.get('updated_at', 0) >= merged.get(url, {}).get('updated_at', 0):
+                    merged[url] = entry
+            return merged
+
+        update_json(self.path, merge, default=str)
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def conditional_get(self, url, session=None, timeout=15):
+        """(entry, response) from a conditional GET of a page crawled before
+
+        entry is the stored entry when the page is unchanged, else None; the
+        response of a changed page is returned so the caller can use it
+        instead of fetching again. (None, None) for pages without state or
+        when the request fails. A 429/503 is raised as HTTPError so the
+        caller's politeness slot backs off.
+        """
+        with self._lock:
+            entry = self.entries.get(url)
+        if not entry or not entry.get('result'):
+            return None, None
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        self._count('checks')
+        try:
+            response = (session or self._session).get(url, headers=headers, timeout=timeout)
+        except requests.RequestException as e:
+            logger.debug(f"Conditional GET failed for {url}: {e}")
+            return None, None
+        if response.status_code in THROTTLE_STATUSES:
+            response.raise_for_status()
+
+        unchanged = (
+            response.status_code == 304 or
+            (response.status_code == 200 and entry.get('content_hash') == body_hash(response.content))
+        )
+        self._count('unchanged' if unchanged else 'changed')
+        return (entry if unchanged else None), response
+
+    def record(self, url, result, links, headers=None, body=None):
+        """Remember a freshly crawled page"""
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        with self._lock:
+            self.entries[url] = {
+                'etag': headers.get('etag', ''),
+                'last_modified': headers.get('last-modified', ''),
+                'content_hash': body_hash(body) if body is not None else '',
+                'result': result,
+                'links': links,
+                'updated_at': time.time()
+            }
+
+    def touch(self, url):
+        with self._lock:
+            if url in self.entries:
+                self.entries[url]['updated_at'] = time.time()
+
+def carried_forward(entry):
+    """Copy of a stored result marked as reused from a previous run"""
+    result = dict(entry['result'])
+    result['carried_forward'] = True
+    return result
+
+_state = None
+_state_lock = threading.Lock()
+
+def get_crawl_state(user_agent=None):
+    """Process-wide crawl state, or None when INCREMENTAL_CRAWL is off"""
+    global _state
+    if not is_incremental_enabled():
+        return None
+    with _state_lock:
+        if _state is None:
+            _state = CrawlState(get_state_path(), user_agent=user_agent)
+        return _state
@@ -8,11 +8,33 @@ import anthropic
 import os
 import time
 import json
+import threading
+from concurrent.futures import Future
 from urllib.parse import urljoin, urlparse
 from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
 import logging
 
+from crawler.classification_cache import cache_key, get_classification_cache
+from crawler.crawl_state import carried_forward, get_crawl_state
+from crawler.fetcher import get_fetcher, parse_static_page
+from crawler.frontier import LINK_LIMIT, Frontier, push_links
+from crawler.discovery import discover_if_enabled, seed_frontier
+from crawler.documents import SiteDocuments, get_document_stage
+from crawler.prefilter import screen_page
+from crawler.extraction import MIN_CONTENT_CHARS, extract_page_text, extract_text
+from crawler.metrics import district_of, get_metrics
+from crawler.records import UNCLASSIFIED_SUMMARY, is_unclassified, parse_classification
+from crawler.prompt_builder import PROMPT_VERSION, build_prompt
+from crawler.politeness import get_scheduler
+from crawler.resilience import Budget, CircuitOpenError, get_breakers, get_resilience_settings, navigate
+from crawler.browser_config import (
+    RUN_TOTALS,
+    ResourceBlockStats,
+    get_browser_settings,
+    launch_args,
+    new_lean_context
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,6 +42,26 @@ logger = logging.getLogger(__name__)
 # DON'T initialize client here - do it in the function
 # client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))  # ← REMOVE THIS
 
+# Shared by the sync and async engines
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# (href, anchor text) pairs for the frontier
+LINKS_SCRIPT = f"""els => els.slice(0, {LINK_LIMIT}).map(e => [
+    e.getAttribute('href'), (e.innerText || e.textContent || '').trim().slice(0, 200)
+])"""
+
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--memory-pressure-off'
+]
+
 def get_anthropic_client():
     """Get Anthropic client with error handling"""
     api_key = os.getenv("ANTHROPIC_API_KEY")
@@ -38,79 +80,120 @@ def get_anthropic_client():
         logger.error(f"Failed to initialize Anthropic client: {e}")
         raise
 
-def is_relevant_page(content, url):
-    """Use Claude to determine if a page contains relevant RFP information"""
-    prompt = f"""
-You are analyzing a school district website page to find RFP (Request for Proposal) opportunities.
-
-Look for RFPs related to:
-- Technology services and equipment
-- Construction and facilities
-- Transportation services
-- Food services and catering
-- Educational services and curriculum
-- Insurance and employee benefits
-- Professional services (legal, accounting, consulting)
-- Maintenance and facility services
-- Security services
-- Any other procurement opportunities
-
-Given this page content from {url}:
-{content[:4000]}
-
-Return JSON only (no other text):
-{{
-  "is_rfp": true or false,
-  "summary": "Brief summary of the RFP or page content",
-  "category": "Technology|Construction|Transportation|Food Services|Professional Services|Insurance|Other",
-  "submission_deadline": "Deadline date if found, otherwise empty string",
-  "submission_location": "Where to submit if found, otherwise empty string", 
-  "contact_email": "Contact email if found, otherwise empty string",
-  "contact_phone": "Contact phone if found, otherwise empty string",
-  "budget_range": "Budget information if found, otherwise empty string",
-  "confidence": "High|Medium|Low based on how certain you are this is an RFP"
-}}
-"""
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def get_shared_client():
+    """Get a process-wide Anthropic client, created on first use"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = get_anthropic_client()
+        return _shared_client
+
+def get_claude_settings():
+    """Model parameters for classification calls"""
+    return {
+        'model': os.getenv('CLAUDE_MODEL', 'claude-3-5-sonnet-20241022'),
+        # Output cap per page; one JSON object is a few hundred tokens
+        'max_tokens': int(os.getenv('CLAUDE_MAX_TOKENS', '400')),
+        'temperature': float(os.getenv('CLAUDE_TEMPERATURE', '0.1'))
+    }
+
+def extract_json(text, opener='{', closer='}'):
+    """Return the JSON payload of a Claude response, tolerating surrounding prose"""
+    text = text.strip()
+    try:
+        json.loads(text)
+        return text
+    except json.JSONDecodeError:
+        # Try to extract JSON from response
+        start = text.find(opener)
+        end = text.rfind(closer) + 1
+        if start != -1 and end != 0:
+            json_part = text[start:end]
+            json.loads(json_part)  # Validate
+            return json_part
+        raise Exception("No valid JSON found")
+
+def is_error_result(claude_result):
+    """True for the placeholder recorded when Claude could not be used (or a reply that isn't JSON)"""
+    try:
+        return is_unclassified(json.loads(claude_result))
+    except Exception:
+        return True
+
+def error_result(message):
+    """Unclassified marker recorded when Claude could not be used
+
+    Deliberately has no is_rfp: the page is neither an RFP nor a negative,
+    and its district counts as not fully crawled (see ResultsStore).
+    """
+    return json.dumps({
+        "unclassified": True,
+        "error": message,
+        "summary": f"{UNCLASSIFIED_SUMMARY}: {message}",
+        "category": "Other",
+        "submission_deadline": "",
+        "submission_location": "",
+        "contact_email": "",
+        "contact_phone": "",
+        "budget_range": "",
+        "confidence": "Low"
+    })
+
+def call_claude(client, prompt, max_tokens=None, district=''):
+    """Send one Prompt to Claude and return the response text; latency and tokens go to metrics"""
+    settings = get_claude_settings()
+    started = time.perf_counter()
     try:
-        # Get client when we actually need it
-        client = get_anthropic_client()
-        
         response = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1000,
-            temperature=0.1,
-            messages=[{"role": "user", "content": prompt}]
+            model=settings['model'],
+            max_tokens=max_tokens or settings['max_tokens'] * prompt.pages,
+            temperature=settings['temperature'],
+            **prompt.request()
         )
-        result = response.content[0].text.strip()
-        
-        # Ensure we return valid JSON
-        try:
-            json.loads(result)
-            return result
-        except json.JSONDecodeError:
-            # Try to extract JSON from response
-            start = result.find('{')
-            end = result.rfind('}') + 1
-            if start != -1 and end != 0:
-                json_part = result[start:end]
-                json.loads(json_part)  # Validate
-                return json_part
-            else:
-                raise Exception("No valid JSON found")
+    except Exception as e:
+        get_metrics().record_api_call(district, time.perf_counter() - started,
+                                      outcome=getattr(e, 'status_code', None) or type(e).__name__)
+        raise
+    get_metrics().record_api_call(district, time.perf_counter() - started, getattr(response, 'usage', None))
+    return response.content[0].text
+
+def classification_cache_key(content):
+    """Cache key for a page under the current prompt version and model"""
+    return cache_key(content, PROMPT_VERSION, get_claude_settings()['model'])
+
+def is_relevant_page(content, url, client=None):
+    """Use Claude to determine if a page contains relevant RFP information"""
+    # Unchanged pages reuse their previous classification
+    cache = get_classification_cache()
+    key = classification_cache_key(content)
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    
+    # Clearly irrelevant pages don't need the API
+    verdict = screen_page(content, url)
+    if verdict and verdict.skip:
+        return verdict.local_result()
+    
+    try:
+        # Reuse one client for the whole process
+        client = client or get_shared_client()
+        result = extract_json(call_claude(client, build_prompt(content, url), district=district_of(url)))
+        if cache:
+            cache.put(key, result, url)
+        return result
                 
     except Exception as e:
         logger.error(f"[CLAUDE ERROR] {e}")
-        return json.dumps({
-            "is_rfp": False, 
-            "summary": f"Error processing with Claude: {str(e)}", 
-            "category": "Other",
-            "submission_deadline": "",
-            "submission_location": "",
-            "contact_email": "",
-            "contact_phone": "",
-            "budget_range": "",
-            "confidence": "Low"
-        })
+        return error_result(str(e))
+
+def extract_clean_text(content):
+    """Strip scripts, styles and navigation from HTML and collapse whitespace"""
+    return extract_text(content)
 
 def get_school_priority_urls(base_url):
     """Get priority URLs for school districts"""
@@ -133,10 +216,168 @@ def get_school_priority_urls(base_url):
     
     return [urljoin(base_url, path) for path in priority_paths]
 
-def crawl_site_with_playwright(start_url, max_depth=2, max_pages=20):
-    """Enhanced Playwright crawler for school districts"""
-    visited = set()
+class LazyBrowser:
+    """Lean Chromium contexts that are only launched on first use"""
+    
+    def __init__(self, stats=None):
+        self.settings = get_browser_settings()
+        self.stats = stats or ResourceBlockStats()
+        self._playwright = None
+        self._browser = None
+        self._pages = {}
+        self._launch_error = None
+    
+    def launch(self):
+        """Start Playwright and Chromium; a failed launch is remembered rather than retried per page"""
+        if self._launch_error is not None:
+            raise RuntimeError(f"browser unavailable: {self._launch_error}")
+        self._playwright = sync_playwright().start()
+        try:
+            # Launch browser with Render-optimized options
+            self._browser = self._playwright.chromium.launch(
+                headless=self.settings['headless'],
+                args=launch_args(BROWSER_ARGS, self.settings)
+            )
+        except Exception as e:
+            # A started Playwright left behind makes the next start() fail with a misleading asyncio error
+            self._launch_error = e
+            self._playwright.stop()
+            self._playwright = None
+            logger.error(f"❌ Could not launch Chromium: {e}")
+            raise
+    
+    def page_for(self, javascript=True):
+        """Page from a context with or without JavaScript enabled"""
+        if not self.settings['disable_javascript']:
+            javascript = True
+        if javascript not in self._pages:
+            if self._browser is None:
+                self.launch()
+            
+            context = new_lean_context(self._browser, USER_AGENT, self.stats, self.settings, javascript)
+            page = context.new_page()
+            
+            # Set longer timeouts for school sites
+            page.set_default_timeout(45000)
+            page.set_default_navigation_timeout(60000)
+            self._pages[javascript] = page
+        return self._pages[javascript]
+    
+    @property
+    def page(self):
+        return self.page_for(javascript=True)
+    
+    def close(self):
+        if self._browser:
+            self._browser.close()
+        if self._playwright:
+            self._playwright.stop()
+
+def log_classification(claude_result):
+    """Log a found RFP from a claude_result JSON string"""
+    fields, is_rfp = parse_classification(claude_result)
+    if is_rfp:
+        logger.info(f"  🎯 RFP FOUND: {str((fields or {}).get('summary', ''))[:100]}")
+
+def fetch_with_browser(page, url, timer=None, budget=None):
+    """Navigate and return (response, title, clean_text, links)
+
+    Navigation retries inside the page's time budget, falling back from
+    networkidle to domcontentloaded on sites that never go quiet.
+    """
+    timer = timer or get_metrics().page(url)
+    budget = budget or Budget(get_resilience_settings()['page_budget'], label='page budget')
+    
+    # Navigate and wait for content
+    with timer.span('navigate'):
+        response = navigate(lambda wait_until, timeout: page.goto(url, wait_until=wait_until, timeout=timeout),
+                            url, budget)
+    with timer.span('render_wait'):
+        # Wait for dynamic content, but not past the budget
+        page.wait_for_timeout(int(min(2.0, max(0.0, budget.remaining())) * 1000))
+    
+    # Get page title, text and (href, anchor text) pairs
+    with timer.span('extract'):
+        title = page.title()
+        clean_text = extract_page_text(page)
+        links = page.eval_on_selector_all("a[href]", LINKS_SCRIPT)
+    return response, title, clean_text, links
+
+def page_order(index):
+    """Crawl order of a district's index-th fetched page: pages first, in fetch order"""
+    return [0, index]
+
+def document_order(index):
+    """Crawl order of a district's index-th linked document, after all of its pages"""
+    return [1, index]
+
+def track_result(result, future, timer, on_result=None, order=None):
+    """Time the page's classification and stream it to on_result(result, order) once it lands
+
+    Returns the future to wait on for the classification; with on_result it
+    resolves only after on_result has run, so a district is never finished
+    while its last page is still being recorded.
+    """
+    result["timings"] = timer.timings
+    timer.track(future)
+    if on_result:
+        return stream_result(result, future, on_result, order)
+    return future
+
+def stream_result(result, future, on_result, order=None):
+    """Hand a result to on_result as soon as its classification lands"""
+    recorded = Future()
+
+    def done(finished):
+        try:
+            result['claude_result'] = finished.result()
+        except BaseException as e:
+            recorded.set_exception(e)
+            return
+        try:
+            on_result(result, order)
+        except Exception as e:
+            logger.error(f"❌ Could not hand on the result for {result.get('url')}: {e}")
+        recorded.set_result(result['claude_result'])
+    future.add_done_callback(done)
+    return recorded
+
+def queue_documents(documents, classifier, on_result=None, first=0):
+    """Hand extracted documents to the classifier like pages; returns [(result, future)]
+
+    first is how many of the district's documents were queued before these.
+    """
+    queued = []
+    for i, document in enumerate(documents):
+        result = document.result()
+        verdict = screen_page(document.text, document.url)
+        if verdict:
+            result["prefilter"] = verdict.as_dict()
+        future = classifier.submit(document.text, document.url, verdict)
+        queued.append((result, track_result(result, future, document.timer, on_result, document_order(first + i))))
+    return queued
+
+def crawl_site_with_playwright(start_url, max_depth=2, max_pages=20, classifier=None, on_result=None,
+                               on_stopped=None):
+    """Enhanced Playwright crawler for school districts
+    
+    Pages are visited best-first from a Frontier scored by procurement
+    keywords, priority-path hints and depth; max_pages counts HTML pages,
+    and linked documents (up to DOCUMENT_MAX_PER_SITE) come on top of
+    them. Each fetched page is handed to
+    a ClassificationPipeline so the crawl keeps going while Claude works.
+    Pass a shared classifier to bound API concurrency across several crawls,
+    and on_result(result, order) to receive each page as soon as it is
+    classified; order sorts the district's results back into crawl order.
+    on_stopped(reason) is called if the district is abandoned with pages
+    still queued (time budget spent, host breaker open).
+    """
+    from crawler.classifier import ClassificationPipeline
+    
     results = []
+    pending = []
+    fresh = []
+    state = get_crawl_state(user_agent=USER_AGENT)
     
     # Test Anthropic client first
     try:
@@ -146,135 +387,172 @@ def crawl_site_with_playwright(start_url, max_depth=2, max_pages=20):
         logger.error(f"❌ Anthropic client test failed: {e}")
         return []
     
-    with sync_playwright() as p:
-        # Launch browser with Render-optimized options
-        browser = p.chromium.launch(
-            headless=True,
-            args=[
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-gpu',
-                '--disable-extensions',
-                '--disable-background-timer-throttling',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-renderer-backgrounding',
-                '--memory-pressure-off'
-            ]
-        )
-        
-        page = browser.new_page()
-        page.set_extra_http_headers({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
-        
-        # Set longer timeouts for school sites
-        page.set_default_timeout(45000)
-        page.set_default_navigation_timeout(60000)
-        
-        try:
-            def crawl(url, depth):
-                if (url in visited or 
-                    depth > max_depth or 
-                    len(results) >= max_pages or
-                    not url.startswith('http')):
-                    return
-                
-                visited.add(url)
-                logger.info(f"[Depth {depth}] Crawling: {url}")
+    own_classifier = classifier is None
+    if own_classifier:
+        classifier = ClassificationPipeline().start()
+    
+    # Chromium is only launched if some page actually needs rendering
+    browser = LazyBrowser()
+    fetcher = get_fetcher(user_agent=USER_AGENT)
+    
+    # robots.txt and sitemaps seed the frontier and set the crawl-delay floor
+    discovery = discover_if_enabled(fetcher.session, start_url, USER_AGENT)
+    frontier = Frontier(start_url, allowed=discovery.allowed if discovery else None)
+    frontier.push(start_url, 0, hint=True)
+    scheduler = get_scheduler()
+    if discovery:
+        seed_frontier(frontier, discovery)
+        scheduler.set_crawl_delay(start_url, discovery.crawl_delay)
+    
+    # A slow or failing district gives up its remaining pages instead of stalling the run
+    resilience = get_resilience_settings()
+    district_budget = Budget(resilience['district_budget'], label='district budget')
+    breakers = get_breakers()
+    
+    # Linked PDFs/DOCX are downloaded and read in the background, then classified like pages
+    stage = get_document_stage(fetcher.session)
+    documents = SiteDocuments(stage, allowed=frontier.allowed) if stage else None
+    document_results = []
+    
+    def take_documents(finished):
+        for result, future in queue_documents(finished, classifier, on_result, len(document_results)):
+            document_results.append(result)
+            pending.append((result, future))
+    
+    try:
+        while frontier and len(results) < max_pages:
+            if district_budget.expired:
+                logger.warning(f"⏱️ Time budget of {resilience['district_budget']:g}s spent on {start_url}, "
+                               f"stopping with {len(results)} pages and {len(frontier)} still queued")
+                if on_stopped:
+                    on_stopped(f"time budget of {resilience['district_budget']:g}s spent")
+                break
+            url, depth = frontier.pop()
+            timer = get_metrics().page(url)
+            logger.info(f"[Depth {depth}] Crawling: {url}")
+            
+            try:
+                # Cheap plain-HTTP fetch first; the browser only when it's needed.
+                # The host's politeness slot paces the request and learns from its response
+                breakers.host(url).check()
+                page_budget = Budget(resilience['page_budget'], district_budget, 'page budget')
+                with scheduler.slot(url, timer) as slot:
+                    # Incremental mode: a conditional GET spots pages unchanged since the last run,
+                    # and a changed page's response is used as its HTTP fetch
+                    entry, response = None, None
+                    if state:
+                        with timer.span('http_fetch'):
+                            entry, response = state.conditional_get(url, fetcher.session, fetcher.settings['timeout'])
+                        if response is not None:
+                            slot.record(response.status_code, response.headers)
+                    if not entry:
+                        fetched = fetcher.try_static(url, extract_clean_text, timer, response)
+                        if fetched:
+                            static, clean_text = fetched
+                            slot.record(static.status, static.headers)
+                            with timer.span('extract'):
+                                title, links = parse_static_page(static.html)
+                            headers, body, method = static.headers, static.body, "http"
+                        else:
+                            fetcher.count('browser')
+                            # Hosts not known to need JS can render without it (DISABLE_JAVASCRIPT_WHEN_POSSIBLE)
+                            page = browser.page_for(javascript=fetcher.needs_javascript(url))
+                            response, title, clean_text, links = fetch_with_browser(page, url, timer, page_budget)
+                            
+                            headers = response.headers if response is not None else {}
+                            if response is not None:
+                                slot.record(response.status, headers)
+                            body = response.body() if state and response is not None else None
+                            method = "playwright"
+                breakers.record(url)
                 
-                try:
-                    # Navigate and wait for content
-                    page.goto(url, wait_until="networkidle", timeout=60000)
-                    page.wait_for_timeout(2000)  # Wait for dynamic content
-                    
-                    # Get page title and content
-                    title = page.title()
-                    content = page.content()
-                    
-                    # Clean content with BeautifulSoup
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    # Remove scripts, styles, and navigation
-                    for script in soup(["script", "style", "nav", "header", "footer"]):
-                        script.decompose()
-                    
-                    text = soup.get_text()
-                    lines = (line.strip() for line in text.splitlines())
-                    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                    clean_text = ' '.join(chunk for chunk in chunks if chunk)
-                    
-                    if len(clean_text) < 50:
+                if entry:
+                    logger.info("  ♻️ Unchanged since last run, reusing previous result")
+                    results.append(carried_forward(entry))
+                    state.touch(url)
+                    if on_result:
+                        on_result(results[-1], page_order(len(results) - 1))
+                    links = entry.get('links', [])
+                else:
+                    if len(clean_text) < MIN_CONTENT_CHARS:
                         logger.info(f"  ⚠️ Skipping {url} - insufficient content")
-                        return
+                        # A bare list of bid files still links the documents themselves
+                        if documents:
+                            documents.push_links(links, url, depth)
+                        continue
                     
                     logger.info(f"  ✅ Extracted {len(clean_text)} characters from: {title}")
                     
-                    # Use Claude to analyze
-                    claude_result = is_relevant_page(clean_text, url)
-                    logger.info(f"  ↪ Claude analysis complete")
-                    
-                    # Check if RFP found
-                    try:
-                        parsed_result = json.loads(claude_result)
-                        if parsed_result.get('is_rfp', False):
-                            logger.info(f"  🎯 RFP FOUND: {parsed_result.get('summary', '')[:100]}")
-                    except:
-                        pass
-                    
                     result = {
                         "url": url,
                         "title": title,
                         "depth": depth,
                         "content_length": len(clean_text),
-                        "claude_result": claude_result,
+                        "claude_result": None,
                         "crawl_timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
-                        "method": "playwright"
+                        "method": method
                     }
                     
+                    # Clearly irrelevant pages are labeled locally instead of queued for Claude
+                    verdict = screen_page(clean_text, url)
+                    if verdict:
+                        result["prefilter"] = verdict.as_dict()
+                    
+                    # Queue for Claude analysis and keep crawling meanwhile
                     results.append(result)
+                    future = classifier.submit(clean_text, url, verdict)
+                    pending.append((result, track_result(result, future, timer, on_result,
+                                                         page_order(len(results) - 1))))
                     
-                    # Continue crawling if needed
-                    if len(results) < max_pages and depth < max_depth:
-                        # First try priority URLs (only on depth 0)
-                        if depth == 0:
-                            priority_urls = get_school_priority_urls(start_url)
-                            for priority_url in priority_urls:
-                                if priority_url not in visited and len(results) < max_pages:
-                                    time.sleep(1)
-                                    crawl(priority_url, depth + 1)
-                        
-                        # Then find additional links
-                        try:
-                            links = page.query_selector_all("a[href]")
-                            found_links = []
-                            
-                            for link in links[:20]:  # Limit links to check
-                                try:
-                                    href = link.get_attribute("href")
-                                    if href and start_url in href:
-                                        found_links.append(href)
-                                except:
-                                    continue
-                            
-                            # Crawl unique links
-                            for link in list(set(found_links))[:5]:
-                                if link not in visited and len(results) < max_pages:
-                                    time.sleep(1)
-                                    crawl(link, depth + 1)
-                                    if len(results) >= max_pages:
-                                        break
-                        except Exception as e:
-                            logger.warning(f"Error finding links: {e}")
-                            
-                except Exception as e:
-                    logger.error(f"  ❌ Error crawling {url}: {e}")
-            
-            # Start crawling from the main URL
-            crawl(start_url, 0)
-            
-        finally:
-            browser.close()
+                    if state and body is not None:
+                        fresh.append((url, result, links, headers, body))
+                
+                # Grow the frontier; priority paths are only hints from the home page
+                if depth < max_depth:
+                    if depth == 0:
+                        for priority_url in get_school_priority_urls(start_url):
+                            frontier.push(priority_url, depth + 1, hint=True)
+                    push_links(frontier, links, url, depth + 1)
+                # Documents are leaves, so they are read even from pages at the depth limit
+                if documents:
+                    documents.push_links(links, url, depth)
+                    take_documents(documents.ready())
+                    
+            except CircuitOpenError as e:
+                logger.warning(f"  ⛔ Abandoning {start_url}: {e} ({len(frontier)} pages left queued)")
+                if on_stopped:
+                    on_stopped(str(e))
+                break
+            except Exception as e:
+                breakers.record(url, e)
+                logger.error(f"  ❌ Error crawling {url}: {e}")
+        
+    finally:
+        browser.close()
+        fetcher.save_modes()
+        browser.stats.log_summary(f"Resource blocking for {start_url}")
+        RUN_TOTALS.merge(browser.stats)
+    
+    # Collect classifications for everything we fetched, documents included
+    try:
+        if documents:
+            take_documents(documents.drain())
+        for result, future in pending:
+            result['claude_result'] = future.result()
+            log_classification(result['claude_result'])
+    finally:
+        if own_classifier:
+            classifier.close()
+    logger.info(f"  ↪ Claude analysis complete for {len(pending)} pages")
+    
+    # Remember what we fetched so the next run can skip unchanged pages
+    if state:
+        for url, result, links, headers, body in fresh:
+            if not is_error_result(result['claude_result']):
+                state.record(url, result, links, headers, body)
+        state.save()
     
-    logger.info(f"✅ Crawl completed. Found {len(results)} pages total")
-    return results
\ No newline at end of file
+    results.extend(document_results)
+    logger.info(f"✅ Crawl completed. Found {len(results)} pages total"
+                + (f" ({len(document_results)} linked documents)" if document_results else ""))
+    return results
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for RFPs across pages and runs
+SimHash fingerprints looked up by band merge copies of the same solicitation;
+a hash of the material fields marks each merged RFP new, changed or unchanged
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+
+from crawler.rfp_store import CONFIDENCE_RANK, SIMHASH_BANDS, SIMHASH_BITS, band_values, parse_deadline
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Band lookups find every pair within this many differing bits
+MAX_DISTANCE = SIMHASH_BANDS - 1
+
+# Feature weights: the deadline and contact identify a solicitation better than wording
+TITLE_WEIGHT = 2
+SUMMARY_WEIGHT = 1
+DEADLINE_WEIGHT = 6
+CONTACT_WEIGHT = 6
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has in is it of on or that the this to was will with
+school schools district county public board rfp rfps request requests proposal proposals
+""".split())
+
+MERGED_FIELDS = ('title', 'summary', 'category', 'deadline', 'contact_email', 'contact_phone',
+                 'budget_range', 'submission_location', 'district')
+
+def get_dedup_settings():
+    return {'enabled': os.getenv('DEDUP_RFPS', 'true').lower() == 'true'}
+
+def tokens(text):
+    return [token for token in re.findall(r'[a-z0-9]+', (text or '').lower())
+            if len(token) > 1 and token not in STOPWORDS]
+
+def contact_of(rfp):
+    """Normalized email, else the last 10 phone digits, else ''"""
+    email = (rfp.get('contact_email') or '').strip().lower()
+    if email:
+        return email
+    digits = re.sub(r'\D', '', rfp.get('contact_phone') or '')
+    return digits[-10:] if len(digits) >= 10 else ''
+
+def feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def simhash(features):
+    """64-bit SimHash of {feature: weight}"""
+    counts = [0] * SIMHASH_BITS
+    for feature, weight in features.items():
+        value = feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            counts[bit] += weight if value >> bit & 1 else -weight
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if counts[bit] > 0)
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+def content_hash(rfp):
+    """Hash of the facts a bidder acts on; wording of the title and summary is ignored"""
+    material = [
+        parse_deadline(rfp.get('deadline') or '') or (rfp.get('deadline') or '').strip().lower(),
+        contact_of(rfp),
+        re.sub(r'\D', '', rfp.get('contact_phone') or ''),
+        ' '.join(tokens(rfp.get('budget_range'))),
+        ' '.join(tokens(rfp.get('submission_location'))),
+        (rfp.get('category') or 'Other').lower()
+    ]
+    return hashlib.sha1(json.dumps(material).encode('utf-8')).hexdigest()[:16]
+
+class Fingerprint:
+    """What the matcher compares: district, SimHash, parsed deadline and the deadline+contact key"""
+
+    __slots__ = ('rfp', 'simhash', 'deadline_date', 'key', 'district')
+
+    def __init__(self, simhash, deadline_date, key, rfp=None, district=None):
+        self.simhash = simhash
+        self.deadline_date = deadline_date
+        self.key = key
+        self.rfp = rfp
+        self.district = district
+
+    @classmethod
+    def of(cls, rfp):
+        deadline_date = parse_deadline(rfp.get('deadline') or '')
+        contact = contact_of(rfp)
+        features = {}
+        for token in tokens(rfp.get('title')):
+            features[token] = features.get(token, 0) + TITLE_WEIGHT
+        for token in tokens(rfp.get('summary')):
+            features[token] = features.get(token, 0) + SUMMARY_WEIGHT
+        if deadline_date:
+            features[f"deadline:{deadline_date}"] = DEADLINE_WEIGHT
+        if contact:
+            features[f"contact:{contact}"] = CONTACT_WEIGHT
+        key = f"{deadline_date}|{contact}" if deadline_date and contact else None
+        return cls(simhash(features), deadline_date, key, rfp, rfp.get('district'))
+
+    @classmethod
+    def of_row(cls, row):
+        return cls(row['simhash'], row['deadline_date'], row['dedup_key'], district=row.get('district'))
+
+    @property
+    def bands(self):
+        return [(band, value) for band, value in enumerate(band_values(self.simhash))]
+
+    def same_rfp(self, other):
+        """Different districts or parsed deadlines are different solicitations, however similar the text"""
+        if self.district and other.district and self.district != other.district:
+            return False
+        if self.deadline_date and other.deadline_date and self.deadline_date != other.deadline_date:
+            return False
+        if self.key and self.key == other.key:
+            return True
+        return other.simhash is not None and hamming(self.simhash, other.simhash) <= MAX_DISTANCE
+
+def cluster(fingerprints):
+    """Group fingerprints of the same RFP; only fingerprints sharing a band or key are compared"""
+    parent = list(range(len(fingerprints)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = {}
+    for i, fingerprint in enumerate(fingerprints):
+        keys = fingerprint.bands + ([('key', fingerprint.key)] if fingerprint.key else [])
+        compared = set()
+        for key in keys:
+            for j in buckets.get(key, ()):
+                if j not in compared:
+                    compared.add(j)
+                    if find(i) != find(j) and fingerprint.same_rfp(fingerprints[j]):
+                        parent[find(i)] = find(j)
+            buckets.setdefault(key, []).append(i)
+
+    groups = {}
+    for i in range(len(fingerprints)):
+        groups.setdefault(find(i), []).append(fingerprints[i])
+    return list(groups.values())
+
+def merge_group(rfps, canonical_url=None):
+    """One record for a group: the canonical (or shallowest) page, gaps filled from the others"""
+    ordered = sorted(rfps, key=lambda rfp: (rfp['url'] != canonical_url, rfp.get('depth') or 0, len(rfp['url'])))
+    merged = dict(ordered[0])
+    for field in MERGED_FIELDS:
+        if not merged.get(field):
+            merged[field] = next((rfp[field] for rfp in ordered[1:] if rfp.get(field)), merged.get(field, ''))
+    merged['confidence'] = max((rfp.get('confidence') or 'Medium' for rfp in ordered),
+                               key=lambda confidence: CONFIDENCE_RANK.get(str(confidence).lower(), 2))
+    merged['aliases'] = sorted({rfp['url'] for rfp in ordered} - {merged['url']})
+    return merged
+
+class RfpDeduplicator:
+    """Merges one run's RFP pages and matches them against the RFP index's history"""
+
+    def __init__(self, index=None):
+        self.index = index
+        self.stats = {'pages': 0, 'rfps': 0, 'new': 0, 'changed': 0, 'unchanged': 0}
+
+    def previous(self, group, claimed):
+        """The indexed RFP this group continues, or None"""
+        if self.index is None:
+            return None
+        urls = {fingerprint.rfp['url'] for fingerprint in group}
+        bands = {band for fingerprint in group for band in fingerprint.bands}
+        keys = {fingerprint.key for fingerprint in group if fingerprint.key}
+        try:
+            rows = self.index.candidates(urls, bands, keys)
+        except Exception as e:
+            logger.warning(f"⚠️ RFP history lookup failed, treating as new: {e}")
+            return None
+        rows = [row for row in rows if row['id'] not in claimed]
+        # A page we have already indexed is the strongest match
+        for row in rows:
+            if row['url'] in urls or urls & set(row['aliases']):
+                return row
+        for row in rows:
+            stored = Fingerprint.of_row(row)
+            if any(fingerprint.same_rfp(stored) for fingerprint in group):
+                return row
+        return None
+
+    def run(self, rfps, run_id):
+        """Merged RFPs for this run, each with status new, changed or unchanged"""
+        merged_rfps = []
+        claimed = set()
+        for group in cluster([Fingerprint.of(rfp) for rfp in rfps]):
+            previous = self.previous(group, claimed)
+            merged = merge_group([fingerprint.rfp for fingerprint in group], previous and previous['url'])
+            fingerprint = Fingerprint.of(merged)
+            merged['simhash'] = f"{fingerprint.simhash:016x}"
+            merged['dedup_key'] = fingerprint.key
+            merged['content_hash'] = content_hash(merged)
+            if previous is None:
+                merged['status'] = 'new'
+            else:
+                claimed.add(previous['id'])
+                merged['rfp_id'] = previous['id']
+                if previous['last_run_id'] == run_id:
+                    # Saving a resumed run again keeps the status it was given the first time
+                    merged['status'] = previous['status'] or 'new'
+                elif previous['content_hash'] and previous['content_hash'] != merged['content_hash']:
+                    merged['status'] = 'changed'
+                else:
+                    merged['status'] = 'unchanged'
+            self.stats[merged['status']] += 1
+            merged_rfps.append(merged)
+        self.stats['pages'] += len(rfps)
+        self.stats['rfps'] += len(merged_rfps)
+        return merged_rfps
+
+def dedup_rfps(rfps, run_id, index=None):
+    """(merged RFPs, stats), or the RFPs untouched when DEDUP_RFPS is off"""
+    if not get_dedup_settings()['enabled']:
+        return rfps, None
+    deduplicator = RfpDeduplicator(index)
+    merged = deduplicator.run(rfps, run_id)
+    stats = deduplicator.stats
+    logger.info(f"🧬 Dedup: {stats['pages']} RFP pages -> {stats['rfps']} RFPs "
+                f"({stats['new']} new, {stats['changed']} changed, {stats['unchanged']} unchanged)")
+    return merged, dict(stats)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+robots.txt and sitemap.xml driven URL discovery
+Streams (optionally gzipped) sitemaps and sitemap indexes, keeps the
+procurement-looking, recently modified URLs and seeds the crawl frontier
+"""
+
+import os
+import io
+import gzip
+import time
+import logging
+from datetime import datetime, timezone
+from urllib.parse import urljoin
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import iterparse, ParseError
+
+import requests
+
+from crawler.frontier import keyword_score, normalize_url, site_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SITEMAPS = ('/sitemap.xml', '/sitemap_index.xml')
+
+def get_discovery_settings():
+    """Discovery limits"""
+    return {
+        'enabled': os.getenv('SITEMAP_DISCOVERY', 'true').lower() == 'true',
+        'max_seeds': int(os.getenv('SITEMAP_MAX_SEEDS', '50')),
+        'max_age_days': float(os.getenv('SITEMAP_MAX_AGE_DAYS', '365')),
+        'max_sitemaps': int(os.getenv('SITEMAP_MAX_FILES', '20')),
+        'max_entries': int(os.getenv('SITEMAP_MAX_ENTRIES', '50000')),
+        'timeout': int(os.getenv('REQUEST_TIMEOUT', '60'))
+    }
+
+def parse_lastmod(value):
+    """W3C datetime from a sitemap, as an aware datetime (or None)"""
+    if not value:
+        return None
+    value = value.strip().replace('Z', '+00:00')
+    for candidate in (value, value[:10]):
+        try:
+            parsed = datetime.fromisoformat(candidate)
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+class Discovery:
+    """What robots.txt and the sitemaps told us about one district"""
+
+    def __init__(self, robots=None, seeds=None, crawl_delay=None, sitemaps_read=0, entries_seen=0):
+        self.robots = robots
+        self.seeds = seeds or []
+        self.crawl_delay = crawl_delay
+        self.sitemaps_read = sitemaps_read
+        self.entries_seen = entries_seen
+
+    def allowed(self, url, user_agent='*'):
+        """robots.txt permission for a URL (allowed when robots.txt was unavailable)"""
+        if self.robots is None:
+            return True
+        try:
+            return self.robots.can_fetch(user_agent, url)
+        except Exception:
+            return True
+
+def fetch_robots(session, base_url, timeout):
+    """Parse robots.txt line by line as it streams in; None if missing"""
+    robots_url = urljoin(base_url, '/robots.txt')
+    try:
+        with session.get(robots_url, timeout=timeout, stream=True) as response:
+            if response.status_code != 200:
+                return None
+            lines = [line for line in response.iter_lines(decode_unicode=True) if line is not None]
+    except requests.RequestException as e:
+        logger.debug(f"robots.txt unavailable for {base_url}: {e}")
+        return None
+
+    robots = RobotFileParser(robots_url)
+    robots.parse(lines)
+    return robots
+
+def iter_sitemap(session, sitemap_url, timeout):
+    """Yield ('url' | 'sitemap', loc, lastmod) from a sitemap without loading it whole"""
+    with session.get(sitemap_url, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            return
+        response.raw.decode_content = True
+        stream = response.raw
+
+        # Peek for the gzip magic number; .xml.gz files are often served as octet-stream
+        head = stream.read(2)
+        stream = io.BufferedReader(_Prefixed(head, stream))
+        if head == b'\x1f\x8b':
+            stream = gzip.GzipFile(fileobj=stream)
+
+        loc = lastmod = None
+        try:
+            for _, element in iterparse(stream, events=('end',)):
+                name = local_name(element.tag)
+                if name == 'loc':
+                    loc = (element.text or '').strip()
+                elif name == 'lastmod':
+                    lastmod = element.text
+                elif name in ('url', 'sitemap'):
+                    if loc:
+                        yield ('url' if name == 'url' else 'sitemap'), loc, parse_lastmod(lastmod)
+                    loc = lastmod = None
+                    element.clear()
+        except (ParseError, OSError, EOFError) as e:
+            logger.warning(f"⚠️ Could not parse sitemap {sitemap_url}: {e}")
+
+class _Prefixed(io.RawIOBase):
+    """Raw stream that replays bytes already read from another stream"""
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def discover(session, start_url, user_agent='*', settings=None):
+    """Read robots.txt and sitemaps for a district and pick frontier seeds"""
+    settings = settings or get_discovery_settings()
+    started = time.time()
+    robots = fetch_robots(session, start_url, settings['timeout'])
+
+    crawl_delay = None
+    sitemap_queue = []
+    if robots is not None:
+        crawl_delay = robots.crawl_delay(user_agent) or robots.crawl_delay('*')
+        sitemap_queue.extend(robots.site_maps() or [])
+    if not sitemap_queue:
+        sitemap_queue = [urljoin(start_url, path) for path in DEFAULT_SITEMAPS]
+
+    discovery = Discovery(robots=robots, crawl_delay=float(crawl_delay) if crawl_delay else None)
+    cutoff = datetime.now(timezone.utc).timestamp() - settings['max_age_days'] * 86400
+    site = site_key(start_url)
+    candidates = {}
+    seen_sitemaps = set()
+
+    while sitemap_queue and discovery.sitemaps_read < settings['max_sitemaps']:
+        sitemap_url = sitemap_queue.pop(0)
+        if sitemap_url in seen_sitemaps:
+            continue
+        seen_sitemaps.add(sitemap_url)
+        discovery.sitemaps_read += 1
+
+        try:
+            for kind, loc, lastmod in iter_sitemap(session, sitemap_url, settings['timeout']):
+                if kind == 'sitemap':
+                    # Child sitemaps whose names look procurement-related go first
+                    if keyword_score(loc) > 0:
+                        sitemap_queue.insert(0, loc)
+                    else:
+                        sitemap_queue.append(loc)
+                    continue
+
+                discovery.entries_seen += 1
+                if discovery.entries_seen > settings['max_entries']:
+                    break
+                if lastmod is not None and lastmod.timestamp() < cutoff:
+                    continue
+                url = normalize_url(loc, start_url)
+                if not url or site_key(url) != site or not discovery.allowed(url, user_agent):
+                    continue
+                score = keyword_score(url)
+                if score > 0:
+                    candidates[url] = (score, lastmod.timestamp() if lastmod else 0)
+        except requests.RequestException as e:
+            logger.debug(f"Sitemap unavailable {sitemap_url}: {e}")
+
+    # Best keyword matches first, most recently modified breaking ties
+    ranked = sorted(candidates.items(), key=lambda item: item[1], reverse=True)
+    discovery.seeds = [url for url, _ in ranked[:settings['max_seeds']]]
+
+    logger.info(f"  🗺️ Discovery for {start_url}: {discovery.sitemaps_read} sitemaps, "
+                f"{discovery.entries_seen} entries, {len(discovery.seeds)} seeds"
+                + (f", crawl-delay {discovery.crawl_delay}s" if discovery.crawl_delay else "")
+                + f" ({time.time() - started:.1f}s)")
+    return discovery
+
+def seed_frontier(frontier, discovery):
+    """Push sitemap seeds one level below the start page"""
+    for url in discovery.seeds:
+        frontier.push(url, 1, hint=True)
+
+def discover_if_enabled(session, start_url, user_agent='*'):
+    """Run discovery unless SITEMAP_DISCOVERY=false; failures just mean no seeds"""
+    settings = get_discovery_settings()
+    if not settings['enabled']:
+        return None
+    try:
+        return discover(session, start_url, user_agent, settings)
+    except Exception as e:
+        logger.warning(f"⚠️ Discovery failed for {start_url}: {e}")
+        return None
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Linked bid documents (PDF, DOCX): streamed downloads and text extraction
+Downloads run on threads with a size cap, text is pulled page by page in a
+process pool, and identical files linked from several pages are read once
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+import zipfile
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+from xml.etree.ElementTree import iterparse
+
+import requests
+
+from crawler.extraction import MIN_CONTENT_CHARS
+from crawler.frontier import normalize_url
+from crawler.metrics import get_metrics
+from crawler.politeness import get_scheduler
+from crawler.resilience import get_breakers
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DOCUMENT_TYPES = {'.pdf': 'pdf', '.docx': 'docx'}
+
+# File signatures; the URL's extension isn't trusted on its own
+MAGIC = {'pdf': b'%PDF', 'docx': b'PK\x03\x04'}
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+CHUNK_SIZE = 64 * 1024
+
+def get_document_settings():
+    """Document stage limits"""
+    return {
+        'enabled': os.getenv('DOCUMENT_FETCH', 'true').lower() == 'true',
+        'max_bytes': int(float(os.getenv('DOCUMENT_MAX_MB', '15')) * 1024 * 1024),
+        'max_pages': int(os.getenv('DOCUMENT_MAX_PAGES', '40')),
+        'max_chars': int(os.getenv('DOCUMENT_MAX_CHARS', '40000')),
+        'max_per_site': int(os.getenv('DOCUMENT_MAX_PER_SITE', '10')),
+        'workers': max(1, int(os.getenv('DOCUMENT_WORKERS', '2'))),
+        'timeout': int(os.getenv('REQUEST_TIMEOUT', '60'))
+    }
+
+def document_type(url):
+    """'pdf' or 'docx' for a link to a supported document, else None"""
+    path = urlparse(url).path.lower()
+    for extension, kind in DOCUMENT_TYPES.items():
+        if path.endswith(extension):
+            return kind
+    return None
+
+def document_title(url, text):
+    """File name without extension, or the document's first substantial line"""
+    for line in text.splitlines():
+        line = line.strip()
+        if len(line) > 12:
+            return line[:150]
+    name = unquote(urlparse(url).path.rsplit('/', 1)[-1])
+    return re.sub(r'[_-]+', ' ', name.rsplit('.', 1)[0]).strip() or url
+
+def extract_pdf(path, max_pages, max_chars):
+    """(text, pages read) one page at a time, stopping at either limit"""
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        # Many bid PDFs are "encrypted" with an empty password to stop editing
+        reader.decrypt('')
+    chunks, total, pages = [], 0, 0
+    for page in reader.pages:
+        if pages >= max_pages or total >= max_chars:
+            break
+        text = page.extract_text() or ''
+        chunks.append(text)
+        total += len(text)
+        pages += 1
+    return '\n'.join(chunks)[:max_chars], pages
+
+def extract_docx(path, max_chars):
+    """(text, paragraphs read) streamed from word/document.xml"""
+    chunks, paragraph, total, paragraphs = [], [], 0, 0
+    with zipfile.ZipFile(path) as archive:
+        with archive.open('word/document.xml') as document:
+            for _, element in iterparse(document, events=('end',)):
+                if element.tag == WORD_NS + 't' and element.text:
+                    paragraph.append(element.text)
+                elif element.tag == WORD_NS + 'tab':
+                    paragraph.append(' ')
+                elif element.tag == WORD_NS + 'p':
+                    line = ''.join(paragraph).strip()
+                    paragraph = []
+                    paragraphs += 1
+                    if line:
+                        chunks.append(line)
+                        total += len(line) + 1
+                    element.clear()
+                    if total >= max_chars:
+                        break
+    return '\n'.join(chunks)[:max_chars], paragraphs
+
+def extract_document(path, kind, max_pages, max_chars):
+    """Runs in the process pool: (text, pages or paragraphs read)"""
+    if kind == 'pdf':
+        text, pages = extract_pdf(path, max_pages, max_chars)
+    else:
+        text, pages = extract_docx(path, max_chars)
+    return re.sub(r'[ \t]+', ' ', re.sub(r'\n\s*\n+', '\n', text)).strip(), pages
+
+class Document:
+    """A downloaded, extracted document and the page that linked it"""
+
+    __slots__ = ('url', 'source_url', 'depth', 'kind', 'sha256', 'size', 'pages', 'text', 'timer')
+
+    def __init__(self, url, source_url, depth, kind, sha256, size, pages, text, timer):
+        self.url = url
+        self.source_url = source_url
+        self.depth = depth
+        self.kind = kind
+        self.sha256 = sha256
+        self.size = size
+        self.pages = pages
+        self.text = text
+        self.timer = timer
+
+    def result(self):
+        """A crawl result like an HTML page's, for the classifier and save_results"""
+        return {
+            "url": self.url,
+            "title": document_title(self.url, self.text),
+            "depth": self.depth,
+            "content_length": len(self.text),
+            "claude_result": None,
+            "crawl_timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "method": f"document-{self.kind}",
+            "source_url": self.source_url,
+            "document": {"type": self.kind, "bytes": self.size, "pages": self.pages, "sha256": self.sha256[:16]}
+        }
+
+class DocumentStage:
+    """Process-wide download threads, extraction processes and content-hash dedup"""
+
+    def __init__(self, session, settings=None):
+        self.settings = settings or get_document_settings()
+        self.session = session
+        self._downloads = None
+        self._extractors = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._urls = set()
+        self._hashes = set()
+        self.stats = dict.fromkeys(('linked', 'disallowed', 'downloaded', 'duplicates', 'too_large', 'failed',
+                                    'no_text', 'extracted', 'bytes'), 0)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _pools(self):
+        with self._lock:
+            if self._downloads is None:
+                workers = self.settings['workers']
+                self._downloads = ThreadPoolExecutor(max_workers=workers * 2, thread_name_prefix='documents')
+                # spawn: forking a process that runs Playwright and worker threads isn't safe
+                self._extractors = ProcessPoolExecutor(max_workers=workers,
+                                                       mp_context=multiprocessing.get_context('spawn'))
+            return self._downloads, self._extractors
+
+    def claim(self, url):
+        """True the first time a document URL is seen this run"""
+        with self._lock:
+            if self._closed:
+                # First document of a new run; the last run's stats stayed readable until now
+                self._closed = False
+                self._urls = set()
+                self._hashes = set()
+                self.stats = dict.fromkeys(self.stats, 0)
+            if url in self._urls:
+                return False
+            self._urls.add(url)
+            self.stats['linked'] += 1
+            return True
+
+    def submit(self, url, source_url, depth):
+        downloads, _ = self._pools()
+        return downloads.submit(self.fetch, url, source_url, depth)
+
+    def download(self, url, kind, target):
+        """Stream url into target; (sha256, size), or None if it is too large or not a document"""
+        max_bytes = self.settings['max_bytes']
+        with self.session.get(url, stream=True, timeout=self.settings['timeout']) as response:
+            response.raise_for_status()
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > max_bytes:
+                self._count('too_large')
+                logger.info(f"  📄 Skipping {url}: {int(length) / 1_000_000:.1f} MB is over the size cap")
+                return None
+            digest = hashlib.sha256()
+            size = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if size == 0 and not chunk.startswith(MAGIC[kind]):
+                    logger.info(f"  📄 Skipping {url}: not a {kind.upper()} file")
+                    return None
+                size += len(chunk)
+                if size > max_bytes:
+                    self._count('too_large')
+                    logger.info(f"  📄 Skipping {url}: larger than {max_bytes / 1_000_000:.0f} MB")
+                    return None
+                digest.update(chunk)
+                target.write(chunk)
+        return digest.hexdigest(), size
+
+    def fetch(self, url, source_url, depth):
+        """Download and extract one document; None if skipped, failed or already seen"""
+        kind = document_type(url)
+        if kind == 'pdf' and PdfReader is None:
+            logger.warning(f"  📄 Skipping {url}: install pypdf to read PDFs")
+            return None
+        timer = get_metrics().page(url)
+        scheduler = get_scheduler()
+        breaker = get_breakers().host(url)
+        path = None
+        try:
+            if not breaker.allow():
+                return None
+            with tempfile.NamedTemporaryFile(suffix=f".{kind}", delete=False) as target:
+                path = target.name
+                with scheduler.slot(url, timer), timer.span('http_fetch'):
+                    downloaded = self.download(url, kind, target)
+            breaker.record_success()
+            if downloaded is None:
+                return None
+            sha256, size = downloaded
+            self._count('downloaded')
+            self._count('bytes', size)
+            with self._lock:
+                duplicate = sha256 in self._hashes
+                self._hashes.add(sha256)
+            if duplicate:
+                self._count('duplicates')
+                logger.info(f"  📄 {url} is a copy of a document already read")
+                return None
+
+            _, extractors = self._pools()
+            with timer.span('extract'):
+                text, pages = extractors.submit(extract_document, path, kind, self.settings['max_pages'],
+                                                self.settings['max_chars']).result()
+            if len(text) < MIN_CONTENT_CHARS:
+                # Usually a scanned PDF with no text layer; nothing for the classifier to read
+                self._count('no_text')
+                logger.info(f"  📄 Skipping {url}: no extractable text (scanned?)")
+                return None
+            self._count('extracted')
+            logger.info(f"  📄 Extracted {len(text)} characters from {url} ({pages} {'pages' if kind == 'pdf' else 'paragraphs'})")
+            return Document(url, source_url, depth, kind, sha256, size, pages, text, timer)
+        except Exception as e:
+            if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                breaker.record_failure()
+            self._count('failed')
+            logger.warning(f"  📄 Could not read {url}: {e}")
+            return None
+        finally:
+            if path:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def close(self):
+        """Stop the pools; the next run starts with no documents seen"""
+        with self._lock:
+            downloads, extractors = self._downloads, self._extractors
+            self._downloads = self._extractors = None
+            self._closed = True
+        if downloads:
+            downloads.shutdown(wait=True)
+            extractors.shutdown(wait=True)
+
+class SiteDocuments:
+    """One crawl's linked documents: queued as links are found, collected as they finish"""
+
+    def __init__(self, stage, settings=None, allowed=None):
+        self.stage = stage
+        self.settings = settings or stage.settings
+        # robots.txt check, the same one the frontier applies to pages
+        self.allowed = allowed
+        self.submitted = 0
+        self._futures = []
+
+    def push_links(self, links, page_url, depth):
+        """Queue the documents a page links to, up to DOCUMENT_MAX_PER_SITE per crawl"""
+        for href, _ in links:
+            if self.submitted >= self.settings['max_per_site']:
+                return
+            url = normalize_url(href, page_url)
+            if not url or not document_type(url):
+                continue
+            if self.allowed and not self.allowed(url):
+                self.stage._count('disallowed')
+                continue
+            if self.stage.claim(url):
+                self._futures.append(self.stage.submit(url, page_url, depth + 1))
+                self.submitted += 1
+
+    def ready(self):
+        """Documents finished so far, without waiting; only up to the first unfinished one, to keep link order"""
+        finished = 0
+        while finished < len(self._futures) and self._futures[finished].done():
+            finished += 1
+        done, self._futures = self._futures[:finished], self._futures[finished:]
+        return [document for document in (future.result() for future in done) if document]
+
+    def drain(self):
+        """Every remaining document, waiting for downloads and extraction"""
+        futures, self._futures = self._futures, []
+        return [document for document in (future.result() for future in futures) if document]
+
+_stage = None
+_stage_lock = threading.Lock()
+
+def get_document_stage(session=None):
+    """Process-wide document stage, or None when DOCUMENT_FETCH is off"""
+    global _stage
+    with _stage_lock:
+        if _stage is None:
+            settings = get_document_settings()
+            if not settings['enabled']:
+                return None
+            _stage = DocumentStage(session or requests.Session(), settings)
+        return _stage
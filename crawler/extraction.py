@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Pluggable HTML-to-text extraction with main-content detection
+lxml for fetched HTML, innerText for rendered pages, BeautifulSoup as the legacy fallback
+"""
+
+import os
+import re
+import asyncio
+import logging
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    etree = lxml_html = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Boilerplate dropped before extracting text
+STRIP_TAGS = ('script', 'style', 'noscript', 'template', 'svg', 'nav', 'header', 'footer')
+
+# Elements that explicitly mark the page's main content, best first
+MAIN_XPATHS = (
+    '//main',
+    '//*[@role="main"]',
+    '//*[@id="main-content" or @id="maincontent" or @id="main" or @id="content"]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " main-content ")]',
+    '//article',
+)
+MAIN_SELECTOR = 'main, [role="main"], #main-content, #maincontent, #main, #content, .main-content'
+
+# Blocks that may hold the main content when nothing is marked up
+BLOCK_TAGS = {'div', 'section', 'article', 'td', 'main'}
+
+# Pages and documents with less text than this aren't classified
+MIN_CONTENT_CHARS = 50
+
+# A detected region must hold this much text, and this share of the page, to be used alone
+MIN_MAIN_CHARS = 200
+MAIN_SHARE = 0.5
+
+WHITESPACE = re.compile(r'\s+')
+
+# innerText of the main region (or the body minus navigation), computed in the page
+INNER_TEXT_SCRIPT = f"""() => {{
+    const skip = 'nav, header, footer';
+    const main = document.querySelector('{MAIN_SELECTOR}');
+    const collect = node => {{
+        if (!node.querySelector(skip)) return node.innerText || '';
+        return Array.from(node.children)
+            .filter(child => !child.matches(skip) && !['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE'].includes(child.tagName))
+            .map(collect).join('\\n');
+    }};
+    const page = document.body ? collect(document.body) : '';
+    const region = main ? collect(main) : '';
+    return [region, page];
+}}"""
+
+def get_extraction_settings():
+    """Extractor choice and main-content detection"""
+    return {
+        # auto: lxml for fetched HTML and innerText for rendered pages; or lxml, bs4, browser
+        'extractor': os.getenv('TEXT_EXTRACTOR', 'auto').lower(),
+        'main_content': os.getenv('EXTRACT_MAIN_CONTENT', 'true').lower() == 'true'
+    }
+
+def collapse(text):
+    return WHITESPACE.sub(' ', text).strip()
+
+def choose_region(region_text, page_text):
+    """Main region text when it is substantial, else the whole page"""
+    if len(region_text) >= MIN_MAIN_CHARS and len(region_text) >= MAIN_SHARE * len(page_text):
+        return region_text
+    return page_text
+
+class Bs4Extractor:
+    """The original BeautifulSoup html.parser extraction"""
+
+    name = 'bs4'
+
+    def from_html(self, content, main_content=False):
+        soup = BeautifulSoup(content, 'html.parser')
+
+        # Remove scripts, styles, and navigation
+        for script in soup(["script", "style", "nav", "header", "footer"]):
+            script.decompose()
+
+        text = soup.get_text()
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        return ' '.join(chunk for chunk in chunks if chunk)
+
+class LxmlExtractor:
+    """libxml2 parsing with boilerplate stripping and main-content detection"""
+
+    name = 'lxml'
+
+    def parse(self, content):
+        if isinstance(content, str):
+            # lxml refuses str input that carries an encoding declaration
+            content = content.encode('utf-8')
+        parser = lxml_html.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True)
+        return lxml_html.fromstring(content, parser=parser)
+
+    def from_html(self, content, main_content=True):
+        if not content or not content.strip():
+            return ''
+        try:
+            root = self.parse(content)
+        except (etree.ParserError, ValueError):
+            return ''
+        etree.strip_elements(root, *STRIP_TAGS, with_tail=False)
+        body = root.find('body')
+        if body is None:
+            body = root
+        page_text = self.text_of(body)
+        if not main_content:
+            return page_text
+        region = self.main_region(root, body)
+        if region is None or region is body:
+            return page_text
+        return choose_region(self.text_of(region), page_text)
+
+    def text_of(self, element):
+        return collapse(' '.join(element.itertext()))
+
+    def main_region(self, root, body):
+        """Marked-up main element, else the densest block"""
+        for xpath in MAIN_XPATHS:
+            found = root.xpath(xpath)
+            # Several <article>s is a listing, not one main article
+            if len(found) == 1 or (found and xpath != '//article'):
+                return max(found, key=lambda element: len(element.text_content()))
+        return self.densest_block(body)
+
+    def densest_block(self, body):
+        """Deepest block holding most of the page's non-link text, in one bottom-up pass"""
+        text_len = {}
+        link_len = {}
+        elements = [element for element in body.iter() if isinstance(element.tag, str)]
+        for element in reversed(elements):
+            own = len((element.text or '').strip())
+            text = own
+            links = own if element.tag == 'a' else 0
+            for child in element:
+                if not isinstance(child.tag, str):
+                    continue
+                tail = len((child.tail or '').strip())
+                text += text_len[child] + tail
+                links += link_len[child] if element.tag != 'a' else text_len[child] + tail
+            text_len[element] = text
+            link_len[element] = links
+
+        total = text_len.get(body, 0) - link_len.get(body, 0)
+        if total < MIN_MAIN_CHARS:
+            return None
+        best = None
+        for element in elements:
+            if element.tag in BLOCK_TAGS and text_len[element] - link_len[element] >= MAIN_SHARE * total:
+                # Pre-order, so later qualifying blocks are nested deeper
+                best = element
+        return best
+
+class BrowserExtractor:
+    """innerText computed in the page, skipping the page.content() round-trip"""
+
+    name = 'browser'
+
+    def from_page(self, page, main_content=True):
+        region, page_text = page.evaluate(INNER_TEXT_SCRIPT)
+        return self.combine(region, page_text, main_content)
+
+    async def from_page_async(self, page, main_content=True):
+        region, page_text = await page.evaluate(INNER_TEXT_SCRIPT)
+        return self.combine(region, page_text, main_content)
+
+    def combine(self, region, page_text, main_content):
+        page_text = collapse(page_text or '')
+        if not main_content:
+            return page_text
+        return choose_region(collapse(region or ''), page_text)
+
+EXTRACTORS = {
+    'bs4': Bs4Extractor,
+    'lxml': LxmlExtractor,
+    'browser': BrowserExtractor,
+}
+
+def get_extractor(name=None):
+    """Extractor for HTML strings; lxml unless configured otherwise or unavailable"""
+    name = name or get_extraction_settings()['extractor']
+    if name in ('auto', 'browser'):
+        name = 'lxml'
+    if name == 'lxml' and lxml_html is None:
+        name = 'bs4'
+    return EXTRACTORS.get(name, Bs4Extractor)()
+
+def uses_browser_text():
+    """True when rendered pages should be read with innerText"""
+    return get_extraction_settings()['extractor'] in ('auto', 'browser')
+
+def extract_text(content):
+    """Clean text of an HTML document with the configured extractor"""
+    settings = get_extraction_settings()
+    return get_extractor(settings['extractor']).from_html(content, settings['main_content'])
+
+def extract_page_text(page):
+    """Sync Playwright page to clean text, with innerText when enabled"""
+    if uses_browser_text():
+        return BrowserExtractor().from_page(page, get_extraction_settings()['main_content'])
+    return extract_text(page.content())
+
+async def extract_page_text_async(page):
+    """Async Playwright page to clean text, with innerText when enabled"""
+    if uses_browser_text():
+        return await BrowserExtractor().from_page_async(page, get_extraction_settings()['main_content'])
+    return await asyncio.to_thread(extract_text, await page.content())
+
+def parse_links(content, link_limit=200):
+    """Title and the first (href, anchor_text) links of an HTML document"""
+    if lxml_html is None:
+        soup = BeautifulSoup(content, 'html.parser')
+        title = soup.title.get_text(strip=True) if soup.title else ''
+        links = [(a.get('href'), a.get_text(' ', strip=True)[:200])
+                 for a in soup.find_all('a', href=True, limit=link_limit)]
+        return title, links
+    try:
+        root = LxmlExtractor().parse(content)
+    except (etree.ParserError, ValueError):
+        return '', []
+    title = root.findtext('.//title') or ''
+    links = []
+    for anchor in root.iter('a'):
+        href = anchor.get('href')
+        if href is None:
+            continue
+        links.append((href, collapse(anchor.text_content())[:200]))
+        if len(links) == link_limit:
+            break
+    return collapse(title), links
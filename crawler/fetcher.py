@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Tiered page fetcher: plain pooled HTTP first, Playwright only when needed
+The decision to render a host with a browser is remembered per host
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from crawler.extraction import parse_links
+from crawler.metrics import get_metrics
+from crawler.shared_files import update_json
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Markup that usually means the real content is rendered client-side
+SPA_SHELL_PATTERNS = [
+    re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.IGNORECASE),
+    re.compile(r'<(html|body|div)[^>]+ng-app', re.IGNORECASE),
+    re.compile(r'<noscript>[^<]*(enable|requires?) javascript', re.IGNORECASE),
+]
+
+def get_fetch_settings():
+    """Fetch tier configuration"""
+    shared_dir = os.getenv('SHARED_DIR', '/opt/render/project/src/shared')
+    return {
+        # auto: HTTP first with browser fallback, http: skip the JS heuristics, browser: always render
+        'mode': os.getenv('FETCH_MODE', 'auto').lower(),
+        'min_static_text': int(os.getenv('STATIC_MIN_TEXT', '200')),
+        'timeout': int(os.getenv('REQUEST_TIMEOUT', '60')),
+        'pool_size': int(os.getenv('HTTP_POOL_SIZE', '10')),
+        'modes_path': os.path.join(shared_dir, 'host_fetch_modes.json')
+    }
+
+class StaticPage:
+    """A page fetched without a browser"""
+
+    def __init__(self, url, status, headers, html, body):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.html = html
+        self.body = body
+
+def parse_static_page(html, link_limit=200):
+    """Title and the first (href, anchor_text) links of static HTML"""
+    return parse_links(html, link_limit)
+
+class TieredFetcher:
+    """Shared HTTP session plus a per-host memory of which tier works"""
+
+    def __init__(self, user_agent=None, settings=None):
+        self.settings = settings or get_fetch_settings()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.settings['pool_size'],
+                              pool_maxsize=self.settings['pool_size'])
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        self._lock = threading.Lock()
+        self.host_modes = self._load_modes()
+        # Hosts decided by this process, merged into the shared file on save
+        self._decided = {}
+        self.stats = {'http': 0, 'browser': 0, 'escalations': 0}
+
+    def _load_modes(self):
+        path = self.settings['modes_path']
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read host fetch modes: {e}")
+            return {}
+
+    def save_modes(self):
+        """Merge the hosts this process decided into the shared file, keeping other workers' decisions"""
+        path = self.settings['modes_path']
+        with self._lock:
+            decided = dict(self._decided)
+
+        def merge(current):
+            return {**(current or {}), **decided}
+
+        try:
+            modes = update_json(path, merge, indent=2)
+            with self._lock:
+                self.host_modes = {**modes, **self._decided}
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save host fetch modes: {e}")
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def should_try_static(self, url):
+        mode = self.settings['mode']
+        if mode in ('http', 'browser'):
+            return mode == 'http'
+        return self.host_modes.get(urlparse(url).netloc.lower()) != 'browser'
+
+    def needs_javascript(self, url):
+        """True when this host is known to need client-side rendering"""
+        return self.host_modes.get(urlparse(url).netloc.lower()) == 'browser'
+
+    def remember(self, url, mode):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            self.host_modes[host] = mode
+            self._decided[host] = mode
+
+    def fetch_static(self, url, response=None):
+        """GET a page over plain HTTP (or take an already fetched response); None if it isn't an HTML document"""
+        if response is None:
+            response = self.session.get(url, timeout=self.settings['timeout'])
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '')
+        if 'html' not in content_type.lower():
+            return None
+        return StaticPage(response.url, response.status_code, dict(response.headers),
+                          response.text, response.content)
+
+    def try_static(self, url, extract_text, timer=None, response=None):
+        """Return (StaticPage, clean_text) when plain HTTP is good enough, else None
+
+        A host whose pages need rendering is remembered so later pages go
+        straight to the browser. Pass a PageTimer to record fetch and extract
+        spans, and a requests response (an incremental crawl's conditional
+        GET) to use it instead of fetching the page again.
+        """
+        if not self.should_try_static(url):
+            return None
+        timer = timer or get_metrics().page(url)
+        try:
+            if response is not None:
+                static = self.fetch_static(url, response)
+            else:
+                with timer.span('http_fetch'):
+                    static = self.fetch_static(url)
+        except requests.HTTPError as e:
+            # Missing pages won't render any better in a browser, and a
+            # throttled host must be backed off, not hit again with Chromium
+            if e.response is not None and e.response.status_code in (404, 410, 429, 503):
+                raise
+            logger.debug(f"HTTP fetch failed for {url}: {e}")
+            return None
+        except requests.RequestException as e:
+            logger.debug(f"HTTP fetch failed for {url}: {e}")
+            return None
+        if static is None:
+            return None
+
+        with timer.span('extract'):
+            clean_text = extract_text(static.html)
+        if self.settings['mode'] != 'http':
+            head = static.html[:20000]
+            if any(pattern.search(head) for pattern in SPA_SHELL_PATTERNS):
+                logger.info(f"  🎭 {url} looks like a JavaScript app, using browser for this host")
+                self.remember(url, 'browser')
+                self.count('escalations')
+                return None
+            if len(clean_text) < self.settings['min_static_text']:
+                # A thin page only condemns the host if we haven't seen it work statically
+                if self.host_modes.get(urlparse(url).netloc.lower()) != 'http':
+                    self.remember(url, 'browser')
+                self.count('escalations')
+                return None
+
+        self.remember(url, 'http')
+        self.count('http')
+        return static, clean_text
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+def get_fetcher(user_agent=None):
+    """Process-wide tiered fetcher"""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = TieredFetcher(user_agent=user_agent)
+        return _fetcher
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Crawl frontier: URL canonicalization and a procurement-scored priority queue
+Spends the page budget on the links most likely to lead to RFPs
+"""
+
+import re
+import heapq
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
+
+# Keyword weights matched against the URL path and the link's anchor text
+PROCUREMENT_KEYWORDS = {
+    'rfp': 10, 'rfq': 10, 'rfi': 8, 'bid': 10, 'bids': 10, 'bidding': 10,
+    'solicitation': 10, 'solicitations': 10, 'proposal': 8, 'proposals': 8,
+    'procurement': 9, 'purchasing': 8, 'tender': 8, 'quote': 5, 'quotes': 5,
+    'vendor': 6, 'vendors': 6, 'contract': 5, 'contracts': 5, 'legal notice': 6,
+    'legal notices': 6, 'public notice': 5, 'invitation': 4,
+    'finance': 4, 'business office': 5, 'business': 3, 'board': 2, 'agenda': 2,
+    'minutes': 1, 'facilities': 2, 'construction': 3, 'transportation': 1,
+}
+
+# Sections that almost never carry procurement notices
+LOW_VALUE_KEYWORDS = {
+    'athletics': -6, 'sports': -6, 'calendar': -4, 'lunch': -6, 'menu': -5,
+    'menus': -5, 'gallery': -6, 'photos': -6, 'news': -2, 'staff directory': -4,
+    'login': -8, 'sign in': -8, 'password': -8, 'employment': -3, 'jobs': -3,
+    'translate': -8, 'facebook': -10, 'twitter': -10, 'instagram': -10,
+}
+
+# Links considered per page; the frontier decides which ones are worth a visit
+LINK_LIMIT = 200
+
+HINT_BONUS = 6
+DEPTH_PENALTY = 3
+
+# Query parameters that never change page content
+TRACKING_PARAMS = re.compile(r'^(utm_.*|fbclid|gclid|mc_cid|mc_eid|_ga|ref|sessionid|sid|phpsessid)$', re.IGNORECASE)
+
+# Not HTML pages; linked documents are handled separately
+SKIP_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.css', '.js',
+    '.zip', '.mp3', '.mp4', '.mov', '.avi', '.wav', '.ics', '.xml', '.json',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx'
+)
+
+WORD_SPLIT = re.compile(r'[^a-z0-9]+')
+
+def site_key(url):
+    """Host without a leading www., used to keep the crawl on one district"""
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+def normalize_url(href, base_url):
+    """Absolute, canonical form of a link, or None if it isn't crawlable"""
+    if not href:
+        return None
+    href = href.strip()
+    if href.startswith(('mailto:', 'tel:', 'javascript:', 'data:', '#')):
+        return None
+
+    parsed = urlparse(urljoin(base_url, href))
+    if parsed.scheme not in ('http', 'https'):
+        return None
+
+    host = (parsed.hostname or '').lower()
+    if not host:
+        return None
+    port = parsed.port
+    if port and not ((parsed.scheme == 'http' and port == 80) or (parsed.scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+
+    path = re.sub(r'/{2,}', '/', parsed.path or '/')
+    if len(path) > 1 and path.endswith('/'):
+        path = path[:-1]
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(key)
+    ))
+    return urlunparse((parsed.scheme.lower(), host, path, '', query, ''))
+
+def is_crawlable(url):
+    return not urlparse(url).path.lower().endswith(SKIP_EXTENSIONS)
+
+def keyword_score(text):
+    """Sum of keyword weights found in a URL path or anchor text"""
+    text = text.lower()
+    words = set(WORD_SPLIT.split(text))
+    score = 0
+    for table in (PROCUREMENT_KEYWORDS, LOW_VALUE_KEYWORDS):
+        for keyword, weight in table.items():
+            if (' ' in keyword and keyword in text) or keyword in words:
+                score += weight
+    return score
+
+def score_link(url, anchor_text='', depth=0, hint=False):
+    """Higher is crawled sooner"""
+    parsed = urlparse(url)
+    score = keyword_score(f"{parsed.path} {parsed.query}") + keyword_score(anchor_text or '')
+    if hint:
+        score += HINT_BONUS
+    return score - depth * DEPTH_PENALTY
+
+class Frontier:
+    """Deduplicating priority queue of (url, depth) for one district"""
+
+    def __init__(self, start_url, allowed=None):
+        self.site = site_key(start_url)
+        self.allowed = allowed
+        self._heap = []
+        self._seen = set()
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+    def seen(self, url):
+        return url in self._seen
+
+    def push(self, href, depth, base_url=None, anchor_text='', hint=False):
+        """Queue a link if it is new, on-site and looks like an HTML page"""
+        url = normalize_url(href, base_url or href)
+        if not url or url in self._seen or site_key(url) != self.site or not is_crawlable(url):
+            return False
+        if self.allowed and not self.allowed(url):
+            # Disallowed by robots.txt
+            self._seen.add(url)
+            return False
+        self._seen.add(url)
+        score = score_link(url, anchor_text, depth, hint)
+        # heapq is a min-heap; the counter keeps ties in discovery order
+        heapq.heappush(self._heap, (-score, self._counter, url, depth))
+        self._counter += 1
+        return True
+
+    def pop(self):
+        """Highest-scoring (url, depth)"""
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+def push_links(frontier, links, base_url, depth):
+    """Queue (href, anchor_text) pairs found on a page; bare hrefs are accepted too"""
+    for link in links[:LINK_LIMIT]:
+        href, text = (link, '') if isinstance(link, str) else (link[0], link[1])
+        frontier.push(href, depth, base_url=base_url, anchor_text=text)
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing spans, Claude latency and token histograms for a crawl run
+Written to a metrics file the dashboard serves at /metrics; stdlib only
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from crawler.shared_files import atomic_file, update_json
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds; a final +Inf bucket is implied
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# Page stages in crawl order: politeness wait, plain-HTTP fetch, browser
+# navigation, post-load wait, text/link extraction, Claude (queue included), run log write
+STAGES = ('delay', 'http_fetch', 'navigate', 'render_wait', 'extract', 'classify', 'save')
+
+def get_metrics_settings():
+    shared_dir = os.getenv('SHARED_DIR', '/opt/render/project/src/shared')
+    return {
+        'enabled': os.getenv('CRAWL_METRICS', 'true').lower() == 'true',
+        'path': os.getenv('METRICS_FILE', os.path.join(shared_dir, 'crawl_metrics.json')),
+        'history_path': os.getenv('METRICS_HISTORY_FILE', os.path.join(shared_dir, 'metrics_history.jsonl')),
+        'history_keep': int(os.getenv('METRICS_HISTORY_KEEP', '500'))
+    }
+
+def district_of(url):
+    """Metrics label for a URL: its host without a leading www."""
+    host = (url or '').split('://', 1)[-1].split('/', 1)[0].lower()
+    return host[4:] if host.startswith('www.') else host
+
+class Histogram:
+    """Fixed-bucket histogram; counts are per bucket, not cumulative"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def as_dict(self):
+        return {'counts': list(self.counts), 'sum': round(self.sum, 6), 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, bounds, data):
+        histogram = cls(tuple(bounds))
+        histogram.counts = list(data['counts'])
+        histogram.sum = data['sum']
+        histogram.count = data['count']
+        return histogram
+
+class PageTimer:
+    """Stage spans for one page; each span also lands in the run's histograms"""
+
+    def __init__(self, metrics, url):
+        self.metrics = metrics
+        self.district = district_of(url)
+        self.timings = {}
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def add(self, stage, seconds):
+        self.timings[stage] = round(self.timings.get(stage, 0) + seconds, 4)
+        self.metrics.observe_stage(stage, seconds, self.district)
+
+    def track(self, future, stage='classify'):
+        """Time a Future from now until it resolves"""
+        started = time.perf_counter()
+        future.add_done_callback(lambda _: self.add(stage, time.perf_counter() - started))
+
+class CrawlMetrics:
+    """Run-wide histograms and counters keyed by metric name and labels"""
+
+    def __init__(self, settings=None):
+        self.settings = settings or get_metrics_settings()
+        self.started_at = datetime.now().isoformat()
+        self.run_id = None
+        # Set by sharded workers, which each keep their own slice of the metrics file
+        self.worker_id = None
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, bounds=SECONDS_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(bounds)
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe_stage(self, stage, seconds, district):
+        self.observe('stage_seconds', seconds, stage=stage, district=district)
+
+    def page(self, url):
+        return PageTimer(self, url)
+
+    @contextmanager
+    def span(self, stage, url):
+        """Time a stage outside any one page (district-level waits, saves)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - started, district_of(url))
+
+    def record_api_call(self, district, seconds, usage=None, outcome='ok'):
+        """One Claude request: latency, outcome and, when the response has it, token usage"""
+        self.observe('claude_request_seconds', seconds, district=district)
+        self.increment('claude_requests', district=district, outcome=str(outcome))
+        if usage is not None:
+            input_tokens = getattr(usage, 'input_tokens', None) or 0
+            output_tokens = getattr(usage, 'output_tokens', None) or 0
+            self.observe('claude_input_tokens', input_tokens, TOKEN_BUCKETS, district=district)
+            self.observe('claude_output_tokens', output_tokens, TOKEN_BUCKETS, district=district)
+            # Prompt caching: the static instructions are written once, then read at a discount
+            for kind in ('cache_read', 'cache_creation'):
+                tokens = getattr(usage, f"{kind}_input_tokens", None) or 0
+                if tokens:
+                    self.observe(f"claude_{kind}_tokens", tokens, TOKEN_BUCKETS, district=district)
+
+    def merge_snapshot(self, snapshot):
+        """Add another process's histograms and counters (a metrics file or a shard's stats event)"""
+        with self._lock:
+            for item in snapshot.get('histograms', []):
+                key = (item['name'], tuple(sorted(item['labels'].items())))
+                histogram = Histogram.from_dict(item['bounds'], item)
+                if key in self._histograms:
+                    self._histograms[key].merge(histogram)
+                else:
+                    self._histograms[key] = histogram
+            for item in snapshot.get('counters', []):
+                key = (item['name'], tuple(sorted(item['labels'].items())))
+                self._counters[key] = self._counters.get(key, 0) + item['value']
+
+    def merged(self, name, group_by):
+        """{label value: Histogram} for one metric, summed over the other labels"""
+        merged = {}
+        with self._lock:
+            for (metric, labels), histogram in self._histograms.items():
+                if metric != name:
+                    continue
+                value = dict(labels).get(group_by, '')
+                if value not in merged:
+                    merged[value] = Histogram(histogram.bounds)
+                merged[value].merge(histogram)
+        return merged
+
+    def stage_summary(self):
+        """{stage: count, total, p50, p95} across districts, for logs and run history"""
+        summary = {}
+        for stage, histogram in self.merged('stage_seconds', 'stage').items():
+            summary[stage] = {
+                'count': histogram.count,
+                'total': round(histogram.sum, 3),
+                'p50': round(histogram.quantile(0.5), 3),
+                'p95': round(histogram.quantile(0.95), 3)
+            }
+        return summary
+
+    def api_summary(self):
+        latency = Histogram(SECONDS_BUCKETS)
+        for histogram in self.merged('claude_request_seconds', 'district').values():
+            latency.merge(histogram)
+        tokens = {direction: sum(h.sum for h in self.merged(f"claude_{direction}_tokens", 'district').values())
+                  for direction in ('input', 'output', 'cache_read', 'cache_creation')}
+        with self._lock:
+            errors = sum(value for (name, labels), value in self._counters.items()
+                         if name == 'claude_requests' and dict(labels).get('outcome') != 'ok')
+        return {
+            'calls': latency.count,
+            'errors': errors,
+            'input_tokens': int(tokens['input']),
+            'output_tokens': int(tokens['output']),
+            'cache_read_tokens': int(tokens['cache_read']),
+            'cache_creation_tokens': int(tokens['cache_creation']),
+            'p50': round(latency.quantile(0.5), 3) if latency.count else None,
+            'p95': round(latency.quantile(0.95), 3) if latency.count else None
+        }
+
+    def snapshot(self):
+        """JSON-ready metrics file contents"""
+        with self._lock:
+            histograms = [{'name': name, 'labels': dict(labels), 'bounds': list(histogram.bounds),
+                           **histogram.as_dict()}
+                          for (name, labels), histogram in sorted(self._histograms.items())]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'updated_at': datetime.now().isoformat(),
+            'histograms': histograms,
+            'counters': counters
+        }
+
+    def _merge_workers(self, current, snapshot):
+        """Metrics file with this worker's slice replaced and the top-level totals summed over all workers"""
+        same_run = current and current.get('run_id') == self.run_id
+        workers = current.get('workers', {}) if same_run else {}
+        workers[self.worker_id] = {'histograms': snapshot['histograms'], 'counters': snapshot['counters']}
+        total = CrawlMetrics(self.settings)
+        for worker in workers.values():
+            total.merge_snapshot(worker)
+        merged = total.snapshot()
+        merged.update(run_id=self.run_id, started_at=current['started_at'] if same_run else self.started_at,
+                      workers=workers)
+        return merged
+
+    def save(self):
+        """Atomically rewrite the metrics file; safe to call after every district
+
+        Sharded workers share the file: each merges its own snapshot in under
+        the file lock and the served histograms are the sum over workers.
+        """
+        if not self.settings['enabled']:
+            return
+        path = self.settings['path']
+        snapshot = self.snapshot()
+        try:
+            if self.worker_id is None:
+                update_json(path, lambda current: snapshot)
+            else:
+                update_json(path, lambda current: self._merge_workers(current, snapshot))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not write metrics file {path}: {e}")
+
+    def append_history(self):
+        """One line per run with per-stage p50/p95, kept to METRICS_HISTORY_KEEP runs"""
+        if not self.settings['enabled']:
+            return
+        path = self.settings['history_path']
+        entry = {
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'finished_at': datetime.now().isoformat(),
+            'stages': self.stage_summary(),
+            'claude': self.api_summary()
+        }
+        try:
+            lines = []
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    lines = f.readlines()
+            lines = lines[-(self.settings['history_keep'] - 1):] if self.settings['history_keep'] > 1 else []
+            lines.append(json.dumps(entry) + '\n')
+            with atomic_file(path) as f:
+                f.writelines(lines)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not append metrics history {path}: {e}")
+
+    def log_summary(self):
+        """Stages ordered by total time, so the hot stage is the first line"""
+        summary = self.stage_summary()
+        if not summary:
+            return
+        logger.info("⏱️ Stage timings (total / p50 / p95):")
+        for stage, stats in sorted(summary.items(), key=lambda item: -item[1]['total']):
+            logger.info(f"   {stage:<12} {stats['total']:>8.1f}s  {stats['p50']:>6.2f}s  {stats['p95']:>6.2f}s  "
+                        f"({stats['count']} spans)")
+        api = self.api_summary()
+        if api['calls']:
+            logger.info(f"🤖 Claude: {api['calls']} requests ({api['errors']} failed), p50 {api['p50']}s, "
+                        f"p95 {api['p95']}s, {api['input_tokens']} input / {api['output_tokens']} output tokens, "
+                        f"{api['cache_read_tokens']} read from the prompt cache")
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics():
+    """Process-wide metrics for the current run"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = CrawlMetrics()
+        return _metrics
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Per-host adaptive politeness: request spacing and concurrency tuned per host
+Fast, healthy hosts speed up additively; errors, slow responses and
+429/503 back off multiplicatively, never below the robots.txt crawl-delay
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+from crawler.metrics import get_metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Responses that mean "slow down" rather than "this page is broken"
+THROTTLE_STATUSES = (429, 503)
+
+def get_page_delay():
+    """PAGE_DELAY; the old CRAWL_DELAY (a sleep between districts, not requests) is no longer read"""
+    if os.getenv('CRAWL_DELAY') is not None:
+        logger.warning("⚠️ CRAWL_DELAY is no longer used and was ignored; "
+                       "set PAGE_DELAY for the delay between requests to a host")
+    return max(0.0, float(os.getenv('PAGE_DELAY', '1')))
+
+def get_politeness_settings():
+    """Per-host pacing; PAGE_DELAY is where every host starts"""
+    initial = get_page_delay()
+    return {
+        'adaptive': os.getenv('ADAPTIVE_POLITENESS', 'true').lower() == 'true',
+        'initial_delay': initial,
+        'min_delay': min(initial, max(0.0, float(os.getenv('POLITE_MIN_DELAY', '0.25')))),
+        'max_delay': max(initial, float(os.getenv('POLITE_MAX_DELAY', '30'))),
+        # Additive step taken off the delay after each healthy response
+        'delay_step': float(os.getenv('POLITE_DELAY_STEP', '0.1')),
+        'backoff': max(1.0, float(os.getenv('POLITE_BACKOFF', '2'))),
+        'max_concurrency': max(1, int(os.getenv('POLITE_MAX_CONCURRENCY', '4'))),
+        # A response slower than this (and than 3x the host's norm) counts as congestion
+        'slow_seconds': float(os.getenv('POLITE_SLOW_SECONDS', '5'))
+    }
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+def is_congestion_error(error):
+    """Timeouts and refused or reset connections; other failures say nothing about load"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)):
+        return True
+    # Playwright's TimeoutError and net::ERR_* navigation errors
+    return 'Timeout' in type(error).__name__ or 'net::ERR_' in str(error)
+
+def retry_after_seconds(headers):
+    """Seconds from a Retry-After header (delta or HTTP date), else None"""
+    value = (headers or {}).get('Retry-After') or (headers or {}).get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class HostState:
+    """Pacing for one host: delay between request starts and how many may overlap"""
+
+    __slots__ = ('delay', 'floor', 'concurrency', 'in_flight', 'next_start', 'cooldown_until',
+                 'latency', 'requests', 'throttled', 'backoffs')
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.floor = 0.0
+        self.concurrency = 1.0
+        self.in_flight = 0
+        self.next_start = 0.0
+        self.cooldown_until = 0.0
+        self.latency = None
+        self.requests = 0
+        self.throttled = 0
+        self.backoffs = 0
+
+    def as_dict(self):
+        return {
+            'delay': round(self.delay, 3),
+            'concurrency': int(self.concurrency),
+            'crawl_delay': self.floor or None,
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'backoffs': self.backoffs
+        }
+
+class Slot:
+    """One granted request; record() the response so the host's pacing can adapt"""
+
+    def __init__(self, url):
+        self.url = url
+        self.status = None
+        self.headers = None
+
+    def record(self, status, headers=None):
+        self.status = status
+        self.headers = headers
+
+class PolitenessScheduler:
+    """AIMD pacing per host, shared by every crawl in the process
+
+    A host's delay starts at PAGE_DELAY, drops by a fixed step after each
+    healthy response and multiplies by POLITE_BACKOFF on errors, timeouts
+    and slow responses. Concurrency grows by 1/n per healthy response and
+    halves on trouble. 429/503 also cool the host down for Retry-After.
+    Waiting on one host never holds up another.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or get_politeness_settings()
+        self.hosts = {}
+        self._cond = threading.Condition()
+        # (loop, asyncio.Event) of each acquire_async waiting for a release
+        self._async_waiters = set()
+
+    def _host(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(self.settings['initial_delay'])
+        return state
+
+    def _max_concurrency(self, state):
+        # A robots.txt crawl-delay asks for one request at a time
+        if not self.settings['adaptive'] or state.floor:
+            return 1
+        return self.settings['max_concurrency']
+
+    def set_crawl_delay(self, url, seconds):
+        """robots.txt crawl-delay: a floor the adaptive delay never goes under"""
+        if not seconds:
+            return
+        with self._cond:
+            state = self._host(host_of(url))
+            state.floor = float(seconds)
+            state.delay = max(state.delay, state.floor)
+            state.concurrency = 1.0
+
+    def ready_in(self, url):
+        """Seconds until the host would accept another request (0 if now)"""
+        with self._cond:
+            state = self.hosts.get(host_of(url))
+            if state is None:
+                return 0.0
+            return max(0.0, state.next_start - time.monotonic(), state.cooldown_until - time.monotonic())
+
+    def try_acquire(self, url):
+        """(True, 0) with a slot taken, or (False, seconds to wait; None means until a release)"""
+        with self._cond:
+            state = self._host(host_of(url))
+            now = time.monotonic()
+            if state.in_flight >= int(state.concurrency):
+                return False, None
+            ready = max(state.next_start, state.cooldown_until)
+            if ready > now:
+                return False, ready - now
+            state.in_flight += 1
+            state.requests += 1
+            state.next_start = now + state.delay
+            return True, 0.0
+
+    def acquire(self, url):
+        with self._cond:
+            while True:
+                granted, wait = self.try_acquire(url)
+                if granted:
+                    return
+                self._cond.wait(timeout=wait if wait is not None else 1.0)
+
+    async def acquire_async(self, url):
+        """acquire() for the async engine: waits on an event release() sets, or until the host is ready"""
+        loop = asyncio.get_running_loop()
+        while True:
+            released = asyncio.Event()
+            waiter = (loop, released)
+            with self._cond:
+                granted, wait = self.try_acquire(url)
+                if granted:
+                    return
+                self._async_waiters.add(waiter)
+            try:
+                await asyncio.wait_for(released.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._cond:
+                    self._async_waiters.discard(waiter)
+
+    def release(self, url, seconds, status=None, error=None, headers=None):
+        """Free the slot and adapt the host's pacing to how the request went"""
+        with self._cond:
+            state = self._host(host_of(url))
+            state.in_flight = max(0, state.in_flight - 1)
+            self._adapt(state, url, seconds, status, error, headers)
+            self._cond.notify_all()
+            # Releases come from worker threads as well as the event loop
+            for loop, released in self._async_waiters:
+                loop.call_soon_threadsafe(released.set)
+
+    def backed_off(self, state):
+        settings = self.settings
+        return min(settings['max_delay'], max(state.delay * settings['backoff'], settings['min_delay'] or 1))
+
+    def _adapt(self, state, url, seconds, status, error, headers):
+        settings = self.settings
+        if status in THROTTLE_STATUSES:
+            # Honoured even with ADAPTIVE_POLITENESS off
+            retry_after = retry_after_seconds(headers)
+            state.throttled += 1
+            state.concurrency = 1.0
+            if settings['adaptive']:
+                state.delay = self.backed_off(state)
+            cooldown = min(retry_after if retry_after is not None else max(state.delay, 1), 10 * settings['max_delay'])
+            state.cooldown_until = max(state.cooldown_until, time.monotonic() + cooldown)
+            logger.warning(f"🐢 {host_of(url)} answered {status}, cooling down {cooldown:.1f}s "
+                           f"(delay now {state.delay:.2f}s)")
+            return
+        if not settings['adaptive'] or (status is None and error is None):
+            return
+        slow = (seconds > settings['slow_seconds']
+                and (state.latency is None or seconds > 3 * state.latency))
+        if error or status >= 500 or slow:
+            state.backoffs += 1
+            state.concurrency = max(1.0, state.concurrency / 2)
+            state.delay = self.backed_off(state)
+            logger.info(f"  🐢 Slowing {host_of(url)} to {state.delay:.2f}s between requests")
+            return
+        state.latency = seconds if state.latency is None else 0.8 * state.latency + 0.2 * seconds
+        floor = max(settings['min_delay'], state.floor)
+        state.delay = max(floor, state.delay - settings['delay_step'])
+        if state.delay <= floor:
+            state.concurrency = min(self._max_concurrency(state), state.concurrency + 1 / state.concurrency)
+
+    @staticmethod
+    def outcome(slot, error):
+        """(status, headers, error) for a finished slot, reading HTTP errors the fetcher raised"""
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code, error.response.headers, None
+        if error is not None:
+            return slot.status, slot.headers, error if is_congestion_error(error) else None
+        return slot.status or 200, slot.headers, None
+
+    @contextmanager
+    def slot(self, url, timer=None):
+        """Wait for the host (timed as 'delay'), then hold a request slot for the block"""
+        with (timer.span('delay') if timer else get_metrics().span('delay', url)):
+            self.acquire(url)
+        slot = Slot(url)
+        started = time.perf_counter()
+        error = None
+        try:
+            yield slot
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            status, headers, error = self.outcome(slot, error)
+            self.release(url, time.perf_counter() - started, status, error, headers)
+
+    @asynccontextmanager
+    async def slot_async(self, url, timer=None):
+        with (timer.span('delay') if timer else get_metrics().span('delay', url)):
+            await self.acquire_async(url)
+        slot = Slot(url)
+        started = time.perf_counter()
+        error = None
+        try:
+            yield slot
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            status, headers, error = self.outcome(slot, error)
+            self.release(url, time.perf_counter() - started, status, error, headers)
+
+    def summary(self):
+        with self._cond:
+            return {host: state.as_dict() for host, state in sorted(self.hosts.items())}
+
+    def log_summary(self):
+        for host, state in self.summary().items():
+            logger.info(f"🚦 {host}: {state['requests']} requests, delay {state['delay']}s, "
+                        f"concurrency {state['concurrency']}, {state['throttled']} throttled, "
+                        f"{state['backoffs']} backoffs")
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """Process-wide politeness scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PolitenessScheduler()
+        return _scheduler
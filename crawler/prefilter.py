@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Cheap local pre-filter in front of the Claude classifier
+Scores page text on procurement vocabulary; clearly irrelevant pages are
+labeled locally instead of spending an API call
+"""
+
+import os
+import re
+import json
+import math
+import logging
+import argparse
+import threading
+
+from crawler.records import is_unclassified
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (feature, pattern, hand-tuned weight); counts are capped at MAX_FEATURE_COUNT
+FEATURES = [
+    ('rfp_acronym', re.compile(r'\b(rfp|rfq|rfi|rfqu?|ifb|itb)s?\b', re.IGNORECASE), 4.0),
+    ('request_for', re.compile(r'\brequests?\s+for\s+(proposals?|quotes?|quotations?|qualifications?|information|bids?)\b', re.IGNORECASE), 5.0),
+    ('invitation_to_bid', re.compile(r'\b(invitations?\s+(to|for)\s+bids?|sealed\s+(bids?|proposals?))\b', re.IGNORECASE), 5.0),
+    ('solicitation', re.compile(r'\bsolicitations?\b', re.IGNORECASE), 3.0),
+    ('bid_document', re.compile(r'\b(addend(um|a)|pre-?bid|scope\s+of\s+(work|services)|bid\s+(tabulation|opening|bond))\b', re.IGNORECASE), 3.0),
+    ('bid', re.compile(r'\b(bids?|bidding|bidders?)\b', re.IGNORECASE), 2.0),
+    ('proposal', re.compile(r'\bproposals?\b', re.IGNORECASE), 1.5),
+    ('procurement', re.compile(r'\b(procurement|purchasing)\b', re.IGNORECASE), 2.0),
+    ('deadline', re.compile(r'\b(deadline|due\s+(date|by|on)|no\s+later\s+than|closing\s+date|submittals?|submissions?)\b', re.IGNORECASE), 2.0),
+    ('vendor', re.compile(r'\b(vendors?|contractors?|suppliers?|consultants?)\b', re.IGNORECASE), 1.0),
+    ('legal_notice', re.compile(r'\b(legal|public)\s+notices?\b', re.IGNORECASE), 2.0),
+    ('lunch_menu', re.compile(r'\b(lunch|breakfast|menus?|nutrition)\b', re.IGNORECASE), -2.0),
+    ('athletics', re.compile(r'\b(athletics?|varsity|football|basketball|volleyball|soccer|baseball|softball|tournament)\b', re.IGNORECASE), -2.0),
+    ('calendar', re.compile(r'\b(calendar|upcoming\s+events|spirit\s+week|field\s+trip)\b', re.IGNORECASE), -1.0),
+    ('enrollment', re.compile(r'\b(enrollment|registration|kindergarten|graduation|report\s+cards?)\b', re.IGNORECASE), -1.0),
+    ('employment', re.compile(r'\b(job\s+openings?|employment\s+opportunities|apply\s+now|substitute\s+teachers?)\b', re.IGNORECASE), -1.0),
+]
+
+# A page with none of the procurement features gets this instead
+NO_PROCUREMENT_TERMS = ('no_procurement_terms', -2.0)
+
+# Features strong enough that the page always goes to Claude (hand weights only)
+STRONG_FEATURES = {'rfp_acronym', 'request_for', 'invitation_to_bid', 'solicitation', 'bid_document'}
+
+MAX_FEATURE_COUNT = 3
+
+def get_prefilter_settings():
+    """Pre-filter mode, threshold and optional trained model"""
+    shared_dir = os.getenv('SHARED_DIR', '/opt/render/project/src/shared')
+    threshold = os.getenv('PREFILTER_THRESHOLD', '')
+    return {
+        # on: skip clearly negative pages, shadow: score and record only, off: disabled
+        'mode': os.getenv('PREFILTER', 'on').lower(),
+        'threshold': float(threshold) if threshold else None,
+        'model_path': os.getenv('PREFILTER_MODEL', os.path.join(shared_dir, 'prefilter_model.json')),
+        'results_path': os.path.join(shared_dir, 'rfp_scan_results.json')
+    }
+
+# Used when neither PREFILTER_THRESHOLD nor the trained model sets one
+DEFAULT_THRESHOLD = -3.0
+
+def extract_features(text):
+    """Capped match counts for each feature present in the text"""
+    features = {}
+    for name, pattern, weight in FEATURES:
+        count = 0
+        for _ in pattern.finditer(text):
+            count += 1
+            if count == MAX_FEATURE_COUNT:
+                break
+        if count:
+            features[name] = count
+    if not any(weight > 0 and name in features for name, _, weight in FEATURES):
+        features[NO_PROCUREMENT_TERMS[0]] = 1
+    return features
+
+def hand_weights():
+    weights = {name: weight for name, _, weight in FEATURES}
+    weights[NO_PROCUREMENT_TERMS[0]] = NO_PROCUREMENT_TERMS[1]
+    return weights
+
+class Verdict:
+    """Pre-filter outcome for one page"""
+
+    def __init__(self, prefilter, score, features, below_threshold):
+        self.prefilter = prefilter
+        self.score = score
+        self.features = features
+        self.below_threshold = below_threshold
+
+    @property
+    def skip(self):
+        """True when the page should be labeled locally instead of sent to Claude"""
+        return self.below_threshold and self.prefilter.mode == 'on'
+
+    def local_result(self):
+        """Negative claude_result-shaped label for a skipped page; counts the avoided call"""
+        self.prefilter.count('avoided_calls')
+        return json.dumps({
+            "is_rfp": False,
+            "summary": f"Skipped by local pre-filter (score {self.score:.1f})",
+            "category": "Other",
+            "submission_deadline": "",
+            "submission_location": "",
+            "contact_email": "",
+            "contact_phone": "",
+            "budget_range": "",
+            "confidence": "Low",
+            "prefiltered": True
+        })
+
+    def as_dict(self):
+        """Stored on the crawl result so past runs can be re-evaluated"""
+        return {
+            'score': round(self.score, 3),
+            'features': self.features,
+            'skipped': self.skip
+        }
+
+class Prefilter:
+    """Weighted feature scorer; a trained model replaces the hand weights when present"""
+
+    def __init__(self, mode='on', threshold=None, model=None):
+        self.mode = mode
+        self.model = model
+        if model:
+            self.weights = model['weights']
+            self.bias = model.get('bias', 0.0)
+        else:
+            self.weights = hand_weights()
+            self.bias = 0.0
+        if threshold is None:
+            threshold = model.get('threshold', DEFAULT_THRESHOLD) if model else DEFAULT_THRESHOLD
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.stats = {'screened': 0, 'below_threshold': 0, 'avoided_calls': 0}
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def score(self, features):
+        return self.bias + sum(self.weights.get(name, 0.0) * count for name, count in features.items())
+
+    def is_below(self, features, score):
+        # Explicit RFP vocabulary always gets a second opinion under the hand weights
+        if not self.model and STRONG_FEATURES & features.keys():
+            return False
+        return score <= self.threshold
+
+    def screen(self, content, url=''):
+        """Score a page and decide whether it can skip the API"""
+        features = extract_features(content)
+        score = self.score(features)
+        below = self.is_below(features, score)
+        self.count('screened')
+        if below:
+            self.count('below_threshold')
+        return Verdict(self, score, features, below)
+
+def load_model(path):
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read pre-filter model {path}: {e}")
+        return None
+
+_prefilter = None
+_prefilter_lock = threading.Lock()
+
+def get_prefilter():
+    """Process-wide pre-filter, or None when PREFILTER=off"""
+    global _prefilter
+    settings = get_prefilter_settings()
+    if settings['mode'] == 'off':
+        return None
+    with _prefilter_lock:
+        if _prefilter is None:
+            model = load_model(settings['model_path'])
+            _prefilter = Prefilter(settings['mode'], settings['threshold'], model)
+            logger.info(f"🔎 Pre-filter {settings['mode']} "
+                        f"({'trained model' if model else 'keyword weights'}, threshold {_prefilter.threshold})")
+        return _prefilter
+
+def screen_page(content, url=''):
+    """Verdict for a page, or None when the pre-filter is off"""
+    prefilter = get_prefilter()
+    return prefilter.screen(content, url) if prefilter else None
+
+# --- Offline evaluation and training against stored raw_results ---
+
+def labeled_examples(paths):
+    """([(features, is_rfp)], skipped) for results Claude actually classified
+
+    Only pages stored with their pre-filter features are used: the page text
+    isn't kept, and title+URL features would train a different model than
+    the one screen() scores. skipped counts the classified pages left out.
+    """
+    examples = []
+    skipped = 0
+    for path in paths:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        for result in data.get('raw_results', []):
+            stored = result.get('prefilter') or {}
+            if stored.get('skipped'):
+                continue
+            try:
+                parsed = json.loads(result.get('claude_result') or '')
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(parsed, dict) or parsed.get('prefiltered'):
+                continue
+            if is_unclassified(parsed):
+                continue
+            features = stored.get('features')
+            if features is None:
+                # Runs from before the pre-filter (or with PREFILTER=off) stored no features
+                skipped += 1
+                continue
+            examples.append((features, bool(parsed.get('is_rfp'))))
+    return examples, skipped
+
+def evaluate(prefilter, examples):
+    """How many calls a threshold avoids and how many RFPs it would lose"""
+    positives = sum(1 for _, label in examples if label)
+    skipped = missed = 0
+    for features, label in examples:
+        if prefilter.is_below(features, prefilter.score(features)):
+            skipped += 1
+            missed += label
+    return {
+        'pages': len(examples),
+        'rfps': positives,
+        'would_skip': skipped,
+        'skip_rate': round(skipped / len(examples), 3) if examples else 0.0,
+        'missed_rfps': missed,
+        'recall': round(1 - missed / positives, 3) if positives else 1.0
+    }
+
+def train(examples, epochs=300, learning_rate=0.1, l2=0.001, target_recall=1.0):
+    """Logistic regression over the feature counts, plus the highest threshold keeping target recall"""
+    names = sorted({name for features, _ in examples for name in features} | set(hand_weights()))
+    weights = {name: 0.0 for name in names}
+    bias = 0.0
+    for _ in range(epochs):
+        for features, label in examples:
+            z = bias + sum(weights[name] * count for name, count in features.items())
+            error = 1 / (1 + math.exp(-max(-30, min(30, z)))) - label
+            bias -= learning_rate * error
+            for name, count in features.items():
+                weights[name] -= learning_rate * (error * count + l2 * weights[name])
+
+    scores = sorted(bias + sum(weights.get(name, 0.0) * count for name, count in features.items())
+                    for features, label in examples if label)
+    allowed_misses = int(len(scores) * (1 - target_recall))
+    # Just under the lowest positive we are not allowed to lose
+    threshold = scores[allowed_misses] - 0.5 if scores else DEFAULT_THRESHOLD
+    return {
+        'weights': {name: round(weight, 4) for name, weight in weights.items()},
+        'bias': round(bias, 4),
+        'threshold': round(threshold, 4),
+        'trained_on': len(examples)
+    }
+
+def main():
+    settings = get_prefilter_settings()
+    parser = argparse.ArgumentParser(description="Evaluate or train the local pre-filter against past results")
+    parser.add_argument('command', choices=['evaluate', 'train'])
+    parser.add_argument('results', nargs='*', default=[settings['results_path']],
+                        help="rfp_scan_results.json files from past runs")
+    parser.add_argument('--threshold', type=float, default=settings['threshold'])
+    parser.add_argument('--model', default=settings['model_path'])
+    parser.add_argument('--target-recall', type=float, default=1.0)
+    args = parser.parse_args()
+
+    examples, skipped = labeled_examples(args.results)
+    if skipped:
+        logger.warning(f"⚠️ Skipped {skipped} classified pages stored without pre-filter features "
+                       f"(from runs with PREFILTER=off or before it existed)")
+    if not examples:
+        logger.error("❌ No Claude-labeled pages with pre-filter features found in the given results")
+        return 1
+
+    if args.command == 'train':
+        model = train(examples, target_recall=args.target_recall)
+        os.makedirs(os.path.dirname(args.model) or '.', exist_ok=True)
+        with open(args.model, 'w') as f:
+            json.dump(model, f, indent=2)
+        logger.info(f"✅ Trained on {model['trained_on']} pages, threshold {model['threshold']}, saved to {args.model}")
+        print(json.dumps(evaluate(Prefilter(model=model), examples), indent=2))
+        return 0
+
+    model = load_model(args.model)
+    report = {'keyword_weights': evaluate(Prefilter(threshold=args.threshold), examples)}
+    if model:
+        report['trained_model'] = evaluate(Prefilter(threshold=args.threshold, model=model), examples)
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Classification prompts: cached static instructions plus a token-budgeted page excerpt
+The category list and JSON schema go in a system block marked for prompt
+caching; each page contributes its opening and the windows around procurement
+terms, deadlines and contacts, ranked and filled up to PROMPT_CONTENT_TOKENS
+"""
+
+import os
+import re
+import logging
+import threading
+
+from crawler.prefilter import FEATURES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump when the instructions or the excerpting change so cached results are not reused
+PROMPT_VERSION = 'v2'
+
+# Rough English average; only used for budgeting, the API reports real usage
+CHARS_PER_TOKEN = 4
+
+STATIC_INSTRUCTIONS = """You analyze school district website pages to find RFP (Request for Proposal) opportunities.
+
+Look for RFPs related to:
+- Technology services and equipment
+- Construction and facilities
+- Transportation services
+- Food services and catering
+- Educational services and curriculum
+- Insurance and employee benefits
+- Professional services (legal, accounting, consulting)
+- Maintenance and facility services
+- Security services
+- Any other procurement opportunities
+
+Page text may be an excerpt: passages are separated by "[...]" where text was left out.
+
+For each page return one JSON object:
+{
+  "is_rfp": true or false,
+  "summary": "Brief summary of the RFP or page content",
+  "category": "Technology|Construction|Transportation|Food Services|Professional Services|Insurance|Other",
+  "submission_deadline": "Deadline date if found, otherwise empty string",
+  "submission_location": "Where to submit if found, otherwise empty string",
+  "contact_email": "Contact email if found, otherwise empty string",
+  "contact_phone": "Contact phone if found, otherwise empty string",
+  "budget_range": "Budget information if found, otherwise empty string",
+  "confidence": "High|Medium|Low based on how certain you are this is an RFP"
+}
+
+Return JSON only (no other text): the object for a single page, or an array with one object per page, in page order, when several pages are given."""
+
+# Details the extraction needs, on top of the pre-filter's procurement vocabulary
+DETAIL_PATTERNS = [
+    (re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+'), 3.0),
+    (re.compile(r'\(?\b\d{3}\)?[-.\s]\d{3}[-.\s]\d{4}\b'), 2.0),
+    (re.compile(r'\b(jan|feb|mar|apr|may|jun|jul|aug|sept?|oct|nov|dec)[a-z]*\.?\s+\d{1,2}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b',
+                re.IGNORECASE), 2.0),
+    (re.compile(r'\$\s?\d[\d,]*|\bbudget\b', re.IGNORECASE), 2.0),
+    (re.compile(r'\b(contact|submit(ted)?|deliver(ed)?|mail(ed)?|attention|attn)\b', re.IGNORECASE), 1.0),
+]
+
+WINDOW_PATTERNS = [(pattern, weight) for _, pattern, weight in FEATURES if weight > 0] + DETAIL_PATTERNS
+
+GAP = '\n[...]\n'
+
+def get_prompt_settings():
+    """Per-page excerpt budget and instruction caching"""
+    return {
+        'content_tokens': max(200, int(os.getenv('PROMPT_CONTENT_TOKENS', '1200'))),
+        'window_chars': max(200, int(os.getenv('PROMPT_WINDOW_CHARS', '600'))),
+        # Always kept: the title and opening usually say what the page is
+        'head_chars': max(0, int(os.getenv('PROMPT_HEAD_CHARS', '600'))),
+        'cache_instructions': os.getenv('PROMPT_CACHE', 'true').lower() == 'true'
+    }
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def window_scores(text, size):
+    """Score per fixed-size window: weighted hits of procurement and contact patterns"""
+    scores = [0.0] * ((len(text) + size - 1) // size)
+    for pattern, weight in WINDOW_PATTERNS:
+        for match in pattern.finditer(text):
+            scores[match.start() // size] += weight
+    return scores
+
+def snap(text, position, forward):
+    """Move a cut to the nearest whitespace so words aren't split"""
+    if position <= 0 or position >= len(text):
+        return max(0, min(position, len(text)))
+    limit = 40
+    if forward:
+        end = text.find(' ', position, position + limit)
+        return end if end != -1 else position
+    start = text.rfind(' ', max(0, position - limit), position)
+    return start + 1 if start != -1 else position
+
+def select_excerpt(text, budget_tokens, settings=None):
+    """The page text if it fits the budget, else its opening plus the best-scoring windows in page order"""
+    settings = settings or get_prompt_settings()
+    budget = budget_tokens * CHARS_PER_TOKEN
+    if len(text) <= budget:
+        return text
+    # Small budgets still get the opening and a few windows
+    size = min(settings['window_chars'], budget // 4)
+    head = min(settings['head_chars'], budget // 4)
+    scores = window_scores(text, size)
+
+    # Highest score first; ties go to the earlier window
+    ranked = sorted((i for i, score in enumerate(scores) if score > 0 and (i + 1) * size > head),
+                    key=lambda i: (-scores[i], i))
+    spans = [(0, head)] if head else []
+    used = head
+    for i in ranked:
+        start, end = max(head, i * size), min(len(text), (i + 1) * size)
+        if used + (end - start) + len(GAP) > budget:
+            continue
+        spans.append((start, end))
+        used += end - start + len(GAP)
+    if len(spans) <= 1:
+        # No procurement terms past the opening: the page's start is as good as anything
+        return text[:snap(text, budget, False)]
+    if head:
+        # Budget the windows didn't need goes to a longer opening
+        spans[0] = (0, head + budget - used)
+
+    # Back in page order, with neighbouring windows joined
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return GAP.join(text[snap(text, start, True):snap(text, end, False)].strip() for start, end in merged)
+
+class PromptStats:
+    """Page text offered versus sent, in estimated tokens, for the run stats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pages = 0
+        self.excerpted = 0
+        self.source_tokens = 0
+        self.sent_tokens = 0
+
+    def record(self, source, sent):
+        with self._lock:
+            self.pages += 1
+            self.excerpted += len(sent) < len(source)
+            self.source_tokens += estimate_tokens(source)
+            self.sent_tokens += estimate_tokens(sent)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'pages': self.pages,
+                'excerpted': self.excerpted,
+                'source_tokens': self.source_tokens,
+                'sent_tokens': self.sent_tokens
+            }
+
+RUN_TOTALS = PromptStats()
+
+class Prompt:
+    """A classification request: cacheable system block plus the per-page user message"""
+
+    __slots__ = ('system', 'text', 'pages')
+
+    def __init__(self, system, text, pages):
+        self.system = system
+        self.text = text
+        self.pages = pages
+
+    def request(self):
+        """Keyword arguments for client.messages.create()"""
+        return {'system': self.system, 'messages': [{'role': 'user', 'content': self.text}]}
+
+def system_blocks(settings):
+    """system as a list of TextBlockParam; cache_control needs anthropic>=0.42 (requirements.txt)"""
+    block = {'type': 'text', 'text': STATIC_INSTRUCTIONS}
+    if settings['cache_instructions']:
+        # Identical on every call, so the provider can serve it from its prompt cache
+        block['cache_control'] = {'type': 'ephemeral'}
+    return [block]
+
+def page_section(content, url, budget_tokens, settings):
+    excerpt = select_excerpt(content, budget_tokens, settings)
+    RUN_TOTALS.record(content, excerpt)
+    return f"Page content from {url}:\n{excerpt}"
+
+def build_prompt(content, url, settings=None):
+    """Prompt classifying one page"""
+    settings = settings or get_prompt_settings()
+    section = page_section(content, url, settings['content_tokens'], settings)
+    return Prompt(system_blocks(settings), f"{section}\n\nReturn the JSON object only.", 1)
+
+def build_batch_prompt(pages, settings=None):
+    """Prompt classifying several (content, url) pages, each with its own excerpt budget"""
+    settings = settings or get_prompt_settings()
+    sections = [f"### PAGE {i}\n{page_section(content, url, settings['content_tokens'], settings)}"
+                for i, (content, url) in enumerate(pages, 1)]
+    text = "\n\n".join(sections)
+    return Prompt(system_blocks(settings), f"{text}\n\nReturn a JSON array with exactly {len(pages)} objects.",
+                  len(pages))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Typed crawl result records
+A page's claude_result is parsed once, when its record is made; RFP checks,
+categories and dashboard entries read the parsed fields from then on
+"""
+
+import re
+import json
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Last resort for a reply that isn't valid JSON but still says it is an RFP
+IS_RFP_PATTERN = re.compile(r'"is_rfp"\s*:\s*true', re.IGNORECASE)
+
+# Dashboard entry key -> classification field
+ENTRY_FIELDS = {
+    'deadline': 'submission_deadline',
+    'contact_email': 'contact_email',
+    'contact_phone': 'contact_phone',
+    'budget_range': 'budget_range',
+    'submission_location': 'submission_location'
+}
+
+# Summary prefix of the placeholder recorded when Claude could not be used
+UNCLASSIFIED_SUMMARY = 'Error processing with Claude'
+
+def is_unclassified(fields):
+    """True for the placeholder of a page Claude never classified (see crawl_with_playwright.error_result)"""
+    if not isinstance(fields, dict):
+        return False
+    return fields.get('unclassified') is True or str(fields.get('summary', '')).startswith(UNCLASSIFIED_SUMMARY)
+
+def parse_classification(claude_result):
+    """(fields, is_rfp) from a claude_result; fields is None when it could not be parsed"""
+    if isinstance(claude_result, dict):
+        fields = claude_result
+    elif isinstance(claude_result, str):
+        try:
+            fields = json.loads(claude_result)
+        except json.JSONDecodeError:
+            return None, bool(IS_RFP_PATTERN.search(claude_result))
+    else:
+        # Not classified (a skipped page, or a document whose call failed)
+        return None, False
+    if not isinstance(fields, dict):
+        return None, False
+    is_rfp = fields.get('is_rfp', False)
+    if isinstance(is_rfp, str):
+        is_rfp = is_rfp.strip().lower() == 'true'
+    return fields, is_rfp is True
+
+class CrawlRecord:
+    """One crawled page or document with its classification already parsed"""
+
+    __slots__ = ('url', 'title', 'depth', 'method', 'crawl_time', 'source_url', 'is_rfp', 'fields')
+
+    def __init__(self, url, title, depth, method, crawl_time, source_url, is_rfp, fields):
+        self.url = url
+        self.title = title
+        self.depth = depth
+        self.method = method
+        self.crawl_time = crawl_time
+        self.source_url = source_url
+        self.is_rfp = is_rfp
+        self.fields = fields
+
+    @classmethod
+    def from_result(cls, result, timestamp=None):
+        fields, is_rfp = parse_classification(result.get('claude_result'))
+        return cls(
+            result['url'],
+            result.get('title', 'Unknown Title'),
+            result.get('depth', 0),
+            result.get('method', 'playwright'),
+            result.get('crawl_timestamp', timestamp),
+            result.get('source_url'),
+            is_rfp,
+            fields
+        )
+
+    @property
+    def unclassified(self):
+        """Classification failed: neither an RFP nor evidence that the page isn't one"""
+        return is_unclassified(self.fields)
+
+    @property
+    def category(self):
+        if self.fields is None:
+            return 'Other'
+        return self.fields.get('category', 'Other')
+
+    def rfp_entry(self):
+        """Dashboard record for an RFP, or None"""
+        if not self.is_rfp:
+            return None
+        if self.fields is None:
+            # Flagged, but the reply was malformed JSON
+            entry = {
+                'url': self.url,
+                'title': self.title,
+                'summary': 'RFP detected but details could not be parsed',
+                'category': 'Other',
+                'confidence': 'Low'
+            }
+            entry.update(dict.fromkeys(ENTRY_FIELDS, ''))
+        else:
+            entry = {
+                'url': self.url,
+                'title': self.title,
+                'summary': self.fields.get('summary', 'No summary available'),
+                'category': self.category,
+                'confidence': self.fields.get('confidence', 'Medium')
+            }
+            entry.update({key: self.fields.get(field, '') for key, field in ENTRY_FIELDS.items()})
+        entry.update({'crawl_time': self.crawl_time, 'depth': self.depth, 'method': self.method})
+        if self.source_url:
+            # A linked document: the page a reader would start from
+            entry['source_url'] = self.source_url
+        return entry
+
+def count_rfps(results):
+    """RFPs among raw page results, each parsed once"""
+    return sum(1 for result in results if CrawlRecord.from_result(result).is_rfp)
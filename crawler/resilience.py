@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Time budgets, jittered retries and circuit breakers for navigations and Claude calls
+Keeps one hanging district or a failing API from eating the whole run
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+
+import requests
+
+from crawler.politeness import host_of, is_congestion_error
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def get_resilience_settings():
+    """Budgets are in seconds; 0 means unlimited"""
+    return {
+        'page_budget': float(os.getenv('PAGE_TIME_BUDGET', '90')),
+        'district_budget': float(os.getenv('DISTRICT_TIME_BUDGET', '900')),
+        'navigation_timeout': float(os.getenv('NAVIGATION_TIMEOUT', '60')),
+        'navigation_retries': max(0, int(os.getenv('NAVIGATION_RETRIES', '2'))),
+        'retry_base_delay': float(os.getenv('RETRY_BASE_DELAY', '1')),
+        'retry_max_delay': float(os.getenv('RETRY_MAX_DELAY', '30')),
+        'breaker_failures': max(1, int(os.getenv('BREAKER_FAILURES', '5'))),
+        'breaker_cooldown': float(os.getenv('BREAKER_COOLDOWN', '60')),
+        'classify_requeues': max(0, int(os.getenv('CLASSIFY_REQUEUES', '2')))
+    }
+
+class BudgetExceeded(Exception):
+    """A page or district ran out of its time budget"""
+
+class CircuitOpenError(Exception):
+    """Work refused because the target's circuit breaker is open"""
+
+def backoff_delay(attempt, settings=None):
+    """Full-jitter exponential backoff: uniform in [0, min(max, base * 2^attempt)]"""
+    settings = settings or get_resilience_settings()
+    return random.uniform(0, min(settings['retry_max_delay'], settings['retry_base_delay'] * 2 ** attempt))
+
+def is_host_failure(error):
+    """Errors that say the host is struggling, as opposed to a missing or broken page"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return is_congestion_error(error)
+
+class Budget:
+    """Wall-clock allowance, optionally nested in a parent's (a page inside its district)"""
+
+    def __init__(self, seconds, parent=None, label='budget'):
+        self.seconds = seconds
+        self.parent = parent
+        self.label = label
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def remaining(self):
+        own = self.deadline - time.monotonic() if self.deadline is not None else float('inf')
+        return min(own, self.parent.remaining()) if self.parent else own
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def clamp(self, seconds):
+        """seconds, cut to what is left; raises BudgetExceeded if nothing is"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise BudgetExceeded(f"{self.label} of {self.seconds:g}s exhausted")
+        return min(seconds, remaining)
+
+class CircuitBreaker:
+    """Closed until `threshold` consecutive failures, then open for `cooldown` seconds
+
+    After the cooldown one probe is let through (half-open); its success
+    closes the breaker and its failure opens it again.
+    """
+
+    def __init__(self, name, threshold, cooldown):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        """Seconds until the breaker lets a probe through (0 when closed)"""
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'open' and time.monotonic() >= self._opened_at + self.cooldown:
+                self.state = 'half_open'
+                self._probing = False
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """allow(), raising CircuitOpenError when refused"""
+        if not self.allow():
+            raise CircuitOpenError(f"circuit open for {self.name}, retry in {self.retry_in():.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                logger.info(f"🔌 Circuit for {self.name} closed again")
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.threshold):
+                self.state = 'open'
+                self.trips += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+                logger.warning(f"⛔ Circuit for {self.name} open after {self.failures} consecutive failures, "
+                               f"pausing {self.cooldown:.0f}s")
+
+    def as_dict(self):
+        return {'state': self.state, 'failures': self.failures, 'trips': self.trips, 'rejected': self.rejected}
+
+class BreakerBoard:
+    """Circuit breakers per crawled host plus one for the Claude API"""
+
+    def __init__(self, settings=None):
+        self.settings = settings or get_resilience_settings()
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(
+                    name, self.settings['breaker_failures'], self.settings['breaker_cooldown'])
+            return breaker
+
+    def host(self, url):
+        return self.get(host_of(url))
+
+    @property
+    def api(self):
+        return self.get('claude-api')
+
+    def record(self, url, error=None):
+        """Feed a page outcome to its host's breaker; a 404 or a parse error still means the host answered"""
+        breaker = self.host(url)
+        if error is not None and is_host_failure(error):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def summary(self):
+        """Breakers that ever tripped or refused work"""
+        with self._lock:
+            return {name: breaker.as_dict() for name, breaker in sorted(self._breakers.items())
+                    if breaker.trips or breaker.rejected}
+
+def navigation_plan(first, settings):
+    """wait_until per attempt: the requested strategy, then domcontentloaded for retries"""
+    return [first] + ['domcontentloaded'] * settings['navigation_retries']
+
+def navigate(goto, url, budget, first='networkidle', settings=None):
+    """goto(wait_until, timeout_ms) with retries inside the page budget
+
+    A networkidle timeout retries at once with domcontentloaded (the page
+    usually loaded, it just never went quiet); other transient errors wait
+    a jittered backoff first. Non-transient errors are raised immediately.
+    """
+    settings = settings or get_resilience_settings()
+    plan = navigation_plan(first, settings)
+    for attempt, wait_until in enumerate(plan):
+        timeout = budget.clamp(settings['navigation_timeout'])
+        try:
+            return goto(wait_until, int(timeout * 1000))
+        except Exception as e:
+            if attempt == len(plan) - 1 or not is_congestion_error(e):
+                raise
+            if wait_until == 'networkidle' and 'Timeout' in type(e).__name__:
+                logger.info(f"  ↩️ {url} never went network-idle, retrying with domcontentloaded")
+                continue
+            delay = budget.clamp(backoff_delay(attempt, settings))
+            logger.info(f"  🔁 Navigation to {url} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+async def navigate_async(goto, url, budget, first='domcontentloaded', settings=None):
+    """Async navigate(); goto is a coroutine function"""
+    settings = settings or get_resilience_settings()
+    plan = navigation_plan(first, settings)
+    for attempt, wait_until in enumerate(plan):
+        timeout = budget.clamp(settings['navigation_timeout'])
+        try:
+            return await goto(wait_until, int(timeout * 1000))
+        except Exception as e:
+            if attempt == len(plan) - 1 or not is_congestion_error(e):
+                raise
+            if wait_until == 'networkidle' and 'Timeout' in type(e).__name__:
+                continue
+            delay = budget.clamp(backoff_delay(attempt, settings))
+            logger.info(f"  🔁 Navigation to {url} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+_breakers = None
+_breakers_lock = threading.Lock()
+
+def get_breakers():
+    """Process-wide circuit breakers"""
+    global _breakers
+    with _breakers_lock:
+        if _breakers is None:
+            _breakers = BreakerBoard()
+        return _breakers
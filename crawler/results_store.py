@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Append-only results store for crawl runs
+Each page is appended to a per-run JSONL log as soon as it is classified;
+aggregates are kept incrementally and summary files are written atomically
+"""
+
+import os
+import re
+import json
+import glob
+import time
+import logging
+import threading
+from datetime import datetime
+
+from crawler.records import CrawlRecord
+from crawler.metrics import CrawlMetrics
+from crawler.shared_files import atomic_file
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def get_store_settings():
+    """Run log location, resume and retention"""
+    shared_dir = os.getenv('SHARED_DIR', '/opt/render/project/src/shared')
+    return {
+        'shared_dir': shared_dir,
+        'runs_dir': os.path.join(shared_dir, 'runs'),
+        'resume': os.getenv('RESUME_RUNS', 'true').lower() == 'true',
+        'resume_max_age_hours': float(os.getenv('RESUME_MAX_AGE_HOURS', '24')),
+        'keep_runs': int(os.getenv('RESULTS_KEEP_RUNS', '10'))
+    }
+
+# Per-host settings and thresholds in the run stats: the largest worker's value, not a sum
+NON_ADDITIVE_STATS = {'delay', 'concurrency', 'crawl_delay', 'latency', 'threshold'}
+
+def add_stats(total, stats):
+    """Add one worker's run stats into total: counts sum, nested dicts recurse, other values keep the latest"""
+    for key, value in stats.items():
+        current = total.get(key)
+        if isinstance(value, dict):
+            total[key] = add_stats(dict(current) if isinstance(current, dict) else {}, value)
+        elif is_number(value) and is_number(current):
+            total[key] = max(current, value) if key in NON_ADDITIVE_STATS else current + value
+        elif value is not None or key not in total:
+            total[key] = value
+    return total
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def order_key(order, line_number):
+    """Sort key of a page within its district: its crawl order, or log order for pages logged without one"""
+    return tuple(order) if order else (2, line_number)
+
+def write_json_atomic(path, data, **kwargs):
+    """Write JSON to a temp file and rename it over the target"""
+    with atomic_file(path) as f:
+        json.dump(data, f, **kwargs)
+
+class DistrictTotals:
+    """Running totals for one district; reset when the district is re-crawled"""
+
+    def __init__(self, district):
+        self.district = district
+        self.pages = 0
+        self.rfps = []
+        self.categories = {}
+        self.succeeded = None
+        # False when the crawl was abandoned with pages still queued
+        self.complete = True
+        # Pages Claude could not classify: counted as crawled, but neither RFPs nor negatives
+        self.unclassified = 0
+        self._rfp_keys = []
+
+    def add(self, record, key=None):
+        """Fold in a page; key (see order_key) keeps rfps in crawl order whatever order pages finish in"""
+        self.pages += 1
+        if record.unclassified:
+            self.unclassified += 1
+            return
+        rfp = record.rfp_entry()
+        if rfp:
+            rfp['district'] = self.district
+            key = key or (2, len(self.rfps))
+            at = len(self._rfp_keys)
+            while at and self._rfp_keys[at - 1] > key:
+                at -= 1
+            self._rfp_keys.insert(at, key)
+            self.rfps.insert(at, rfp)
+            category = rfp['category']
+            self.categories[category] = self.categories.get(category, 0) + 1
+
+class RunAggregates:
+    """Run-wide totals built from DistrictTotals; only RFPs are kept, never raw pages"""
+
+    def __init__(self):
+        self.districts = {}
+        # The run's district order; districts outside it follow in first-seen order
+        self.order = []
+
+    def reset(self, district):
+        self.districts[district] = DistrictTotals(district)
+
+    def district(self, district):
+        if district not in self.districts:
+            self.reset(district)
+        return self.districts[district]
+
+    @property
+    def total_pages(self):
+        return sum(totals.pages for totals in self.districts.values())
+
+    @property
+    def total_unclassified(self):
+        return sum(totals.unclassified for totals in self.districts.values())
+
+    def in_order(self):
+        return sort_districts(self.districts, self.order)
+
+    @property
+    def rfp_results(self):
+        return [rfp for district in self.in_order() for rfp in self.districts[district].rfps]
+
+    @property
+    def categories(self):
+        categories = {}
+        for district in self.in_order():
+            for category, count in self.districts[district].categories.items():
+                categories[category] = categories.get(category, 0) + count
+        return categories
+
+def sort_districts(districts, order):
+    """districts in the run's order, unknown ones last in their given order"""
+    position = {district: i for i, district in enumerate(order)}
+    return sorted(districts, key=lambda district: position.get(district, len(position)))
+
+class ResultsStore:
+    """One crawl run's JSONL log plus its incremental aggregates
+
+    Events: start, district_start (drops earlier pages of that district),
+    page, district_done, stats (a shard worker's run stats) and finish.
+    A run without a finish event can be resumed. Pages are logged as they
+    finish, but read back (and written to rfp_scan_results.json) in the run's
+    district order and then in crawl order, so concurrent runs match
+    sequential ones.
+    """
+
+    def __init__(self, path, run_id, started_at):
+        self.path = path
+        self.run_id = run_id
+        self.started_at = started_at
+        self.resumed = False
+        self.aggregates = RunAggregates()
+        self.completed = set()
+        self.worker = None
+        # Shard logs: the stats event of each worker process, by process key
+        self.worker_stats = {}
+        # Merged logs: the run stats added up over every shard
+        self.run_stats = None
+        self.run_metrics = None
+        self._last_reset = {}
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._file = None
+
+    @classmethod
+    def open_run(cls, districts, settings=None):
+        """Resume the latest unfinished run if allowed, else start a new one"""
+        settings = settings or get_store_settings()
+        os.makedirs(settings['runs_dir'], exist_ok=True)
+        if settings['resume']:
+            store = cls.resumable(settings)
+            if store:
+                return store
+
+        run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+        store = cls.create(os.path.join(settings['runs_dir'], f"run-{run_id}.jsonl"), run_id, districts)
+        store.prune(settings['keep_runs'])
+        return store
+
+    @classmethod
+    def create(cls, path, run_id, districts, **extra):
+        """A new log at path, starting with its start event"""
+        started_at = datetime.now().isoformat()
+        store = cls(path, run_id, started_at)
+        store.aggregates.order = list(districts)
+        store._open()
+        store._append({'event': 'start', 'run_id': run_id, 'started_at': started_at, 'districts': districts, **extra})
+        return store
+
+    @classmethod
+    def open_shard(cls, run_id, worker_id, districts, settings=None):
+        """This worker's log for a sharded run; the merge step combines the shards"""
+        settings = settings or get_store_settings()
+        os.makedirs(settings['runs_dir'], exist_ok=True)
+        path = shard_path(settings['runs_dir'], run_id, worker_id)
+        if os.path.exists(path):
+            # The same worker id again (SHARD_WORKER_ID): keep appending to its log
+            store = cls(path, None, None)
+            store.replay()
+            store._open()
+            return store
+        return cls.create(path, run_id, districts, worker=worker_id)
+
+    @classmethod
+    def resumable(cls, settings):
+        paths = sorted(glob.glob(os.path.join(settings['runs_dir'], 'run-*.jsonl')))
+        if not paths:
+            return None
+        path = paths[-1]
+        if time.time() - os.path.getmtime(path) > settings['resume_max_age_hours'] * 3600:
+            return None
+        store = cls(path, None, None)
+        if not store.replay():
+            return None
+        store.resumed = True
+        store._open()
+        logger.info(f"⏯️ Resuming run {store.run_id}: {len(store.completed)} districts already done, "
+                    f"{store.aggregates.total_pages} pages kept")
+        return store
+
+    def replay(self):
+        """Rebuild aggregates from the log; False if the run already finished"""
+        finished = False
+        with open(self.path, 'r') as f:
+            for line_number, line in enumerate(f):
+                self._lines = line_number + 1 if line.endswith('\n') else line_number
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a torn last line
+                    continue
+                kind = event.get('event')
+                district = event.get('district')
+                if kind == 'start':
+                    self.run_id = event.get('run_id')
+                    self.started_at = event.get('started_at')
+                    self.worker = self.worker or event.get('worker')
+                    self.aggregates.order = list(event.get('districts') or [])
+                elif kind == 'district_start':
+                    self.aggregates.reset(district)
+                    self._last_reset[district] = line_number
+                    self.completed.discard(district)
+                elif kind == 'page':
+                    self.aggregates.district(district).add(CrawlRecord.from_result(event['result'], self.started_at),
+                                                           order_key(event.get('order'), line_number))
+                elif kind == 'district_done':
+                    self.aggregates.district(district).succeeded = event.get('succeeded')
+                    self.aggregates.district(district).complete = event.get('complete', True)
+                    if event.get('succeeded'):
+                        self.completed.add(district)
+                elif kind == 'stats':
+                    self.worker_stats[event.get('process')] = event
+                elif kind == 'finish':
+                    finished = True
+        return not finished
+
+    def record_stats(self, process, stats, metrics):
+        """A shard worker's run stats and metrics snapshot, added up by merge_shards"""
+        self._append({'event': 'stats', 'process': process, 'stats': stats,
+                      'metrics': {'histograms': metrics['histograms'], 'counters': metrics['counters']}}, sync=True)
+
+    def _open(self):
+        self._file = open(self.path, 'a')
+        # Terminate a torn line left by a crash so the next event starts cleanly
+        if self._file.tell() > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self._file.write('\n')
+                    self._lines += 1
+
+    def _append(self, event, sync=False):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+            line_number = self._lines
+            self._lines += 1
+        return line_number
+
+    def start_district(self, district):
+        """Begin (or restart) a district; pages from an interrupted attempt are dropped"""
+        line_number = self._append({'event': 'district_start', 'district': district})
+        with self._lock:
+            self.aggregates.reset(district)
+            self._last_reset[district] = line_number
+            self.completed.discard(district)
+
+    def add_page(self, district, result, order=None):
+        """Append a finished page and fold its parsed record into the aggregates
+
+        order is the page's crawl order within the district (see
+        crawl_with_playwright.page_order); the log itself is in finishing order.
+        """
+        try:
+            record = CrawlRecord.from_result(result, self.started_at)
+            event = {'event': 'page', 'district': district, 'result': result}
+            if order is not None:
+                event['order'] = order
+            line_number = self._append(event)
+            with self._lock:
+                self.aggregates.district(district).add(record, order_key(order, line_number))
+        except Exception as e:
+            logger.error(f"❌ Could not record result for {result.get('url')}: {e}")
+
+    def finish_district(self, district, succeeded, complete=True):
+        """complete=False: the district stopped early, so pages not seen this run may still be live
+
+        A district with unclassified pages is never complete: any of them
+        could be an RFP that is still open.
+        """
+        with self._lock:
+            unclassified = self.aggregates.district(district).unclassified
+        if unclassified and complete:
+            logger.warning(f"⚠️ {district}: {unclassified} page(s) could not be classified, "
+                           f"keeping its earlier RFPs active")
+            complete = False
+        self._append({'event': 'district_done', 'district': district, 'succeeded': bool(succeeded),
+                      'complete': bool(complete)}, sync=True)
+        with self._lock:
+            self.aggregates.district(district).succeeded = bool(succeeded)
+            self.aggregates.district(district).complete = bool(complete)
+            if succeeded:
+                self.completed.add(district)
+
+    def pending(self, districts):
+        """Districts this run still has to crawl"""
+        return [district for district in districts if district not in self.completed]
+
+    def fully_crawled(self):
+        """Districts that succeeded, didn't stop early and have no unclassified pages
+
+        Only their missing RFPs are really gone.
+        """
+        with self._lock:
+            return sorted(district for district, totals in self.aggregates.districts.items()
+                          if totals.succeeded and totals.complete and not totals.unclassified)
+
+    def district_pages(self, district):
+        totals = self.aggregates.districts.get(district)
+        return totals.pages if totals else 0
+
+    def district_rfps(self, district):
+        totals = self.aggregates.districts.get(district)
+        return len(totals.rfps) if totals else 0
+
+    def iter_pages(self):
+        """Stream the kept (district, page result, order) triples back from the log
+
+        Only each page's sort key and file offset are held in memory; the
+        pages themselves are re-read in district and crawl order.
+        """
+        index = {}
+        with open(self.path, 'rb') as f:
+            line_number = 0
+            offset = 0
+            for line in f:
+                if b'"event": "page"' in line:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        event = None
+                    if event and line_number > self._last_reset.get(event.get('district'), -1):
+                        index.setdefault(event.get('district'), []).append(
+                            (order_key(event.get('order'), line_number), offset))
+                line_number += 1
+                offset += len(line)
+
+            for district in sort_districts(index, self.aggregates.order):
+                for _, offset in sorted(index[district]):
+                    f.seek(offset)
+                    event = json.loads(f.readline())
+                    yield district, event['result'], event.get('order')
+
+    def iter_results(self):
+        for _, result, _ in self.iter_pages():
+            yield result
+
+    def write_results(self, results_file, metadata, rfp_summary=None):
+        """rfp_scan_results.json, streaming raw_results from the log instead of memory"""
+        if rfp_summary is None:
+            rfp_summary = self.aggregates.rfp_results
+        head = json.dumps({'metadata': metadata, 'rfp_summary': rfp_summary},
+                          indent=2, default=str)
+        with atomic_file(results_file) as f:
+            # Reopen the object to append raw_results after rfp_summary
+            f.write(head[:head.rstrip().rfind('}')].rstrip())
+            f.write(',\n  "raw_results": [')
+            first = True
+            for result in self.iter_results():
+                f.write('\n    ' if first else ',\n    ')
+                f.write(json.dumps(result, default=str))
+                first = False
+            f.write('\n  ]\n}\n' if not first else ']\n}\n')
+
+    def finish(self):
+        self._append({'event': 'finish', 'finished_at': datetime.now().isoformat()}, sync=True)
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def prune(self, keep):
+        """Delete all but the newest `keep` run logs"""
+        runs_dir = os.path.dirname(self.path)
+        for path in sorted(glob.glob(os.path.join(runs_dir, 'run-*.jsonl')))[:-keep or None]:
+            if path != self.path:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not remove old run log {path}: {e}")
+
+def shard_path(runs_dir, run_id, worker_id):
+    worker = re.sub(r'[^A-Za-z0-9_.-]+', '_', worker_id)
+    return os.path.join(runs_dir, f"shard-{run_id}-{worker}.jsonl")
+
+def merge_shards(run_id, leases, settings=None):
+    """One run log built from the workers' shard logs, for save_results
+
+    Each district's pages come from the worker that completed its lease;
+    a crawl by a worker that lost the lease is dropped. The run stats of
+    every worker (including ones that lost leases) are added up into
+    store.run_stats, with timings recomputed from the summed histograms.
+    """
+    settings = settings or get_store_settings()
+    runs_dir = settings['runs_dir']
+    owners = {lease['district']: lease['worker'] for lease in leases if lease['state'] == 'done'}
+    store = ResultsStore.create(os.path.join(runs_dir, f"run-{run_id}.jsonl"), run_id,
+                                [lease['district'] for lease in leases], merged=True)
+    for lease in leases:
+        store.start_district(lease['district'])
+
+    shards = sorted(set(owners.values()))
+    paths = sorted(glob.glob(os.path.join(runs_dir, f"shard-{run_id}-*.jsonl")))
+    for worker_id in shards:
+        if shard_path(runs_dir, run_id, worker_id) not in paths:
+            logger.warning(f"⚠️ Shard log for {worker_id} is missing: {shard_path(runs_dir, run_id, worker_id)}")
+
+    complete = {}
+    run_stats = {}
+    metrics = CrawlMetrics()
+    metrics.run_id = run_id
+    for path in paths:
+        shard = ResultsStore(path, None, None)
+        shard.replay()
+        if shard.started_at:
+            metrics.started_at = min(metrics.started_at, shard.started_at)
+        for event in shard.worker_stats.values():
+            add_stats(run_stats, event['stats'])
+            metrics.merge_snapshot(event['metrics'])
+        if shard.worker not in shards:
+            continue
+        for district, result, order in shard.iter_pages():
+            if owners.get(district) == shard.worker:
+                store.add_page(district, result, order)
+        for district, totals in shard.aggregates.districts.items():
+            if owners.get(district) == shard.worker:
+                complete[district] = totals.complete
+    run_stats['timings'] = {'stages': metrics.stage_summary(), 'claude': metrics.api_summary()}
+    store.run_stats = run_stats
+    store.run_metrics = metrics
+
+    for lease in leases:
+        store.finish_district(lease['district'], bool(lease['succeeded']), complete.get(lease['district'], True))
+    logger.info(f"🧩 Merged {len(shards)} shard(s) of run {run_id}: {store.aggregates.total_pages} pages, "
+                f"{len(store.aggregates.rfp_results)} RFPs")
+    store.prune(settings['keep_runs'])
+    return store
+
+def remove_shards(run_id, settings=None):
+    """Delete a merged run's shard logs"""
+    settings = settings or get_store_settings()
+    for path in glob.glob(os.path.join(settings['runs_dir'], f"shard-{run_id}-*.jsonl")):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not remove shard log {path}: {e}")
@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+"""
+SQLite store of RFPs across every crawl run, with the helpers both services share
+Written by the crawler's save step and read by dedup and the dashboard;
+stdlib only, so the dashboard can import it without the crawler's dependencies
+"""
+
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from datetime import datetime
+
+from crawler.shared_files import atomic_file
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rfps (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    district TEXT NOT NULL DEFAULT '',
+    title TEXT,
+    summary TEXT,
+    category TEXT NOT NULL DEFAULT 'Other',
+    confidence TEXT NOT NULL DEFAULT 'Medium',
+    confidence_rank INTEGER NOT NULL DEFAULT 2,
+    deadline TEXT,
+    deadline_date TEXT,
+    contact_email TEXT,
+    contact_phone TEXT,
+    budget_range TEXT,
+    submission_location TEXT,
+    method TEXT,
+    depth INTEGER,
+    crawl_time TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    last_run_id TEXT,
+    times_seen INTEGER NOT NULL DEFAULT 1,
+    active INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    crawl_timestamp TEXT NOT NULL,
+    total_pages INTEGER,
+    total_rfps INTEGER
+);
+CREATE TABLE IF NOT EXISTS rfp_bands (
+    band INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    rfp_id INTEGER NOT NULL,
+    PRIMARY KEY (band, value, rfp_id)
+);
+CREATE TABLE IF NOT EXISTS rfp_urls (
+    url TEXT PRIMARY KEY,
+    rfp_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rfp_changes (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    rfp_id INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    op TEXT NOT NULL,
+    run_id TEXT,
+    changed_at TEXT NOT NULL
+);
+"""
+
+# Columns added after the first release; ALTERed into existing databases
+MIGRATIONS = (
+    ('simhash', 'INTEGER'),
+    ('dedup_key', 'TEXT'),
+    ('content_hash', 'TEXT'),
+    ('status', "TEXT NOT NULL DEFAULT 'new'"),
+    ('changed_at', 'TEXT'),
+    ('aliases', 'TEXT'),
+    ('source_url', 'TEXT'),
+    ('display_hash', 'TEXT'),
+)
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_rfps_district ON rfps (district);
+CREATE INDEX IF NOT EXISTS idx_rfps_category ON rfps (category);
+CREATE INDEX IF NOT EXISTS idx_rfps_deadline ON rfps (deadline_date);
+CREATE INDEX IF NOT EXISTS idx_rfps_confidence ON rfps (confidence_rank);
+CREATE INDEX IF NOT EXISTS idx_rfps_first_seen ON rfps (first_seen);
+CREATE INDEX IF NOT EXISTS idx_rfps_last_seen ON rfps (last_seen);
+CREATE INDEX IF NOT EXISTS idx_rfps_active_last_seen ON rfps (active, last_seen);
+CREATE INDEX IF NOT EXISTS idx_rfps_status ON rfps (status);
+CREATE INDEX IF NOT EXISTS idx_rfps_dedup_key ON rfps (dedup_key);
+CREATE INDEX IF NOT EXISTS idx_rfp_bands_rfp ON rfp_bands (rfp_id);
+CREATE INDEX IF NOT EXISTS idx_rfp_urls_rfp ON rfp_urls (rfp_id);
+CREATE INDEX IF NOT EXISTS idx_rfp_changes_rfp ON rfp_changes (rfp_id);
+"""
+
+# SimHash fingerprints are looked up by four 16-bit bands: two fingerprints
+# within SIMHASH_BANDS - 1 bits of each other share at least one band exactly
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+
+CONFIDENCE_RANK = {'high': 3, 'medium': 2, 'low': 1}
+
+# Public column names accepted by ?sort=
+SORT_COLUMNS = {
+    'deadline': 'deadline_date',
+    'first_seen': 'first_seen',
+    'last_seen': 'last_seen',
+    'confidence': 'confidence_rank',
+    'category': 'category',
+    'district': 'district',
+    'title': 'title',
+}
+
+COLUMNS = ('id', 'url', 'district', 'title', 'summary', 'category', 'confidence', 'deadline',
+           'deadline_date', 'contact_email', 'contact_phone', 'budget_range', 'submission_location',
+           'method', 'depth', 'crawl_time', 'first_seen', 'last_seen', 'times_seen', 'active',
+           'status', 'changed_at', 'aliases', 'source_url')
+
+# What the dashboard shows of an RFP; a run that changes none of these isn't a change for clients.
+# crawl_time is left out: every run re-stamps it, and a re-crawl alone isn't news
+DISPLAY_FIELDS = ('url', 'title', 'summary', 'category', 'confidence', 'deadline', 'contact_email',
+                  'contact_phone', 'budget_range', 'submission_location', 'status', 'aliases', 'source_url')
+
+MAX_PER_PAGE = 200
+
+MONTHS = {name: i for i, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1)}
+MONTH_DAY_YEAR = re.compile(r'\b([a-z]{3})[a-z]*\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})\b', re.IGNORECASE)
+NUMERIC_DATE = re.compile(r'\b(\d{1,2})/(\d{1,2})/(\d{2,4})\b')
+ISO_DATE = re.compile(r'\b(\d{4})-(\d{2})-(\d{2})\b')
+
+def get_index_path():
+    shared_dir = os.getenv('SHARED_DIR', '/opt/render/project/src/shared')
+    return os.getenv('RFP_INDEX_PATH', os.path.join(shared_dir, 'rfp_index.db'))
+
+def get_version_path(index_path=None):
+    """Small file holding the latest change version; dashboards watch it instead of the WAL-mode database"""
+    return f"{index_path or get_index_path()}.version"
+
+def get_changes_keep():
+    """Change log entries kept for /api/changes; clients further behind reload in full"""
+    return max(100, int(os.getenv('RFP_CHANGES_KEEP', '5000')))
+
+def parse_deadline(text):
+    """ISO date (YYYY-MM-DD) from a free-text deadline, or None"""
+    if not text:
+        return None
+    candidates = []
+    match = ISO_DATE.search(text)
+    if match:
+        candidates.append((int(match.group(1)), int(match.group(2)), int(match.group(3))))
+    match = MONTH_DAY_YEAR.search(text)
+    if match and match.group(1).lower() in MONTHS:
+        candidates.append((int(match.group(3)), MONTHS[match.group(1).lower()], int(match.group(2))))
+    match = NUMERIC_DATE.search(text)
+    if match:
+        year = int(match.group(3))
+        candidates.append((year + 2000 if year < 100 else year, int(match.group(1)), int(match.group(2))))
+    for year, month, day in candidates:
+        try:
+            return datetime(year, month, day).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def band_values(simhash):
+    """The SIMHASH_BANDS slices of an unsigned 64-bit fingerprint"""
+    mask = (1 << BAND_BITS) - 1
+    return [(simhash >> (band * BAND_BITS)) & mask for band in range(SIMHASH_BANDS)]
+
+def to_signed(value):
+    """Unsigned 64-bit fingerprint as SQLite's signed INTEGER"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+def row_dict(row):
+    """API shape of an rfps row"""
+    rfp = dict(row)
+    if 'aliases' in rfp:
+        rfp['aliases'] = json.loads(rfp['aliases']) if rfp['aliases'] else []
+    return rfp
+
+def display_hash(row):
+    return hashlib.sha1(json.dumps([row.get(field) for field in DISPLAY_FIELDS]).encode('utf-8')).hexdigest()[:16]
+
+def site_of(url):
+    """District key for a page URL: the host without a leading www."""
+    host = re.sub(r'^[a-z]+://', '', url or '', flags=re.IGNORECASE).split('/', 1)[0].lower()
+    return host[4:] if host.startswith('www.') else host
+
+class RfpIndex:
+    """Upserts RFPs per run and answers paginated, filtered queries"""
+
+    def __init__(self, path=None, readonly=False):
+        self.path = path or get_index_path()
+        self.readonly = readonly
+        self._local = threading.local()
+        if not readonly:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with self.connection() as conn:
+                conn.executescript(SCHEMA)
+                self.migrate(conn)
+                conn.executescript(INDEXES)
+
+    def connection(self):
+        """Per-thread connection; readers open the file read-only"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def migrate(self, conn):
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(rfps)")}
+        for column, definition in MIGRATIONS:
+            if column not in columns:
+                conn.execute(f"ALTER TABLE rfps ADD COLUMN {column} {definition}")
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def record_run(self, run_id, crawl_timestamp, rfps, total_pages=0, completed_districts=None):
+        """Upsert this run's RFPs in one transaction and mark the rest inactive
+
+        An RFP carrying an rfp_id (matched by the deduplicator) updates that row
+        even if its canonical URL moved; otherwise rows are keyed by URL.
+        With completed_districts, only RFPs of those districts that this run
+        did not see are marked inactive; None treats every district as crawled.
+        """
+        rows = []
+        for rfp in rfps:
+            confidence = rfp.get('confidence') or 'Medium'
+            simhash = rfp.get('simhash')
+            rows.append({
+                'rfp_id': rfp.get('rfp_id'),
+                'url': rfp['url'],
+                'district': rfp.get('district') or site_of(rfp['url']),
+                'title': rfp.get('title', ''),
+                'summary': rfp.get('summary', ''),
+                'category': rfp.get('category') or 'Other',
+                'confidence': confidence,
+                'confidence_rank': CONFIDENCE_RANK.get(str(confidence).lower(), 2),
+                'deadline': rfp.get('deadline', ''),
+                'deadline_date': parse_deadline(rfp.get('deadline', '')),
+                'contact_email': rfp.get('contact_email', ''),
+                'contact_phone': rfp.get('contact_phone', ''),
+                'budget_range': rfp.get('budget_range', ''),
+                'submission_location': rfp.get('submission_location', ''),
+                'method': rfp.get('method', ''),
+                'depth': rfp.get('depth', 0),
+                'crawl_time': rfp.get('crawl_time', crawl_timestamp),
+                'seen': crawl_timestamp,
+                'run_id': run_id,
+                'simhash': to_signed(int(simhash, 16)) if simhash else None,
+                'dedup_key': rfp.get('dedup_key'),
+                'content_hash': rfp.get('content_hash'),
+                'status': rfp.get('status'),
+                'aliases': json.dumps(rfp['aliases']) if rfp.get('aliases') else None,
+                'source_url': rfp.get('source_url'),
+            })
+            rows[-1]['display_hash'] = display_hash(rows[-1])
+
+        conn = self.connection()
+        with conn:
+            for row in rows:
+                previous = conn.execute(
+                    "SELECT active, display_hash FROM rfps WHERE id = ?" if row['rfp_id'] is not None
+                    else "SELECT active, display_hash FROM rfps WHERE url = ?",
+                    (row['rfp_id'] if row['rfp_id'] is not None else row['url'],)
+                ).fetchone()
+                if row['rfp_id'] is not None:
+                    # Keep the old URL if the new one already belongs to another row
+                    conn.execute("""
+                        UPDATE rfps SET
+                            url = CASE WHEN EXISTS (SELECT 1 FROM rfps other WHERE other.url = :url
+                                                    AND other.id != :rfp_id) THEN url ELSE :url END,
+                            district = :district, title = :title, summary = :summary,
+                            category = :category, confidence = :confidence,
+                            confidence_rank = :confidence_rank, deadline = :deadline,
+                            deadline_date = :deadline_date, contact_email = :contact_email,
+                            contact_phone = :contact_phone, budget_range = :budget_range,
+                            submission_location = :submission_location, method = :method,
+                            depth = :depth, crawl_time = :crawl_time, last_seen = :seen,
+                            times_seen = CASE WHEN last_run_id = :run_id THEN times_seen ELSE times_seen + 1 END,
+                            last_run_id = :run_id, active = 1,
+                            simhash = COALESCE(:simhash, simhash), dedup_key = :dedup_key,
+                            content_hash = COALESCE(:content_hash, content_hash),
+                            changed_at = CASE WHEN :status IN ('new', 'changed') AND last_run_id IS NOT :run_id
+                                              THEN :seen ELSE changed_at END,
+                            status = COALESCE(:status, status), aliases = :aliases,
+                            source_url = :source_url, display_hash = :display_hash
+                        WHERE id = :rfp_id
+                    """, row)
+                    rfp_id = row['rfp_id']
+                else:
+                    conn.execute("""
+                        INSERT INTO rfps (url, district, title, summary, category, confidence, confidence_rank,
+                                          deadline, deadline_date, contact_email, contact_phone, budget_range,
+                                          submission_location, method, depth, crawl_time,
+                                          first_seen, last_seen, last_run_id, times_seen, active,
+                                          simhash, dedup_key, content_hash, status, changed_at, aliases,
+                                          source_url, display_hash)
+                        VALUES (:url, :district, :title, :summary, :category, :confidence, :confidence_rank,
+                                :deadline, :deadline_date, :contact_email, :contact_phone, :budget_range,
+                                :submission_location, :method, :depth, :crawl_time,
+                                :seen, :seen, :run_id, 1, 1,
+                                :simhash, :dedup_key, :content_hash, COALESCE(:status, 'new'), :seen, :aliases,
+                                :source_url, :display_hash)
+                        ON CONFLICT(url) DO UPDATE SET
+                            district = excluded.district, title = excluded.title, summary = excluded.summary,
+                            category = excluded.category, confidence = excluded.confidence,
+                            confidence_rank = excluded.confidence_rank, deadline = excluded.deadline,
+                            deadline_date = excluded.deadline_date, contact_email = excluded.contact_email,
+                            contact_phone = excluded.contact_phone, budget_range = excluded.budget_range,
+                            submission_location = excluded.submission_location, method = excluded.method,
+                            depth = excluded.depth, crawl_time = excluded.crawl_time,
+                            last_seen = excluded.last_seen, last_run_id = excluded.last_run_id,
+                            times_seen = CASE WHEN rfps.last_run_id = excluded.last_run_id
+                                              THEN rfps.times_seen ELSE rfps.times_seen + 1 END,
+                            active = 1,
+                            simhash = COALESCE(excluded.simhash, rfps.simhash), dedup_key = excluded.dedup_key,
+                            content_hash = COALESCE(excluded.content_hash, rfps.content_hash),
+                            changed_at = CASE WHEN :status IN ('new', 'changed') AND rfps.last_run_id IS NOT :run_id
+                                              THEN excluded.last_seen ELSE rfps.changed_at END,
+                            status = CASE WHEN :status IS NULL THEN rfps.status ELSE excluded.status END,
+                            aliases = excluded.aliases, source_url = excluded.source_url,
+                            display_hash = excluded.display_hash
+                    """, row)
+                    rfp_id = conn.execute("SELECT id FROM rfps WHERE url = ?", (row['url'],)).fetchone()[0]
+                self._index_fingerprint(conn, rfp_id, row)
+                if previous is None or not previous['active'] or previous['display_hash'] != row['display_hash']:
+                    self._log_change(conn, rfp_id, 'upsert', run_id, crawl_timestamp)
+            stale = conn.execute("SELECT id, url, district FROM rfps WHERE active = 1 AND last_run_id IS NOT ?",
+                                 (run_id,)).fetchall()
+            if completed_districts is not None:
+                completed = {site_of(district) for district in completed_districts}
+                stale = [row for row in stale if site_of(row['district'] or row['url']) in completed]
+            for row in stale:
+                self._log_change(conn, row['id'], 'remove', run_id, crawl_timestamp)
+                conn.execute("UPDATE rfps SET active = 0 WHERE id = ?", (row['id'],))
+            conn.execute("""
+                INSERT INTO runs (run_id, crawl_timestamp, total_pages, total_rfps) VALUES (?, ?, ?, ?)
+                ON CONFLICT(run_id) DO UPDATE SET crawl_timestamp = excluded.crawl_timestamp,
+                    total_pages = excluded.total_pages, total_rfps = excluded.total_rfps
+            """, (run_id, crawl_timestamp, total_pages, len(rows)))
+            conn.execute("DELETE FROM rfp_changes WHERE version <= (SELECT MAX(version) FROM rfp_changes) - ?",
+                         (get_changes_keep(),))
+        self.publish_version()
+        return len(rows)
+
+    def _log_change(self, conn, rfp_id, op, run_id, changed_at):
+        conn.execute(
+            "INSERT INTO rfp_changes (rfp_id, url, op, run_id, changed_at) "
+            "SELECT id, url, ?, ?, ? FROM rfps WHERE id = ?",
+            (op, run_id, changed_at, rfp_id)
+        )
+
+    def version_range(self):
+        """(oldest, latest) change version still in the log; (0, 0) before the first change"""
+        try:
+            row = self.connection().execute(
+                "SELECT COALESCE(MIN(version), 0), COALESCE(MAX(version), 0) FROM rfp_changes").fetchone()
+        except sqlite3.OperationalError:
+            # A database from before the change log, opened read-only
+            return 0, 0
+        return row[0], row[1]
+
+    def publish_version(self):
+        """Write the latest version next to the database for dashboards to watch"""
+        path = get_version_path(self.path)
+        try:
+            with atomic_file(path) as f:
+                f.write(str(self.version_range()[1]))
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write change version {path}: {e}")
+
+    def changes_since(self, since):
+        """RFPs added or changed and RFPs removed after version `since`
+
+        Several changes to one RFP collapse to its latest. reset is True when
+        `since` is older than the log (or newer than the index): the client
+        should load everything again instead.
+        """
+        oldest, latest = self.version_range()
+        if since > latest or (oldest and since < oldest - 1):
+            return {'version': latest, 'since': since, 'reset': True, 'upserted': [], 'removed': []}
+        if since == latest:
+            return {'version': latest, 'since': since, 'reset': False, 'upserted': [], 'removed': []}
+        conn = self.connection()
+        # SQLite takes the bare columns from the row holding MAX(version)
+        latest_ops = conn.execute(
+            "SELECT rfp_id, url, op, MAX(version) FROM rfp_changes WHERE version > ? GROUP BY rfp_id", (since,)
+        ).fetchall()
+        upserted_ids = [row['rfp_id'] for row in latest_ops if row['op'] == 'upsert']
+        upserted = []
+        for start in range(0, len(upserted_ids), 500):
+            chunk = upserted_ids[start:start + 500]
+            upserted.extend(row_dict(row) for row in conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM rfps WHERE active = 1 AND id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ))
+        return {
+            'version': latest,
+            'since': since,
+            'reset': False,
+            'upserted': upserted,
+            'removed': [{'id': row['rfp_id'], 'url': row['url']} for row in latest_ops if row['op'] == 'remove']
+        }
+
+    def _index_fingerprint(self, conn, rfp_id, row):
+        """Refresh the band and URL lookups the deduplicator matches against"""
+        if row['simhash'] is not None:
+            conn.execute("DELETE FROM rfp_bands WHERE rfp_id = ?", (rfp_id,))
+            conn.executemany("INSERT OR IGNORE INTO rfp_bands (band, value, rfp_id) VALUES (?, ?, ?)",
+                             [(band, value, rfp_id)
+                              for band, value in enumerate(band_values(to_unsigned(row['simhash'])))])
+        urls = [row['url']] + (json.loads(row['aliases']) if row['aliases'] else [])
+        conn.executemany("INSERT OR REPLACE INTO rfp_urls (url, rfp_id) VALUES (?, ?)",
+                         [(url, rfp_id) for url in urls])
+
+    def candidates(self, urls=(), bands=(), keys=()):
+        """Rows that share a URL, a SimHash band or a dedup key with an incoming RFP"""
+        urls, bands, keys = list(urls), list(bands), list(keys)
+        subqueries = []
+        params = []
+        if urls:
+            marks = ', '.join('?' for _ in urls)
+            subqueries.append(f"SELECT rfp_id FROM rfp_urls WHERE url IN ({marks})")
+            subqueries.append(f"SELECT id FROM rfps WHERE url IN ({marks})")
+            params.extend(urls + urls)
+        if bands:
+            subqueries.append(f"SELECT rfp_id FROM rfp_bands WHERE (band, value) IN "
+                              f"(VALUES {', '.join('(?, ?)' for _ in bands)})")
+            params.extend(value for band in bands for value in band)
+        if keys:
+            subqueries.append(f"SELECT id FROM rfps WHERE dedup_key IN ({', '.join('?' for _ in keys)})")
+            params.extend(keys)
+        if not subqueries:
+            return []
+        rows = self.connection().execute(
+            f"SELECT id, url, district, simhash, dedup_key, deadline_date, content_hash, status, last_run_id, aliases "
+            f"FROM rfps WHERE id IN ({' UNION '.join(subqueries)}) ORDER BY id", params
+        ).fetchall()
+        candidates = []
+        for row in rows:
+            candidate = row_dict(row)
+            if candidate['simhash'] is not None:
+                candidate['simhash'] = to_unsigned(candidate['simhash'])
+            candidates.append(candidate)
+        return candidates
+
+    def build_filters(self, filters):
+        """WHERE clause and parameters for the supported filters"""
+        clauses = []
+        params = []
+        for key in ('district', 'category', 'confidence', 'status'):
+            values = filters.get(key)
+            if values:
+                values = values if isinstance(values, (list, tuple)) else [values]
+                clauses.append(f"{key} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        if filters.get('active') is not None:
+            clauses.append("active = ?")
+            params.append(1 if filters['active'] else 0)
+        for key, column, op in (('deadline_from', 'deadline_date', '>='), ('deadline_to', 'deadline_date', '<='),
+                                ('first_seen_since', 'first_seen', '>='), ('last_seen_since', 'last_seen', '>=')):
+            if filters.get(key):
+                clauses.append(f"{column} {op} ?")
+                params.append(filters[key])
+        if filters.get('q'):
+            clauses.append("(title LIKE ? OR summary LIKE ?)")
+            params.extend([f"%{filters['q']}%"] * 2)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ''), params
+
+    def query(self, filters=None, page=1, per_page=50, sort='last_seen', order='desc'):
+        """One page of RFPs plus the total matching count"""
+        filters = filters or {}
+        page = max(1, int(page))
+        per_page = max(1, min(MAX_PER_PAGE, int(per_page)))
+        column = SORT_COLUMNS.get(sort, 'last_seen')
+        direction = 'ASC' if str(order).lower() == 'asc' else 'DESC'
+        where, params = self.build_filters(filters)
+
+        conn = self.connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM rfps {where}", params).fetchone()[0]
+        # Undated deadlines sort last either way; id keeps paging stable
+        rows = conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM rfps {where} "
+            f"ORDER BY {column} IS NULL, {column} {direction}, id {direction} LIMIT ? OFFSET ?",
+            params + [per_page, (page - 1) * per_page]
+        ).fetchall()
+        return {
+            'items': [row_dict(row) for row in rows],
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page
+        }
+
+    def get(self, rfp_id):
+        row = self.connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM rfps WHERE id = ?", (rfp_id,)
+        ).fetchone()
+        return row_dict(row) if row else None
+
+    def facets(self, filters=None):
+        """Counts by district, category, confidence and status for the current filters"""
+        where, params = self.build_filters(filters or {})
+        conn = self.connection()
+        return {
+            key: {row[0]: row[1] for row in conn.execute(
+                f"SELECT {key}, COUNT(*) FROM rfps {where} GROUP BY {key} ORDER BY COUNT(*) DESC", params)}
+            for key in ('district', 'category', 'confidence', 'status')
+        }
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def import_results(index, paths):
+    """Backfill the index from saved rfp_scan_results.json files, oldest first"""
+    runs = []
+    for path in paths:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        metadata = data.get('metadata', {})
+        timestamp = metadata.get('crawl_timestamp') or datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+        runs.append((timestamp, metadata, data.get('rfp_summary', [])))
+    for timestamp, metadata, rfps in sorted(runs, key=lambda run: run[0]):
+        count = index.record_run(metadata.get('run_id') or timestamp, timestamp, rfps,
+                                 metadata.get('total_pages_crawled', 0))
+        logger.info(f"📥 Indexed {count} RFPs from run {timestamp}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the RFP index from saved results files")
+    parser.add_argument('results', nargs='+', help="rfp_scan_results.json files")
+    parser.add_argument('--index', default=get_index_path())
+    args = parser.parse_args()
+    import_results(RfpIndex(args.index), args.results)
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
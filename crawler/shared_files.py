@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+JSON files in SHARED_DIR that several crawler processes update
+Sharded workers read the current file and merge their changes into it under
+an exclusive lock, so the last writer no longer wipes the others' entries
+"""
+
+import os
+import json
+import logging
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on path's .lock sidecar for the block (a no-op where fcntl is unavailable)"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", 'a') as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def atomic_file(path):
+    """Open a unique temp file next to path; renamed over it when the block succeeds
+
+    A unique name per write, so concurrent writers (sharded workers,
+    threads) never rename each other's half-written file into place.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix='.tmp',
+                                    dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def read_json(path):
+    """Parsed file contents, or None if it is missing or unreadable"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read {path}, replacing it: {e}")
+        return None
+
+def update_json(path, merge, **dump_kwargs):
+    """Replace path with merge(current contents or None), atomically and under the file's lock"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with file_lock(path):
+        data = merge(read_json(path))
+        with atomic_file(path) as f:
+            json.dump(data, f, **dump_kwargs)
+    return data
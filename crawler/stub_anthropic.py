@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Anthropic Messages API
+Point ANTHROPIC_BASE_URL at it to exercise the classification stage offline:
+
+    python -m crawler.stub_anthropic --port 8765 --latency 0.3
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 python main_crawler.py
+"""
+
+import re
+import json
+import time
+import argparse
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RFP_PATTERN = re.compile(r'\b(rfp|rfq|request for proposals?|invitation to bid|sealed bids?)\b', re.IGNORECASE)
+PAGE_MARKER = re.compile(r'^### PAGE \d+', re.MULTILINE)
+
+def classify_text(text):
+    """Deterministic keyword classification used in place of the model"""
+    is_rfp = bool(RFP_PATTERN.search(text))
+    return {
+        "is_rfp": is_rfp,
+        "summary": "Stub classification" + (" - procurement keywords found" if is_rfp else ""),
+        "category": "Other",
+        "submission_deadline": "",
+        "submission_location": "",
+        "contact_email": "",
+        "contact_phone": "",
+        "budget_range": "",
+        "confidence": "Medium" if is_rfp else "Low"
+    }
+
+def page_text(section):
+    """The page excerpt of a prompt section, without its URL line or the closing instruction"""
+    section = section.split('Page content from', 1)[-1]
+    section = section.split('\n', 1)[-1]
+    return section.split('\nReturn ', 1)[0]
+
+def build_reply(prompt):
+    """Answer single-page prompts with an object and batch prompts with an array"""
+    sections = PAGE_MARKER.split(prompt)[1:]
+    if sections:
+        return json.dumps([classify_text(page_text(section)) for section in sections])
+    return json.dumps(classify_text(page_text(prompt)))
+
+class StubAnthropicServer(ThreadingHTTPServer):
+    """HTTP server answering POST /v1/messages with canned classifications"""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, rate_limit_every=0, fail_first=0):
+        super().__init__(address, StubAnthropicHandler)
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        # The first fail_first requests get a 529 (overloaded), as in an API outage
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.calls = 0
+        self.tokens = dict.fromkeys(('input_tokens', 'output_tokens', 'cache_creation_input_tokens',
+                                     'cache_read_input_tokens'), 0)
+        # System blocks marked cache_control that a real API would now serve from its prompt cache
+        self.cached = set()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_background(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+class StubAnthropicHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.startswith('/v1/messages'):
+            self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            failed = server.requests <= server.fail_first
+            throttled = not failed and server.rate_limit_every and server.requests % server.rate_limit_every == 0
+            if not (failed or throttled):
+                server.calls += 1
+
+        if failed:
+            self._send_json(529, {'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'stub outage'}})
+            return
+        if throttled:
+            self._send_json(429, {'type': 'error', 'error': {'type': 'rate_limit_error', 'message': 'stub rate limit'}},
+                            headers={'retry-after': '1'})
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        prompt = ''.join(
+            message['content'] if isinstance(message['content'], str)
+            else ''.join(block.get('text', '') for block in message['content'])
+            for message in request.get('messages', [])
+        )
+        reply = build_reply(prompt)
+        usage = {'input_tokens': len(prompt) // 4, 'output_tokens': len(reply) // 4,
+                 'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+        system = request.get('system') or []
+        for block in [{'text': system}] if isinstance(system, str) else system:
+            tokens = len(block.get('text', '')) // 4
+            if not block.get('cache_control'):
+                usage['input_tokens'] += tokens
+                continue
+            with server.lock:
+                hit = block['text'] in server.cached
+                server.cached.add(block['text'])
+            usage['cache_read_input_tokens' if hit else 'cache_creation_input_tokens'] += tokens
+        with server.lock:
+            for key, value in usage.items():
+                server.tokens[key] += value
+        self._send_json(200, {
+            'id': f"msg_stub_{server.calls}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': request.get('model', 'stub'),
+            'content': [{'type': 'text', 'text': reply}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': usage
+        })
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each reply')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='answer every Nth request with a 429')
+    parser.add_argument('--fail-first', type=int, default=0, help='answer the first N requests with a 529')
+    args = parser.parse_args()
+
+    server = StubAnthropicServer((args.host, args.port), args.latency, args.rate_limit_every, args.fail_first)
+    logger.info(f"🤖 Stub Anthropic API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(f"Served {server.calls} messages ({server.requests} requests)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Lease-based district work queue for sharded crawls
+Several worker processes share one SQLite file in SHARED_DIR: each claims
+districts under an expiring lease, heartbeats while crawling, and picks up
+leases that a crashed worker let expire. The last worker out merges.
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    districts TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    merge_worker TEXT,
+    merge_expires REAL,
+    merged_at REAL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    run_id TEXT NOT NULL,
+    district TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    succeeded INTEGER,
+    updated_at REAL,
+    PRIMARY KEY (run_id, district)
+);
+CREATE INDEX IF NOT EXISTS idx_leases_state ON leases(run_id, state);
+"""
+
+def get_shard_settings():
+    """Shard mode, lease timing and this process's worker id"""
+    shared_dir = os.getenv('SHARED_DIR', '/opt/render/project/src/shared')
+    lease_seconds = max(10.0, float(os.getenv('SHARD_LEASE_SECONDS', '300')))
+    return {
+        'enabled': os.getenv('SHARD_MODE', 'false').lower() == 'true',
+        'path': os.getenv('SHARD_QUEUE_PATH', os.path.join(shared_dir, 'work_queue.db')),
+        # Workers started with the same SHARD_RUN_ID share a run; otherwise they join the open one
+        'run_id': os.getenv('SHARD_RUN_ID', '').strip() or None,
+        'worker_id': os.getenv('SHARD_WORKER_ID', '').strip() or f"{socket.gethostname()}-{os.getpid()}",
+        'lease_seconds': lease_seconds,
+        'heartbeat_seconds': min(lease_seconds / 3, float(os.getenv('SHARD_HEARTBEAT_SECONDS', '30'))),
+        # A district whose lease expired this many times is given up on (a crawl that kills its worker)
+        'max_attempts': max(1, int(os.getenv('SHARD_MAX_ATTEMPTS', '3'))),
+        'run_max_age_hours': float(os.getenv('RESUME_MAX_AGE_HOURS', '24'))
+    }
+
+class WorkQueue:
+    """Districts of a sharded run and who holds them
+
+    A lease row is pending, leased (to worker until lease_expires), done or
+    failed. Every state change runs in an IMMEDIATE transaction, so two
+    workers never claim the same district.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or get_shard_settings()
+        self.path = self.settings['path']
+        self.worker_id = self.settings['worker_id']
+        self.stats = {'claimed': 0, 'reclaimed': 0, 'lost': 0, 'completed': 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def join(self, districts):
+        """Run id of the open run for these districts, creating it if there is none"""
+        now = time.time()
+        wanted = json.dumps(districts)
+        with self.transaction() as conn:
+            run_id = self.settings['run_id']
+            if run_id is None:
+                row = conn.execute(
+                    "SELECT run_id FROM runs WHERE merged_at IS NULL AND districts = ? AND created_at > ? "
+                    "ORDER BY created_at DESC LIMIT 1",
+                    (wanted, now - self.settings['run_max_age_hours'] * 3600)
+                ).fetchone()
+                if row:
+                    return row['run_id']
+                stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+                run_id, n = stamp, 1
+                while conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone():
+                    n += 1
+                    run_id = f"{stamp}-{n}"
+            elif conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone():
+                return run_id
+            conn.execute("INSERT INTO runs (run_id, districts, created_at) VALUES (?, ?, ?)", (run_id, wanted, now))
+            conn.executemany(
+                "INSERT INTO leases (run_id, district, position, updated_at) VALUES (?, ?, ?, ?)",
+                [(run_id, district, position, now) for position, district in enumerate(districts)]
+            )
+        logger.info(f"🧩 Started sharded run {run_id} with {len(districts)} districts")
+        return run_id
+
+    def claim(self, run_id):
+        """Lease the next pending (or abandoned) district; None when nothing is left to take"""
+        now = time.time()
+        with self.transaction() as conn:
+            # Leases that ran out too often are given up rather than handed out again
+            failed = conn.execute(
+                "UPDATE leases SET state = 'failed', succeeded = 0, updated_at = ? "
+                "WHERE run_id = ? AND state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, run_id, now, self.settings['max_attempts'])
+            ).rowcount
+            row = conn.execute(
+                "SELECT district, state, worker FROM leases WHERE run_id = ? "
+                "AND (state = 'pending' OR (state = 'leased' AND lease_expires < ?)) ORDER BY position LIMIT 1",
+                (run_id, now)
+            ).fetchone()
+            if row is None:
+                claimed = None
+            else:
+                conn.execute(
+                    "UPDATE leases SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE run_id = ? AND district = ?",
+                    (self.worker_id, now + self.settings['lease_seconds'], now, run_id, row['district'])
+                )
+                claimed = row
+        if failed:
+            logger.warning(f"⚠️ Gave up on {failed} district(s) after {self.settings['max_attempts']} expired leases")
+        if claimed is None:
+            return None
+        self.stats['claimed'] += 1
+        if claimed['state'] == 'leased':
+            self.stats['reclaimed'] += 1
+            logger.info(f"🧩 Reclaimed {claimed['district']} from {claimed['worker']} (lease expired)")
+        return claimed['district']
+
+    def heartbeat(self, run_id):
+        """Extend every lease this worker holds in the run; returns how many"""
+        with self.transaction() as conn:
+            return conn.execute(
+                "UPDATE leases SET lease_expires = ? WHERE run_id = ? AND worker = ? AND state = 'leased'",
+                (time.time() + self.settings['lease_seconds'], run_id, self.worker_id)
+            ).rowcount
+
+    @contextmanager
+    def heartbeats(self, run_id):
+        """Renew this worker's leases on a background thread for the block"""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.settings['heartbeat_seconds']):
+                try:
+                    self.heartbeat(run_id)
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ Lease heartbeat failed: {e}")
+
+        thread = threading.Thread(target=beat, name='lease-heartbeat', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, run_id, district, succeeded):
+        """Mark a leased district done; False if another worker has since taken it over"""
+        with self.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE leases SET state = 'done', succeeded = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE run_id = ? AND district = ? AND worker = ? AND state = 'leased'",
+                (int(bool(succeeded)), time.time(), run_id, district, self.worker_id)
+            ).rowcount
+        if updated:
+            self.stats['completed'] += 1
+            return True
+        self.stats['lost'] += 1
+        logger.warning(f"⚠️ Lost the lease on {district}; another worker's crawl of it will be kept")
+        return False
+
+    def outstanding(self, run_id):
+        """Districts not yet done or given up on"""
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM leases WHERE run_id = ? AND state IN ('pending', 'leased')", (run_id,)
+        ).fetchone()
+        return row[0]
+
+    def claim_merge(self, run_id):
+        """True if every district is finished and this worker should write the merged results"""
+        now = time.time()
+        with self.transaction() as conn:
+            return conn.execute(
+                "UPDATE runs SET merge_worker = ?, merge_expires = ? WHERE run_id = ? AND merged_at IS NULL "
+                "AND (merge_expires IS NULL OR merge_expires < ?) AND NOT EXISTS ("
+                "SELECT 1 FROM leases WHERE run_id = ? AND state IN ('pending', 'leased'))",
+                (self.worker_id, now + self.settings['lease_seconds'], run_id, now, run_id)
+            ).rowcount == 1
+
+    def mark_merged(self, run_id):
+        with self.transaction() as conn:
+            conn.execute("UPDATE runs SET merged_at = ?, merge_expires = NULL WHERE run_id = ?", (time.time(), run_id))
+
+    def districts(self, run_id):
+        """Lease rows of a run in district order"""
+        return [dict(row) for row in self._conn.execute(
+            "SELECT district, state, worker, attempts, succeeded FROM leases WHERE run_id = ? ORDER BY position",
+            (run_id,)
+        )]
+
+    def prune(self, keep):
+        """Forget all but the newest `keep` merged runs"""
+        with self.transaction() as conn:
+            old = [row['run_id'] for row in conn.execute(
+                "SELECT run_id FROM runs WHERE merged_at IS NOT NULL ORDER BY created_at DESC LIMIT -1 OFFSET ?",
+                (keep,)
+            )]
+            for run_id in old:
+                conn.execute("DELETE FROM leases WHERE run_id = ?", (run_id,))
+                conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def get_work_queue():
+    """A queue for this process when SHARD_MODE is on, else None"""
+    settings = get_shard_settings()
+    if not settings['enabled']:
+        return None
+    return WorkQueue(settings)
@@ -4,11 +4,23 @@ Flask dashboard for RFP crawler - replacing Streamlit
 """
 
 import os
+import sys
+import gzip
 import json
+import time
+import zlib
 from datetime import datetime
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify, request
 import logging
 
+# Run as `python dashboard/app.py`; make the repo root importable for shared modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler.rfp_store import RfpIndex, get_index_path, get_version_path
+from dashboard.data_cache import CachedLoader
+from dashboard.rfp_list import RfpListing, get_listing_settings, listing_query, query_args, query_key
+from dashboard.prometheus import CONTENT_TYPE as METRICS_CONTENT_TYPE, get_metrics_path, read_metrics, render_metrics
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -18,9 +30,27 @@ app = Flask(__name__)
 SHARED_DIR = os.getenv('SHARED_DIR', '/opt/render/project/src/shared')
 RESULTS_FILE = os.path.join(SHARED_DIR, 'rfp_scan_results.json')
 DASHBOARD_FILE = os.path.join(SHARED_DIR, 'dashboard_summary.json')
+INDEX_FILE = get_index_path()
+VERSION_FILE = get_version_path(INDEX_FILE)
+LISTING_SETTINGS = get_listing_settings()
+GZIP_ENABLED = os.getenv('ENABLE_GZIP', 'true').lower() == 'true'
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_SIZE = 1024
+# Live updates: the page polls /api/changes this often (seconds, 0 = never) and, if enabled, listens on /api/events
+REFRESH_INTERVAL = max(0, int(os.getenv('DASHBOARD_REFRESH_INTERVAL', '300')))
+# Off by default: each open stream holds a request thread for up to EVENTS_MAX_SECONDS, so it needs
+# a threaded or async server (the built-in threaded server, gunicorn --threads or gevent), not sync workers
+EVENTS_ENABLED = os.getenv('DASHBOARD_EVENTS', 'false').lower() == 'true'
+# How often an event stream checks for a new version, and how long one stays open before the browser reconnects
+EVENTS_POLL_SECONDS = max(0.5, float(os.getenv('DASHBOARD_EVENTS_POLL_SECONDS', '2')))
+EVENTS_MAX_SECONDS = max(10, int(os.getenv('DASHBOARD_EVENTS_MAX_SECONDS', '300')))
+EVENTS_KEEPALIVE_SECONDS = 15
 
-def load_data():
-    """Load the latest crawler results"""
+# Read-only handle on the crawler's RFP index (one connection per request thread)
+rfp_index = RfpIndex(INDEX_FILE, readonly=True)
+
+def read_data():
+    """Read and parse the latest crawler results from disk"""
     try:
         # Try dashboard summary first (cleaner format)
         if os.path.exists(DASHBOARD_FILE):
@@ -60,33 +90,267 @@ def load_data():
             'active_rfps': []
         }
 
+# Parsed data is kept until one of these files changes (DASHBOARD_CACHE=false re-reads every request)
+loader = CachedLoader(
+    [DASHBOARD_FILE, RESULTS_FILE, INDEX_FILE, VERSION_FILE],
+    read_data,
+    enabled=os.getenv('DASHBOARD_CACHE', 'true').lower() == 'true'
+)
+
+# The crawler rewrites its metrics file after every district
+metrics_loader = CachedLoader([get_metrics_path()], read_metrics, enabled=loader.enabled)
+
+def load_data():
+    """Load the latest crawler results"""
+    return loader.get().data
+
+def read_version():
+    """Latest change version the crawler published; 0 before the first indexed run"""
+    try:
+        with open(VERSION_FILE, 'r') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def accepts_gzip():
+    return GZIP_ENABLED and request.accept_encodings['gzip'] > 0
+
+def response_etag(snapshot, encoded):
+    return f"{snapshot.etag}-gz" if encoded else snapshot.etag
+
+def not_modified(snapshot, etag):
+    """True when the client's cached copy matches this data version"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return bool(since and snapshot.last_modified and snapshot.last_modified <= since.timestamp())
+
+def add_validators(response, snapshot, etag):
+    response.set_etag(etag)
+    if snapshot.last_modified:
+        response.last_modified = snapshot.last_modified
+    response.cache_control.no_cache = True
+    if GZIP_ENABLED:
+        response.vary.add('Accept-Encoding')
+    return response
+
+def cached_response(name, build, mimetype):
+    """Body built (and gzipped) once per data version, with validators so clients can revalidate for a 304"""
+    snapshot = loader.get()
+    body = snapshot.cached(name, build)
+    encoded = accepts_gzip() and len(body) >= GZIP_MIN_SIZE
+    etag = response_etag(snapshot, encoded)
+    if not_modified(snapshot, etag):
+        return add_validators(Response(status=304), snapshot, etag)
+    if encoded:
+        response = Response(snapshot.cached(f"{name}|gzip", lambda snapshot: gzip.compress(body.encode('utf-8'), 6)),
+                            mimetype=mimetype)
+        response.content_encoding = 'gzip'
+    else:
+        response = Response(body, mimetype=mimetype)
+    return add_validators(response, snapshot, etag)
+
+def to_json(data):
+    return app.json.dumps(data) + "\n"
+
+def status_json(snapshot):
+    data, exists = snapshot.data, snapshot.exists
+    return to_json({
+        'status': 'healthy',
+        'last_crawl': data.get('timestamp'),
+        'total_rfps': data.get('total_rfps', 0),
+        'total_pages': data.get('total_pages', 0),
+        'crawler_healthy': exists[RESULTS_FILE] or exists[DASHBOARD_FILE],
+        'shared_dir_exists': any(exists.values()) or os.path.isdir(SHARED_DIR),
+        'data_files': {
+            'results_file': exists[RESULTS_FILE],
+            'summary_file': exists[DASHBOARD_FILE],
+            'rfp_index': exists[INDEX_FILE]
+        }
+    })
+
+def listing(snapshot):
+    """Sortable view of the active RFPs, built once per data version"""
+    return snapshot.cached('listing', lambda snapshot: RfpListing(snapshot.data.get('active_rfps') or []))
+
+def data_page(snapshot, query):
+    """Dashboard data with one page of active_rfps and its pagination"""
+    page = listing(snapshot).page(query)
+    data = {key: value for key, value in snapshot.data.items() if key != 'active_rfps'}
+    data['active_rfps'] = page.pop('items')
+    data['pagination'] = page
+    return data
+
+def stream_json(snapshot, query):
+    """Dashboard data with every matching RFP, serialized one RFP at a time"""
+    head = to_json({key: value for key, value in snapshot.data.items() if key != 'active_rfps'}).rstrip()
+    yield head[:-1] + (', ' if len(head) > 2 else '') + '"active_rfps": ['
+    for i, rfp in enumerate(listing(snapshot).iter_matching(query)):
+        yield (', ' if i else '') + app.json.dumps(rfp)
+    yield ']}\n'
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode('utf-8'))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
 @app.route('/')
 def dashboard():
     """Main dashboard page"""
-    data = load_data()
-    return render_template('dashboard.html', data=data)
+    query = listing_query(request.args, LISTING_SETTINGS)
+
+    def render(snapshot):
+        rfps = listing(snapshot)
+        pagination = rfps.page(query)
+        live = {'version': read_version(), 'refresh_interval': REFRESH_INTERVAL, 'events': EVENTS_ENABLED}
+        return render_template('dashboard.html', data=snapshot.data, rfps=pagination.pop('items'),
+                               pagination=pagination, options=rfps.options(), query=query, query_args=query_args,
+                               live=live)
+
+    return cached_response(f"dashboard?{query_key(query)}", render, 'text/html')
 
 @app.route('/api/data')
 def api_data():
-    """API endpoint for dashboard data"""
-    return jsonify(load_data())
+    """API endpoint for dashboard data: one page of RFPs, or every match streamed with ?all=true"""
+    query = listing_query(request.args, LISTING_SETTINGS)
+    if request.args.get('all', '').lower() in ('1', 'true', 'yes'):
+        snapshot = loader.get()
+        encoded = accepts_gzip()
+        etag = response_etag(snapshot, encoded)
+        if not_modified(snapshot, etag):
+            return add_validators(Response(status=304), snapshot, etag)
+        chunks = stream_json(snapshot, query)
+        response = Response(gzip_chunks(chunks) if encoded else chunks, mimetype='application/json')
+        if encoded:
+            response.content_encoding = 'gzip'
+        return add_validators(response, snapshot, etag)
+    return cached_response(f"api_data?{query_key(query)}", lambda snapshot: to_json(data_page(snapshot, query)),
+                           'application/json')
+
+def rfp_filters(args):
+    """Filters for the RFP index from query parameters"""
+    filters = {key: args.getlist(key) for key in ('district', 'category', 'confidence', 'status')
+               if args.getlist(key)}
+    for key in ('deadline_from', 'deadline_to', 'first_seen_since', 'last_seen_since', 'q'):
+        if args.get(key):
+            filters[key] = args.get(key)
+    if args.get('active') is not None:
+        filters['active'] = args.get('active', '').lower() in ('1', 'true', 'yes')
+    return filters
+
+def empty_page(per_page):
+    return {'items': [], 'total': 0, 'page': 1, 'per_page': per_page, 'pages': 0}
+
+@app.route('/api/rfps')
+def api_rfps():
+    """Paginated, filterable RFPs across every crawl run"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+    if not rfp_index.exists():
+        return jsonify(empty_page(per_page))
+    try:
+        return jsonify(rfp_index.query(
+            rfp_filters(request.args),
+            page=page,
+            per_page=per_page,
+            sort=request.args.get('sort', 'last_seen'),
+            order=request.args.get('order', 'desc')
+        ))
+    except Exception as e:
+        logger.error(f"Error querying RFP index: {e}")
+        return jsonify({'error': str(e), **empty_page(per_page)}), 500
+
+@app.route('/api/rfps/<int:rfp_id>')
+def api_rfp(rfp_id):
+    """A single indexed RFP"""
+    rfp = rfp_index.get(rfp_id) if rfp_index.exists() else None
+    if rfp is None:
+        return jsonify({'error': 'RFP not found'}), 404
+    return jsonify(rfp)
+
+@app.route('/api/rfps/facets')
+def api_rfp_facets():
+    """Counts by district, category and confidence for the current filters"""
+    if not rfp_index.exists():
+        return jsonify({'district': {}, 'category': {}, 'confidence': {}, 'status': {}})
+    return jsonify(rfp_index.facets(rfp_filters(request.args)))
+
+@app.route('/api/changes')
+def api_changes():
+    """RFPs added, changed or removed since ?since=<version>, with the dashboard's current totals
+
+    ?html=true adds each upserted RFP rendered as a list item, for the page to patch in.
+    """
+    since = request.args.get('since', 0, type=int)
+    if rfp_index.exists():
+        try:
+            changes = rfp_index.changes_since(since)
+        except Exception as e:
+            logger.error(f"Error reading RFP changes: {e}")
+            return jsonify({'error': str(e), 'version': since, 'reset': True, 'upserted': [], 'removed': []}), 500
+    else:
+        changes = {'version': 0, 'since': since, 'reset': since > 0, 'upserted': [], 'removed': []}
+    if request.args.get('html', '').lower() in ('1', 'true', 'yes'):
+        for rfp in changes['upserted']:
+            rfp['html'] = render_template('_rfp_item.html', rfp=rfp)
+    data = load_data()
+    changes['summary'] = {key: data.get(key) for key in ('timestamp', 'total_rfps', 'total_pages', 'categories',
+                                                         'changes')}
+    response = jsonify(changes)
+    response.cache_control.no_store = True
+    return response
+
+@app.route('/api/events')
+def api_events():
+    """Server-sent events: a "changes" event carrying the new version each time the crawler indexes a run
+
+    The stream closes after DASHBOARD_EVENTS_MAX_SECONDS and the browser reconnects,
+    sending the last version it saw as Last-Event-ID. Only with DASHBOARD_EVENTS=true,
+    which needs a threaded or async server since every client holds a thread.
+    """
+    last_seen = request.headers.get('Last-Event-ID', type=int)
+    if last_seen is None:
+        last_seen = request.args.get('since', type=int)
+
+    def events(last_seen):
+        yield f"retry: {int(EVENTS_POLL_SECONDS * 1000) + 1000}\n\n"
+        started = last_ping = time.monotonic()
+        while True:
+            version = read_version()
+            if last_seen is not None and version != last_seen:
+                yield f"id: {version}\nevent: changes\ndata: {json.dumps({'version': version})}\n\n"
+                last_ping = time.monotonic()
+            last_seen = version
+            if time.monotonic() - started >= EVENTS_MAX_SECONDS:
+                return
+            if time.monotonic() - last_ping >= EVENTS_KEEPALIVE_SECONDS:
+                # Comment line; keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                last_ping = time.monotonic()
+            time.sleep(EVENTS_POLL_SECONDS)
+
+    if not EVENTS_ENABLED:
+        return jsonify({'error': 'Live updates are disabled'}), 404
+    response = Response(events(last_seen), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    # Tell buffering proxies (nginx) to pass events through as they are written
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/api/status')
 def api_status():
     """API endpoint for crawler status"""
-    data = load_data()
-    return jsonify({
-        'status': 'healthy',
-        'last_crawl': data.get('timestamp'),
-        'total_rfps': data.get('total_rfps', 0),
-        'total_pages': data.get('total_pages', 0),
-        'crawler_healthy': os.path.exists(RESULTS_FILE) or os.path.exists(DASHBOARD_FILE),
-        'shared_dir_exists': os.path.exists(SHARED_DIR),
-        'data_files': {
-            'results_file': os.path.exists(RESULTS_FILE),
-            'summary_file': os.path.exists(DASHBOARD_FILE)
-        }
-    })
+    return cached_response('api_status', status_json, 'application/json')
+
+@app.route('/metrics')
+def metrics():
+    """Crawl stage timings, Claude latency and token usage in Prometheus text format"""
+    snapshot = metrics_loader.get()
+    return Response(snapshot.cached('metrics', lambda snapshot: render_metrics(snapshot.data)),
+                    content_type=METRICS_CONTENT_TYPE)
 
 @app.route('/health')
 def health():
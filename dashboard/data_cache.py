@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+In-process cache of the crawler's output files for the dashboard
+Data is re-read only when a file's mtime or size changes; rendered responses
+are memoized per data version and carry a precomputed ETag / Last-Modified
+"""
+
+import os
+import hashlib
+import logging
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Responses memoized per data version; query strings make the key space open-ended
+MAX_CACHED_RESPONSES = 256
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class DataSnapshot:
+    """Parsed data for one version of the files, plus responses built from it"""
+
+    def __init__(self, signature, data, paths):
+        self.signature = signature
+        self.data = data
+        self.exists = {path: sig is not None for path, sig in zip(paths, signature)}
+        self.etag = hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:20]
+        mtimes = [sig[0] for sig in signature if sig]
+        # Whole seconds, as HTTP dates have no finer resolution
+        self.last_modified = max(mtimes) // 1_000_000_000 if mtimes else None
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def cached(self, name, build):
+        """Build a response body once per data version; build receives this snapshot"""
+        body = self._responses.get(name)
+        if body is None:
+            body = build(self)
+            with self._lock:
+                if len(self._responses) >= MAX_CACHED_RESPONSES:
+                    # Oldest first; a rebuilt entry costs one render
+                    self._responses.pop(next(iter(self._responses)))
+                self._responses[name] = body
+        return body
+
+class CachedLoader:
+    """Serves a DataSnapshot, reloading only when the watched files change"""
+
+    def __init__(self, paths, load, enabled=True):
+        self.paths = list(paths)
+        self.load = load
+        self.enabled = enabled
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'reloads': 0}
+
+    def signature(self):
+        return tuple(file_signature(path) for path in self.paths)
+
+    def get(self):
+        signature = self.signature()
+        snapshot = self._snapshot
+        if self.enabled and snapshot is not None and snapshot.signature == signature:
+            self.stats['hits'] += 1
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if self.enabled and snapshot is not None and snapshot.signature == signature:
+                return snapshot
+            snapshot = DataSnapshot(signature, self.load(), self.paths)
+            self.stats['reloads'] += 1
+            if self.enabled:
+                self._snapshot = snapshot
+                logger.info(f"📦 Loaded dashboard data version {snapshot.etag}")
+            return snapshot
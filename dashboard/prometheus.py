@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Prometheus text exposition of the crawler's metrics file
+The crawler writes crawl_metrics.json; the dashboard serves it at /metrics
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Metrics file name -> (exposed name, help)
+HISTOGRAMS = {
+    'stage_seconds': ('rfp_crawl_stage_seconds', 'Time spent per page in each crawl stage'),
+    'claude_request_seconds': ('rfp_claude_request_seconds', 'Claude API request latency'),
+    'claude_input_tokens': ('rfp_claude_input_tokens', 'Input tokens per Claude request'),
+    'claude_output_tokens': ('rfp_claude_output_tokens', 'Output tokens per Claude request'),
+    'claude_cache_read_tokens': ('rfp_claude_cache_read_tokens', 'Input tokens per Claude request read from the prompt cache'),
+    'claude_cache_creation_tokens': ('rfp_claude_cache_creation_tokens', 'Input tokens per Claude request written to the prompt cache'),
+}
+COUNTERS = {
+    'claude_requests': ('rfp_claude_requests_total', 'Claude API requests by outcome'),
+}
+
+def get_metrics_path():
+    shared_dir = os.getenv('SHARED_DIR', '/opt/render/project/src/shared')
+    return os.getenv('METRICS_FILE', os.path.join(shared_dir, 'crawl_metrics.json'))
+
+def read_metrics(path=None):
+    """Parsed metrics file, or None if the crawler hasn't written one"""
+    path = path or get_metrics_path()
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Error loading metrics file: {e}")
+        return None
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in sorted(labels.items())) + '}'
+
+def format_number(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+def render_metrics(data):
+    """Exposition text for a metrics file's contents (None renders only the scrape gauge)"""
+    lines = [
+        '# HELP rfp_crawl_metrics_available Whether the crawler has written a metrics file',
+        '# TYPE rfp_crawl_metrics_available gauge',
+        f"rfp_crawl_metrics_available {1 if data else 0}"
+    ]
+    if not data:
+        return '\n'.join(lines) + '\n'
+
+    lines.append('# HELP rfp_crawl_run_info The run the metrics below belong to')
+    lines.append('# TYPE rfp_crawl_run_info gauge')
+    lines.append(f"rfp_crawl_run_info{format_labels({'run_id': data.get('run_id') or ''})} 1")
+    try:
+        updated = datetime.fromisoformat(data['updated_at']).timestamp()
+        lines.append('# HELP rfp_crawl_metrics_updated_timestamp_seconds When the crawler last wrote its metrics')
+        lines.append('# TYPE rfp_crawl_metrics_updated_timestamp_seconds gauge')
+        lines.append(f"rfp_crawl_metrics_updated_timestamp_seconds {updated:.3f}")
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    for source, (name, help_text) in HISTOGRAMS.items():
+        series = [h for h in data.get('histograms', []) if h.get('name') == source]
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for histogram in series:
+            labels = histogram.get('labels', {})
+            cumulative = 0
+            for bound, count in zip(list(histogram['bounds']) + ['+Inf'], histogram['counts']):
+                cumulative += count
+                le = bound if bound == '+Inf' else format_number(float(bound))
+                lines.append(f"{name}_bucket{format_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_number(histogram['sum'])}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+
+    for source, (name, help_text) in COUNTERS.items():
+        series = [c for c in data.get('counters', []) if c.get('name') == source]
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for counter in series:
+            lines.append(f"{name}{format_labels(counter.get('labels', {}))} {format_number(counter['value'])}")
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Sorting, filtering and pagination of the dashboard's RFP list
+Sort keys are computed once per data version, so a request is a filter and a slice
+"""
+
+import os
+import threading
+
+from crawler.rfp_store import CONFIDENCE_RANK, parse_deadline
+
+# Public names accepted by ?sort=; "found" keeps the crawler's order
+SORTS = ('found', 'deadline', 'confidence', 'category', 'district', 'title')
+
+LIST_FILTERS = ('category', 'confidence', 'district', 'status')
+
+def get_listing_settings():
+    """Page size for the RFP list (MAX_RFPS_DISPLAY) and the most a client may ask for"""
+    per_page = max(1, int(os.getenv('MAX_RFPS_DISPLAY', '100')))
+    return {
+        'per_page': per_page,
+        'max_per_page': max(per_page, int(os.getenv('MAX_RFPS_PER_PAGE', '500')))
+    }
+
+def listing_query(args, settings):
+    """Normalized listing parameters from request args; bad values fall back to defaults"""
+    query = {key: sorted(set(value for value in args.getlist(key) if value)) for key in LIST_FILTERS}
+    for key in ('deadline_from', 'deadline_to', 'q'):
+        query[key] = args.get(key, '').strip()
+    sort = args.get('sort', 'found')
+    query['sort'] = sort if sort in SORTS else 'found'
+    query['order'] = 'desc' if args.get('order', '').lower() == 'desc' else 'asc'
+    query['page'] = max(1, args.get('page', 1, type=int) or 1)
+    per_page = args.get('per_page', settings['per_page'], type=int) or settings['per_page']
+    query['per_page'] = max(1, min(settings['max_per_page'], per_page))
+    return query
+
+def query_key(query):
+    """Stable cache key for a normalized query"""
+    return '&'.join(f"{key}={','.join(value) if isinstance(value, list) else value}"
+                    for key, value in sorted(query.items()))
+
+def query_args(query, **overrides):
+    """URL parameters for a query, without defaults, for building page and sort links"""
+    merged = {**query, **overrides}
+    args = {key: value for key, value in merged.items() if value not in ('', [], None)}
+    if args.get('page') == 1:
+        del args['page']
+    if args.get('sort') == 'found':
+        del args['sort']
+    if args.get('order') == 'asc':
+        del args['order']
+    return args
+
+class RfpListing:
+    """The active RFPs of one data version with precomputed sort and filter keys"""
+
+    def __init__(self, rfps):
+        self.rfps = rfps
+        self.deadlines = [parse_deadline(rfp.get('deadline') or '') for rfp in rfps]
+        self.texts = [f"{rfp.get('title') or ''} {rfp.get('summary') or ''}".lower() for rfp in rfps]
+        self._orders = {}
+        self._options = None
+        self._lock = threading.Lock()
+
+    def sort_key(self, sort, i):
+        rfp = self.rfps[i]
+        if sort == 'deadline':
+            return self.deadlines[i]
+        if sort == 'confidence':
+            return CONFIDENCE_RANK.get(str(rfp.get('confidence') or 'Medium').lower(), 2)
+        return str(rfp.get(sort) or '').lower() or None
+
+    def ordering(self, sort, order):
+        """Row positions in sort order; rows without a value sort last either way"""
+        key = (sort, order)
+        positions = self._orders.get(key)
+        if positions is None:
+            positions = list(range(len(self.rfps)))
+            if sort == 'found':
+                if order == 'desc':
+                    positions.reverse()
+            else:
+                keyed = [(self.sort_key(sort, i), i) for i in positions]
+                present = sorted((item for item in keyed if item[0] is not None), reverse=order == 'desc')
+                positions = [i for _, i in present] + [i for value, i in keyed if value is None]
+            with self._lock:
+                self._orders[key] = positions
+        return positions
+
+    def matches(self, i, query):
+        rfp = self.rfps[i]
+        for key in LIST_FILTERS:
+            if query[key] and (rfp.get(key) or '') not in query[key]:
+                return False
+        if query['deadline_from'] or query['deadline_to']:
+            deadline = self.deadlines[i]
+            if deadline is None:
+                return False
+            if query['deadline_from'] and deadline < query['deadline_from']:
+                return False
+            if query['deadline_to'] and deadline > query['deadline_to']:
+                return False
+        if query['q'] and query['q'].lower() not in self.texts[i]:
+            return False
+        return True
+
+    def filtered(self, query):
+        positions = self.ordering(query['sort'], query['order'])
+        if not any(query[key] for key in LIST_FILTERS + ('deadline_from', 'deadline_to', 'q')):
+            return positions
+        return [i for i in positions if self.matches(i, query)]
+
+    def page(self, query):
+        """One page of RFPs plus the total matching count"""
+        positions = self.filtered(query)
+        per_page = query['per_page']
+        total = len(positions)
+        pages = (total + per_page - 1) // per_page
+        page = min(query['page'], pages) if pages else 1
+        start = (page - 1) * per_page
+        return {
+            'items': [self.rfps[i] for i in positions[start:start + per_page]],
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': pages
+        }
+
+    def iter_matching(self, query):
+        """Every matching RFP in order, for streamed exports"""
+        for i in self.filtered(query):
+            yield self.rfps[i]
+
+    def options(self):
+        """Values present in the data, for the filter controls"""
+        if self._options is not None:
+            return self._options
+        options = {key: set() for key in LIST_FILTERS}
+        for rfp in self.rfps:
+            for key in LIST_FILTERS:
+                if rfp.get(key):
+                    options[key].add(rfp[key])
+        self._options = {
+            key: sorted(values, key=lambda value: -CONFIDENCE_RANK.get(str(value).lower(), 2))
+            if key == 'confidence' else sorted(values)
+            for key, values in options.items()
+        }
+        return self._options
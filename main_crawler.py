@@ -5,11 +5,28 @@ Based on existing Playwright implementation
 """
 
 import os
-import json
 import time
 import logging
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from crawler.crawl_with_playwright import crawl_site_with_playwright
+from crawler.classifier import ClassificationPipeline
+from crawler.classification_cache import get_classification_cache
+from crawler.crawl_state import get_crawl_state
+from crawler.fetcher import get_fetcher
+from crawler.browser_config import RUN_TOTALS as RESOURCE_BLOCKING
+from crawler.prefilter import get_prefilter
+from crawler.prompt_builder import RUN_TOTALS as PROMPT_TOTALS
+from crawler.results_store import ResultsStore, get_store_settings, merge_shards, remove_shards, write_json_atomic
+from crawler.records import count_rfps
+from crawler.dedup import dedup_rfps
+from crawler.metrics import get_metrics
+from crawler.politeness import get_scheduler, host_of
+from crawler.resilience import get_breakers
+from crawler.documents import get_document_stage
+from crawler.work_queue import get_work_queue
+from crawler.rfp_store import RfpIndex, get_index_path
 
 # Configure logging
 logging.basicConfig(
@@ -31,102 +48,308 @@ def get_school_districts():
         return [url.strip() for url in districts_env.split(',') if url.strip()]
     return DEFAULT_DISTRICTS
 
-def save_results(all_results, shared_dir):
-    """Save results in multiple formats for the dashboard"""
-    timestamp = datetime.now().isoformat()
+def get_max_concurrency():
+    """Get the global crawl concurrency limit (MAX_CONCURRENT_PAGES)"""
+    try:
+        return max(1, int(os.getenv('MAX_CONCURRENT_PAGES', '1')))
+    except ValueError:
+        logger.warning("⚠️ Invalid MAX_CONCURRENT_PAGES, falling back to 1")
+        return 1
+
+class DistrictQueue:
+    """Hands each worker the waiting district whose host can be fetched soonest
+
+    Only one district per host is crawled at a time; the politeness
+    scheduler paces the requests within it, so a host that is cooling down
+    doesn't keep workers from districts on other hosts.
+    """
+
+    def __init__(self, districts, scheduler):
+        self.pending = list(enumerate(districts, 1))
+        self.scheduler = scheduler
+        self.active_hosts = set()
+        self._cond = threading.Condition()
+
+    def take(self):
+        """(position, url) of the next district, or None when all have been handed out"""
+        with self._cond:
+            while True:
+                available = [item for item in self.pending if host_of(item[1]) not in self.active_hosts]
+                if available:
+                    item = min(available, key=lambda item: (self.scheduler.ready_in(item[1]), item[0]))
+                    self.pending.remove(item)
+                    self.active_hosts.add(host_of(item[1]))
+                    return item
+                if not self.pending:
+                    return None
+                self._cond.wait()
+
+    def done(self, url):
+        with self._cond:
+            self.active_hosts.discard(host_of(url))
+            self._cond.notify_all()
+
+def report_district(district_url, results, store=None):
+    """Log a finished district crawl and return whether it succeeded"""
+    if results:
+        logger.info(f"✅ Completed {district_url}: {len(results)} pages crawled")
+        
+        # The store already counted this district's RFPs as pages came in
+        rfp_count = store.district_rfps(district_url) if store else count_rfps(results)
+        if rfp_count > 0:
+            logger.info(f"  🎯 Found {rfp_count} potential RFPs!")
+        return True
     
-    # Analyze results for RFPs
-    rfp_results = []
-    total_pages = len(all_results)
+    logger.warning(f"⚠️ No results from {district_url}")
+    return False
+
+def record_page(store, district_url, result, order=None):
+    """Append a classified page to the run log, timed as the save stage"""
+    with get_metrics().span('save', district_url):
+        store.add_page(district_url, result, order)
+
+def crawl_district(district_url, label, classifier=None, store=None):
+    """Crawl a single district and return (results, succeeded)"""
+    logger.info(f"\n🕷️ {label} Starting crawl: {district_url}")
+    if store:
+        store.start_district(district_url)
     
-    for result in all_results:
-        try:
-            claude_result = result.get('claude_result', '{}')
-            if isinstance(claude_result, str):
-                # Check if it's an RFP by looking for the is_rfp flag
-                if '"is_rfp": true' in claude_result.lower():
-                    # Try to parse the JSON for better data
-                    try:
-                        parsed = json.loads(claude_result)
-                        rfp_data = {
-                            'url': result['url'],
-                            'title': result.get('title', 'Unknown Title'),
-                            'summary': parsed.get('summary', 'No summary available'),
-                            'category': parsed.get('category', 'Other'),
-                            'confidence': parsed.get('confidence', 'Medium'),
-                            'deadline': parsed.get('submission_deadline', ''),
-                            'contact_email': parsed.get('contact_email', ''),
-                            'contact_phone': parsed.get('contact_phone', ''),
-                            'budget_range': parsed.get('budget_range', ''),
-                            'submission_location': parsed.get('submission_location', ''),
-                            'crawl_time': result.get('crawl_timestamp', timestamp),
-                            'depth': result.get('depth', 0),
-                            'method': result.get('method', 'playwright')
-                        }
-                        rfp_results.append(rfp_data)
-                    except json.JSONDecodeError:
-                        # Fallback for malformed JSON
-                        rfp_data = {
-                            'url': result['url'],
-                            'title': result.get('title', 'Unknown Title'),
-                            'summary': 'RFP detected but details could not be parsed',
-                            'category': 'Other',
-                            'confidence': 'Low',
-                            'deadline': '',
-                            'contact_email': '',
-                            'contact_phone': '',
-                            'budget_range': '',
-                            'submission_location': '',
-                            'crawl_time': timestamp,
-                            'depth': result.get('depth', 0),
-                            'method': result.get('method', 'playwright')
-                        }
-                        rfp_results.append(rfp_data)
-        except Exception as e:
-            logger.warning(f"Error processing result: {e}")
-            continue
+    stopped = []
+    try:
+        # Use your existing crawler with reasonable limits for MVP
+        results = crawl_site_with_playwright(
+            start_url=district_url,
+            max_depth=int(os.getenv('CRAWLER_MAX_DEPTH', '2')),
+            max_pages=int(os.getenv('CRAWLER_MAX_PAGES', '15')),
+            classifier=classifier,
+            on_result=(lambda result, order: record_page(store, district_url, result, order)) if store else None,
+            on_stopped=stopped.append
+        )
+        succeeded = report_district(district_url, results, store)
+            
+    except Exception as e:
+        logger.error(f"❌ Error crawling {district_url}: {e}")
+        results, succeeded = [], False
     
-    # Create summary data
+    if store:
+        store.finish_district(district_url, succeeded, complete=not stopped)
+    get_metrics().save()
+    return results or [], succeeded
+
+def crawl_districts_async(school_districts, store=None):
+    """Crawl all districts on the shared-browser async engine"""
+    from crawler.async_crawl import crawl_sites_with_async_engine
+    
+    outcomes = {}
+    stopped = set()
+    
+    def site_done(url, results):
+        outcomes[url] = report_district(url, results, store)
+        if store:
+            store.finish_district(url, outcomes[url], complete=url not in stopped)
+        get_metrics().save()
+    
+    if store:
+        for url in school_districts:
+            store.start_district(url)
+    results_by_district = crawl_sites_with_async_engine(
+        school_districts,
+        max_depth=int(os.getenv('CRAWLER_MAX_DEPTH', '2')),
+        max_pages=int(os.getenv('CRAWLER_MAX_PAGES', '15')),
+        concurrency=get_max_concurrency(),
+        on_result=(lambda url, result, order: record_page(store, url, result, order)) if store else None,
+        on_site_done=site_done,
+        on_stopped=lambda url, reason: stopped.add(url)
+    )
+    return [
+        (results_by_district.get(url, []), outcomes.get(url, False))
+        for url in school_districts
+    ]
+
+def crawl_districts_threaded(school_districts, store=None):
+    """Crawl districts on a thread pool; per-host pacing comes from the politeness scheduler"""
+    max_workers = min(get_max_concurrency(), max(1, len(school_districts)))
+    queue = DistrictQueue(school_districts, get_scheduler())
+    outcomes = {}
+    logger.info(f"⚙️ Crawling with up to {max_workers} concurrent district(s)")
+    
+    def worker(classifier):
+        while True:
+            item = queue.take()
+            if item is None:
+                return
+            i, district_url = item
+            try:
+                outcomes[i] = crawl_district(district_url, f"[{i}/{len(school_districts)}]", classifier, store)
+            finally:
+                queue.done(district_url)
+    
+    # One classification stage (and API client) shared by every district
+    with ClassificationPipeline() as classifier, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for future in [executor.submit(worker, classifier) for _ in range(max_workers)]:
+            future.result()
+    # Report in district order so output matches a sequential run
+    return [outcomes.get(i, ([], False)) for i in range(1, len(school_districts) + 1)]
+
+def crawl_shard(queue, school_districts, shared_dir):
+    """SHARD_MODE: crawl districts leased from the shared work queue; the last worker out merges"""
+    run_id = queue.join(school_districts)
+    store = ResultsStore.open_shard(run_id, queue.worker_id, school_districts)
+    metrics = get_metrics()
+    metrics.run_id = run_id
+    metrics.worker_id = queue.worker_id
+    max_workers = get_max_concurrency()
+    logger.info(f"🧩 Worker {queue.worker_id} joined run {run_id} "
+                f"({queue.outstanding(run_id)} of {len(school_districts)} districts outstanding)")
+    
+    def worker(classifier):
+        while True:
+            district_url = queue.claim(run_id)
+            if district_url is None:
+                return
+            _, succeeded = crawl_district(district_url, f"[{queue.worker_id}]", classifier, store)
+            queue.complete(run_id, district_url, succeeded)
+    
+    # Leases are renewed for as long as this worker is crawling
+    with queue.heartbeats(run_id), ClassificationPipeline() as classifier, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for future in [executor.submit(worker, classifier) for _ in range(max_workers)]:
+            future.result()
+    
+    documents = get_document_stage()
+    if documents:
+        documents.close()
+    # The merging worker adds these up; timings are rebuilt from the summed histograms
+    stats = get_run_stats()
+    stats.pop('timings')
+    store.record_stats(f"{os.getpid()}@{metrics.started_at}", stats, metrics.snapshot())
+    store.close()
+    metrics.save()
+    logger.info(f"🧩 Worker {queue.worker_id}: {queue.stats['completed']} districts crawled, "
+                f"{queue.stats['reclaimed']} reclaimed from expired leases, {queue.stats['lost']} lost")
+    
+    if not queue.claim_merge(run_id):
+        logger.info(f"🧩 {queue.outstanding(run_id)} district(s) still being crawled; the last worker will merge")
+        queue.close()
+        return 0
+    
+    leases = queue.districts(run_id)
+    merged = merge_shards(run_id, leases)
+    try:
+        save_results(merged, shared_dir, {
+            **merged.run_stats,
+            'shards': {
+                'workers': sorted({lease['worker'] for lease in leases if lease['worker']}),
+                'failed_districts': [lease['district'] for lease in leases if lease['state'] == 'failed']
+            }
+        })
+    except Exception as e:
+        logger.error(f"❌ Error saving merged results: {e}")
+        merged.close()
+        queue.close()
+        return 1
+    merged.finish()
+    queue.mark_merged(run_id)
+    queue.prune(get_store_settings()['keep_runs'])
+    queue.close()
+    remove_shards(run_id)
+    merged.run_metrics.append_history()
+    logger.info(f"🧩 Run {run_id} merged: {merged.aggregates.total_pages} pages, "
+                f"{len(merged.aggregates.rfp_results)} RFPs")
+    return 0
+
+def get_run_stats():
+    """Counters from this run's supporting stages, recorded in the results metadata"""
+    stats = {}
+    cache = get_classification_cache()
+    if cache:
+        stats['classification_cache'] = dict(cache.stats)
+    state = get_crawl_state()
+    if state:
+        stats['incremental'] = dict(state.stats)
+    prefilter = get_prefilter()
+    if prefilter:
+        stats['prefilter'] = {**prefilter.stats, 'mode': prefilter.mode, 'threshold': prefilter.threshold}
+    stats['fetch_tiers'] = dict(get_fetcher().stats)
+    stats['resource_blocking'] = RESOURCE_BLOCKING.as_dict()
+    stats['politeness'] = get_scheduler().summary()
+    stats['circuit_breakers'] = get_breakers().summary()
+    documents = get_document_stage()
+    if documents:
+        stats['documents'] = dict(documents.stats)
+    stats['prompts'] = PROMPT_TOTALS.as_dict()
+    metrics = get_metrics()
+    stats['timings'] = {'stages': metrics.stage_summary(), 'claude': metrics.api_summary()}
+    return stats
+
+def count_categories(rfps):
     categories = {}
-    for rfp in rfp_results:
+    for rfp in rfps:
         category = rfp.get('category', 'Other')
         categories[category] = categories.get(category, 0) + 1
+    return categories
+
+def save_results(store, shared_dir, extra_metadata=None):
+    """Write the summary files for the dashboard from the run's results store"""
+    timestamp = datetime.now().isoformat()
+    aggregates = store.aggregates
     
-    # Main results file (detailed)
-    detailed_results = {
-        'metadata': {
-            'crawl_timestamp': timestamp,
-            'total_districts_crawled': len(get_school_districts()),
-            'total_pages_crawled': total_pages,
-            'total_rfps_found': len(rfp_results),
-            'categories': categories,
-            'version': 'mvp-1.0'
-        },
-        'rfp_summary': rfp_results,
-        'raw_results': all_results
-    }
+    # History across runs for the dashboard's /api/rfps; also what dedup matches against
+    try:
+        index = RfpIndex()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not open RFP index: {e}")
+        index = None
+    
+    # One record per solicitation, however many pages or runs it appeared on
+    rfp_results, dedup_stats = dedup_rfps(aggregates.rfp_results, store.run_id, index)
+    categories = count_categories(rfp_results)
     
-    # Save detailed results
+    # Main results file (detailed); raw_results are streamed from the run log
+    metadata = {
+        'crawl_timestamp': timestamp,
+        'total_districts_crawled': len(get_school_districts()),
+        'total_pages_crawled': aggregates.total_pages,
+        'total_pages_unclassified': aggregates.total_unclassified,
+        'total_rfps_found': len(rfp_results),
+        'categories': categories,
+        'version': 'mvp-1.0',
+        'run_id': store.run_id,
+        'resumed': store.resumed,
+        **get_run_stats(),
+        **(extra_metadata or {})
+    }
+    if dedup_stats:
+        metadata['dedup'] = dedup_stats
     results_file = os.path.join(shared_dir, 'rfp_scan_results.json')
-    with open(results_file, 'w') as f:
-        json.dump(detailed_results, f, indent=2, default=str)
+    store.write_results(results_file, metadata, rfp_results)
     
     # Save simple summary for dashboard
     dashboard_summary = {
         'timestamp': timestamp,
         'total_rfps': len(rfp_results),
-        'total_pages': total_pages,
+        'total_pages': aggregates.total_pages,
         'categories': categories,
         'active_rfps': rfp_results
     }
+    if dedup_stats:
+        dashboard_summary['changes'] = {status: dedup_stats[status] for status in ('new', 'changed', 'unchanged')}
     
     summary_file = os.path.join(shared_dir, 'dashboard_summary.json')
-    with open(summary_file, 'w') as f:
-        json.dump(dashboard_summary, f, indent=2, default=str)
+    write_json_atomic(summary_file, dashboard_summary, indent=2, default=str)
     
     logger.info(f"✅ Results saved to {results_file}")
     logger.info(f"✅ Dashboard summary saved to {summary_file}")
     
+    if index is not None:
+        try:
+            # A district that failed or stopped early keeps its unseen RFPs active
+            indexed = index.record_run(store.run_id, timestamp, rfp_results, aggregates.total_pages,
+                                       completed_districts=store.fully_crawled())
+            logger.info(f"✅ Indexed {indexed} RFPs in {get_index_path()}")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not update RFP index: {e}")
+    
     return results_file, summary_file
 
 def main():
@@ -157,51 +380,46 @@ def main():
     school_districts = get_school_districts()
     logger.info(f"🎯 Will crawl {len(school_districts)} districts")
     
-    all_results = []
-    successful_crawls = 0
+    # SHARD_MODE: several workers split the districts through a lease queue in SHARED_DIR
+    queue = get_work_queue()
+    if queue:
+        return crawl_shard(queue, school_districts, shared_dir)
+    
+    # Pages are appended to the run log as they finish; an interrupted run picks up where it stopped
+    store = ResultsStore.open_run(school_districts)
+    metrics = get_metrics()
+    metrics.run_id = store.run_id
+    remaining = store.pending(school_districts)
+    successful_crawls = len(school_districts) - len(remaining)
     failed_crawls = 0
     
-    # Crawl each school district
-    for i, district_url in enumerate(school_districts, 1):
-        logger.info(f"\n🕷️ [{i}/{len(school_districts)}] Starting crawl: {district_url}")
-        
-        try:
-            # Use your existing crawler with reasonable limits for MVP
-            results = crawl_site_with_playwright(
-                start_url=district_url,
-                max_depth=int(os.getenv('CRAWLER_MAX_DEPTH', '2')),
-                max_pages=int(os.getenv('CRAWLER_MAX_PAGES', '15'))
-            )
-            
-            if results:
-                logger.info(f"✅ Completed {district_url}: {len(results)} pages crawled")
-                all_results.extend(results)
-                successful_crawls += 1
-                
-                # Quick RFP count
-                rfp_count = sum(1 for r in results 
-                               if '"is_rfp": true' in r.get('claude_result', '').lower())
-                if rfp_count > 0:
-                    logger.info(f"  🎯 Found {rfp_count} potential RFPs!")
-            else:
-                logger.warning(f"⚠️ No results from {district_url}")
-                failed_crawls += 1
-                
-        except Exception as e:
-            logger.error(f"❌ Error crawling {district_url}: {e}")
+    # Crawl districts concurrently (CRAWL_ENGINE=async shares one browser)
+    if not remaining:
+        district_outcomes = []
+    elif os.getenv('CRAWL_ENGINE', 'sync').lower() == 'async':
+        district_outcomes = crawl_districts_async(remaining, store)
+    else:
+        district_outcomes = crawl_districts_threaded(remaining, store)
+    
+    # Every crawl has collected its documents by now
+    documents = get_document_stage()
+    if documents:
+        documents.close()
+    
+    for results, succeeded in district_outcomes:
+        if succeeded:
+            successful_crawls += 1
+        else:
             failed_crawls += 1
-            continue
-        
-        # Brief pause between districts
-        if i < len(school_districts):
-            time.sleep(int(os.getenv('CRAWL_DELAY', '2')))
     
     # Save all results
-    if all_results:
+    total_pages = store.aggregates.total_pages
+    if total_pages:
         try:
-            save_results(all_results, shared_dir)
+            save_results(store, shared_dir)
         except Exception as e:
             logger.error(f"❌ Error saving results: {e}")
+            store.close()
             return 1
     else:
         logger.warning("⚠️ No results to save")
@@ -220,13 +438,14 @@ def main():
         }
         
         results_file = os.path.join(shared_dir, 'rfp_scan_results.json')
-        with open(results_file, 'w') as f:
-            json.dump(empty_results, f, indent=2)
+        write_json_atomic(results_file, empty_results, indent=2)
+    store.finish()
+    metrics.save()
+    metrics.append_history()
     
     # Final summary
     execution_time = round(time.time() - start_time, 2)
-    total_rfps = sum(1 for r in all_results 
-                    if '"is_rfp": true' in r.get('claude_result', '').lower())
+    total_rfps = len(store.aggregates.rfp_results)
     
     logger.info("\n" + "="*50)
     logger.info("📊 CRAWL SUMMARY")
@@ -235,16 +454,54 @@ def main():
     logger.info(f"🎯 Districts attempted: {len(school_districts)}")
     logger.info(f"✅ Successful crawls: {successful_crawls}")
     logger.info(f"❌ Failed crawls: {failed_crawls}")
-    logger.info(f"📄 Total pages crawled: {len(all_results)}")
+    logger.info(f"📄 Total pages crawled: {total_pages}")
     logger.info(f"🏆 RFPs found: {total_rfps}")
     
+    cache = get_classification_cache()
+    if cache:
+        lookups = cache.stats['hits'] + cache.stats['misses']
+        hit_rate = round(100 * cache.stats['hits'] / lookups, 1) if lookups else 0
+        logger.info(f"💾 Classification cache: {cache.stats['hits']} hits / "
+                    f"{cache.stats['misses']} misses ({hit_rate}% hit rate), "
+                    f"{cache.stats['evicted']} evicted")
+    
+    state = get_crawl_state()
+    if state:
+        logger.info(f"♻️ Incremental: {state.stats['unchanged']} unchanged pages reused, "
+                    f"{state.stats['changed']} changed")
+    
+    prefilter = get_prefilter()
+    if prefilter:
+        logger.info(f"🔎 Pre-filter ({prefilter.mode}): {prefilter.stats['avoided_calls']} Claude calls avoided, "
+                    f"{prefilter.stats['below_threshold']} of {prefilter.stats['screened']} pages below threshold")
+    
+    fetch_stats = get_fetcher().stats
+    logger.info(f"🌐 Fetch tiers: {fetch_stats['http']} plain HTTP, {fetch_stats['browser']} browser "
+                f"({fetch_stats['escalations']} escalated)")
+    logger.info(f"🚫 Resource blocking: {RESOURCE_BLOCKING.requests_saved} requests blocked, "
+                f"~{RESOURCE_BLOCKING.estimated_bytes_saved / 1_000_000:.1f} MB saved (estimated)")
+    
+    prompts = PROMPT_TOTALS.as_dict()
+    if prompts['pages']:
+        logger.info(f"✂️ Prompts: {prompts['excerpted']} of {prompts['pages']} pages excerpted, "
+                    f"~{prompts['sent_tokens']} of ~{prompts['source_tokens']} page tokens sent")
+    
+    metrics.log_summary()
+    get_scheduler().log_summary()
+    if documents and documents.stats['linked']:
+        logger.info(f"📄 Documents: {documents.stats['extracted']} read of {documents.stats['linked']} linked "
+                    f"({documents.stats['duplicates']} duplicates, {documents.stats['too_large']} over the size cap, "
+                    f"{documents.stats['no_text']} without text, {documents.stats['failed']} failed); "
+                    f"{documents.stats['disallowed']} disallowed by robots.txt")
+    for name, breaker in get_breakers().summary().items():
+        logger.info(f"⛔ Circuit {name}: tripped {breaker['trips']}x, refused {breaker['rejected']} requests, "
+                    f"now {breaker['state']}")
+    
     logger.info("\n📋 Breakdown by District:")
     for district_url in school_districts:
-        district_results = [r for r in all_results if district_url in r.get('url', '')]
-        if district_results:
-            district_rfps = sum(1 for r in district_results 
-                               if '"is_rfp": true' in r.get('claude_result', '').lower())
-            logger.info(f"   {district_url}: {district_rfps} RFPs / {len(district_results)} pages")
+        district_pages = store.district_pages(district_url)
+        if district_pages:
+            logger.info(f"   {district_url}: {store.district_rfps(district_url)} RFPs / {district_pages} pages")
         else:
             logger.info(f"   {district_url}: No results")
     
@@ -0,0 +1,9 @@
+import pytest
+
+@pytest.fixture(autouse=True)
+def shared_dir(tmp_path, monkeypatch):
+    """Keep every test's state files, caches and indexes out of the real SHARED_DIR"""
+    monkeypatch.setenv('SHARED_DIR', str(tmp_path))
+    monkeypatch.setenv('CLASSIFY_CACHE', 'false')
+    monkeypatch.setenv('PAGE_DELAY', '0')
+    return tmp_path
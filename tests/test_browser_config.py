@@ -0,0 +1,18 @@
+from crawler.browser_config import ResourceBlockStats, blocked_kind, get_browser_settings, routing_needed
+
+def settings(**flags):
+    return {**get_browser_settings(), **flags}
+
+def test_blocking_trackers_keeps_routing_with_the_cache_on():
+    assert routing_needed(settings(block_resources=True, enable_cache=True, disable_images=False))
+    assert blocked_kind('script', 'https://www.google-analytics.com/analytics.js', settings(block_resources=True))
+    # Images alone are switched off at the renderer, so the cache can stay on
+    assert not routing_needed(settings(block_resources=False, enable_cache=True, disable_images=True))
+    assert routing_needed(settings(block_resources=False, enable_cache=False, disable_images=True))
+
+def test_bytes_saved_are_reported_as_an_estimate():
+    stats = ResourceBlockStats()
+    stats.record('media')
+    stats.record(None)
+    assert stats.as_dict() == {'requests_blocked': 1, 'requests_allowed': 1, 'blocked_by_type': {'media': 1},
+                               'estimated_bytes_saved': 500_000}
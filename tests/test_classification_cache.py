@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from crawler.classification_cache import ClassificationCache, cache_key
+
+RESULT = '{"is_rfp": true, "category": "Technology"}'
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ClassificationCache(str(tmp_path / 'classification_cache.db'), max_entries=3, max_age_days=1)
+    yield cache
+    cache.close()
+
+def test_hit_and_miss(cache):
+    key = cache_key("Request for Proposals: network cabling", 'v1', 'model')
+    assert cache.get(key) is None
+    cache.put(key, RESULT, 'https://district.org/bids')
+    assert cache.get(key) == RESULT
+    assert cache.stats == {'hits': 1, 'misses': 1, 'stores': 1, 'evicted': 0}
+
+def test_key_ignores_whitespace_and_case_but_not_prompt_or_model():
+    key = cache_key("Request for  Proposals\n", 'v1', 'model')
+    assert cache_key("request for proposals", 'v1', 'model') == key
+    assert cache_key("request for proposals", 'v2', 'model') != key
+    assert cache_key("request for proposals", 'v1', 'other-model') != key
+
+def test_expired_entries_miss_and_are_evicted(cache):
+    cache.put('old', RESULT)
+    cache._conn.execute("UPDATE classifications SET created_at = ?", (time.time() - 2 * 86400,))
+    assert cache.get('old') is None
+    assert cache.evict() == 1
+    assert cache.stats['evicted'] == 1
+
+def test_least_recently_used_are_evicted_beyond_max_entries(cache):
+    for n in range(4):
+        cache.put(f'key-{n}', RESULT)
+        cache._conn.execute("UPDATE classifications SET last_used = ? WHERE key = ?", (n, f'key-{n}'))
+    # Reading key-0 makes it the most recently used
+    assert cache.get('key-0') == RESULT
+    assert cache.evict() == 1
+    assert cache.get('key-1') is None
+    assert all(cache.get(f'key-{n}') == RESULT for n in (0, 2, 3))
@@ -0,0 +1,110 @@
+import json
+import sqlite3
+
+import anthropic
+import pytest
+
+from crawler.classifier import ClassificationPipeline
+from crawler.crawl_with_playwright import is_error_result
+from crawler.resilience import CircuitBreaker
+from crawler.stub_anthropic import StubAnthropicServer
+
+RFP_PAGE = "Request for Proposals: district-wide network cabling. Sealed bids due May 1."
+OTHER_PAGE = "Lunch menu for the week of May 1: pizza, tacos and salad."
+
+@pytest.fixture
+def make_stub():
+    servers = []
+
+    def make(**options):
+        server = StubAnthropicServer(('127.0.0.1', 0), **options).start_background()
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.shutdown()
+
+@pytest.fixture
+def make_pipeline(monkeypatch):
+    monkeypatch.setenv('CLASSIFY_BATCH_WAIT', '0.2')
+    monkeypatch.setenv('CLASSIFY_MAX_RETRIES', '4')
+    monkeypatch.setenv('CLASSIFY_REQUEUES', '2')
+
+    def make(stub, **options):
+        client = anthropic.Anthropic(api_key='sk-ant-test', base_url=stub.base_url, max_retries=0)
+        pipeline = ClassificationPipeline(client=client, **options)
+        # A breaker of its own, so an outage test can't trip the process-wide one
+        pipeline.breaker = CircuitBreaker('api', 100, 60)
+        return pipeline
+
+    return make
+
+def is_rfp(claude_result):
+    return json.loads(claude_result)['is_rfp']
+
+def test_pages_are_batched_into_one_call(make_stub, make_pipeline):
+    stub = make_stub()
+    with make_pipeline(stub, workers=1, batch_size=4) as pipeline:
+        futures = [pipeline.submit(text, f"https://district.org/{i}")
+                   for i, text in enumerate([RFP_PAGE, OTHER_PAGE, RFP_PAGE, OTHER_PAGE])]
+        results = [future.result(timeout=10) for future in futures]
+    assert [is_rfp(result) for result in results] == [True, False, True, False]
+    assert stub.calls == 1
+    assert pipeline.stats['api_calls'] == 1
+
+def test_rate_limited_calls_back_off_and_retry(make_stub, make_pipeline):
+    stub = make_stub(rate_limit_every=2)
+    with make_pipeline(stub, workers=2, batch_size=1) as pipeline:
+        futures = [pipeline.submit(f"{RFP_PAGE} #{i}", f"https://district.org/{i}") for i in range(4)]
+        results = [future.result(timeout=30) for future in futures]
+    assert all(is_rfp(result) for result in results)
+    assert pipeline.stats['rate_limited'] >= 1
+    assert stub.requests > stub.calls == 4
+
+def test_failed_pages_are_requeued_until_the_api_answers(make_stub, make_pipeline, monkeypatch):
+    monkeypatch.setenv('CLASSIFY_MAX_RETRIES', '0')
+    stub = make_stub(fail_first=2)
+    with make_pipeline(stub, workers=1, batch_size=1) as pipeline:
+        result = pipeline.submit(RFP_PAGE, 'https://district.org/bids').result(timeout=10)
+    assert is_rfp(result)
+    assert pipeline.stats['requeued'] == 2
+    assert pipeline.stats['errors'] == 0
+
+def test_pages_that_run_out_of_requeues_still_resolve(make_stub, make_pipeline, monkeypatch):
+    monkeypatch.setenv('CLASSIFY_MAX_RETRIES', '0')
+    stub = make_stub(fail_first=100)
+    with make_pipeline(stub, workers=1, batch_size=1) as pipeline:
+        result = pipeline.submit(RFP_PAGE, 'https://district.org/bids').result(timeout=10)
+    assert is_error_result(result)
+    assert pipeline.stats['requeued'] == 2
+    assert pipeline.stats['errors'] == 1
+
+def test_cache_write_errors_do_not_lose_the_result(make_stub, make_pipeline):
+    class BrokenCache:
+        def get(self, key):
+            return None
+
+        def put(self, key, claude_result, url=None):
+            raise sqlite3.OperationalError("database is locked")
+
+    stub = make_stub()
+    pipeline = make_pipeline(stub, workers=1, batch_size=1)
+    pipeline._cache = BrokenCache()
+    with pipeline:
+        assert is_rfp(pipeline.submit(RFP_PAGE, 'https://district.org/bids').result(timeout=10))
+
+def test_a_failing_worker_still_resolves_its_batch(make_stub, make_pipeline, monkeypatch):
+    monkeypatch.setenv('CLASSIFY_MAX_RETRIES', '0')
+    stub = make_stub(fail_first=100)
+    pipeline = make_pipeline(stub, workers=1, batch_size=2)
+
+    def broken(batch, error):
+        raise RuntimeError("requeue went wrong")
+    pipeline._requeue_or_fail = broken
+    with pipeline:
+        futures = [pipeline.submit(text, f"https://district.org/{i}") for i, text in enumerate([RFP_PAGE, OTHER_PAGE])]
+        results = [future.result(timeout=10) for future in futures]
+        # The worker survived and keeps serving the queue
+        assert is_error_result(pipeline.submit(RFP_PAGE, 'https://district.org/next').result(timeout=10))
+    assert all(is_error_result(result) for result in results)
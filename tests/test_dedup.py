@@ -0,0 +1,85 @@
+import pytest
+
+from crawler.dedup import dedup_rfps
+from crawler.rfp_store import RfpIndex, band_values
+
+BASE = 0x0123456789ABCDEF
+
+@pytest.fixture
+def index(tmp_path):
+    return RfpIndex(str(tmp_path / 'rfp_index.db'))
+
+def rfp(n, simhash=None):
+    return {'url': f'https://district.org/bids/{n}', 'district': 'https://district.org', 'title': f'Bid {n}',
+            'simhash': f'{simhash:016x}' if simhash is not None else None}
+
+def bid(url, district='https://district.org', **fields):
+    return {'url': url, 'district': district, 'title': 'Request for Proposals: Network Cabling Upgrade',
+            'summary': 'Seeking vendors to replace network cabling in all buildings',
+            'category': 'Technology', 'deadline': 'March 15, 2026', 'contact_email': 'purchasing@district.org',
+            'depth': url.count('/') - 2, **fields}
+
+def flip(value, *bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+def test_close_fingerprints_share_a_band():
+    # Three flipped bits touch at most three of the four bands
+    near = flip(BASE, 0, 20, 40)
+    assert any(a == b for a, b in zip(band_values(BASE), band_values(near)))
+    far = flip(BASE, 0, 20, 40, 60)
+    assert not any(a == b for a, b in zip(band_values(BASE), band_values(far)))
+
+def test_candidates_found_by_band(index):
+    index.record_run('r1', '2026-01-01T00:00:00', [rfp(1, BASE)])
+    near = list(enumerate(band_values(flip(BASE, 0, 20, 40))))
+    far = list(enumerate(band_values(flip(BASE, 0, 20, 40, 60))))
+    assert [row['url'] for row in index.candidates(bands=near)] == ['https://district.org/bids/1']
+    assert index.candidates(bands=far) == []
+    # Stored signed, handed back unsigned
+    high = flip(BASE, 63)
+    index.record_run('r2', '2026-01-02T00:00:00', [rfp(2, high)])
+    rows = {row['url']: row for row in index.candidates(bands=list(enumerate(band_values(high))))}
+    assert rows['https://district.org/bids/2']['simhash'] == high
+
+def test_copies_in_one_district_merge():
+    merged, stats = dedup_rfps([
+        bid('https://district.org/bids/cabling'),
+        bid('https://district.org/news/2026/cabling-rfp', budget_range='$50,000 - $75,000',
+            title='RFP: Network Cabling Upgrade')
+    ], 'r1')
+    assert len(merged) == 1
+    # The shallowest page is kept, with gaps filled from the copy
+    assert merged[0]['url'] == 'https://district.org/bids/cabling'
+    assert merged[0]['aliases'] == ['https://district.org/news/2026/cabling-rfp']
+    assert merged[0]['budget_range'] == '$50,000 - $75,000'
+    assert stats == {'pages': 2, 'rfps': 1, 'new': 1, 'changed': 0, 'unchanged': 0}
+
+def test_same_wording_in_another_district_is_another_rfp(index):
+    merged, _ = dedup_rfps([
+        bid('https://district.org/bids/cabling'),
+        bid('https://other.org/bids/cabling', district='https://other.org')
+    ], 'r1', index)
+    assert sorted(rfp['district'] for rfp in merged) == ['https://district.org', 'https://other.org']
+    index.record_run('r1', '2026-01-01T00:00:00', [merged[0]])
+    # Nor does history from one district claim another district's bid
+    merged, _ = dedup_rfps([bid('https://other.org/bids/cabling', district='https://other.org')], 'r2', index)
+    assert merged[0]['status'] == 'new'
+
+def test_status_against_previous_runs(index):
+    merged, _ = dedup_rfps([bid('https://district.org/bids/cabling')], 'r1', index)
+    assert merged[0]['status'] == 'new'
+    index.record_run('r1', '2026-01-01T00:00:00', merged)
+
+    merged, _ = dedup_rfps([bid('https://district.org/bids/cabling', title='Network Cabling Upgrade RFP')],
+                           'r2', index)
+    assert merged[0]['status'] == 'unchanged'
+    index.record_run('r2', '2026-01-02T00:00:00', merged)
+
+    merged, _ = dedup_rfps([bid('https://district.org/bids/cabling', budget_range='$50,000')], 'r3', index)
+    assert merged[0]['status'] == 'changed'
+    # Saving the same run again keeps its status
+    index.record_run('r3', '2026-01-03T00:00:00', merged)
+    merged, _ = dedup_rfps([bid('https://district.org/bids/cabling', budget_range='$50,000')], 'r3', index)
+    assert merged[0]['status'] == 'changed'
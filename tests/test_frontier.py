@@ -0,0 +1,34 @@
+from crawler.frontier import Frontier
+
+def drain(frontier):
+    urls = []
+    while frontier:
+        urls.append(frontier.pop()[0])
+    return urls
+
+def test_procurement_links_come_first():
+    frontier = Frontier('https://district.org/')
+    frontier.push('https://district.org/athletics', 1)
+    frontier.push('https://district.org/purchasing/bids', 1)
+    frontier.push('https://district.org/calendar', 1)
+    assert drain(frontier)[0] == 'https://district.org/purchasing/bids'
+
+def test_deeper_links_lose_to_equal_shallower_ones():
+    frontier = Frontier('https://district.org/')
+    frontier.push('https://district.org/about', 2)
+    frontier.push('https://district.org/staff', 1)
+    assert drain(frontier) == ['https://district.org/staff', 'https://district.org/about']
+
+def test_ties_keep_discovery_order():
+    frontier = Frontier('https://district.org/')
+    for path in ('a', 'b', 'c'):
+        frontier.push(f'https://district.org/{path}', 1)
+    assert drain(frontier) == ['https://district.org/a', 'https://district.org/b', 'https://district.org/c']
+
+def test_duplicates_offsite_and_disallowed_links_are_skipped():
+    frontier = Frontier('https://district.org/', allowed=lambda url: '/private' not in url)
+    assert frontier.push('https://district.org/page', 1)
+    assert not frontier.push('https://district.org/page', 1)
+    assert not frontier.push('https://elsewhere.org/bids', 1)
+    assert not frontier.push('https://district.org/private/bids', 1)
+    assert len(frontier) == 1
@@ -0,0 +1,99 @@
+import json
+import time
+import random
+import threading
+
+import main_crawler
+from main_crawler import DistrictQueue
+from crawler.politeness import host_of
+
+DISTRICTS = [
+    'https://www.boone.kyschools.us',
+    'https://www.carroll.kyschools.us',
+    'https://www.boone.kyschools.us/district',
+    'https://www.grant.kyschools.us',
+    'https://www.carroll.kyschools.us/schools'
+]
+
+class ReadyScheduler:
+    def ready_in(self, url):
+        return 0
+
+def test_district_queue_never_hands_out_a_busy_host():
+    queue = DistrictQueue(DISTRICTS * 4, ReadyScheduler())
+    active = {}
+    clashes = []
+    lock = threading.Lock()
+    crawled = []
+
+    def worker():
+        while True:
+            item = queue.take()
+            if item is None:
+                return
+            host = host_of(item[1])
+            with lock:
+                if active.get(host):
+                    clashes.append(item)
+                active[host] = True
+                crawled.append(item[0])
+            time.sleep(random.uniform(0, 0.005))
+            with lock:
+                active[host] = False
+            queue.done(item[1])
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert clashes == []
+    assert sorted(crawled) == list(range(1, len(DISTRICTS) * 4 + 1))
+
+def test_district_queue_skips_to_another_host():
+    queue = DistrictQueue(DISTRICTS[:3], ReadyScheduler())
+    assert queue.take() == (1, DISTRICTS[0])
+    # The second boone district waits while the first is being crawled
+    assert queue.take() == (2, DISTRICTS[1])
+    queue.done(DISTRICTS[0])
+    assert queue.take() == (3, DISTRICTS[2])
+    queue.done(DISTRICTS[1])
+    queue.done(DISTRICTS[2])
+    assert queue.take() is None
+
+def fake_crawl(start_url, max_depth=2, max_pages=20, classifier=None, on_result=None, on_stopped=None):
+    """Pages classified on other threads in a random order, like the classification pipeline"""
+    results = []
+    threads = []
+    for n in range(4):
+        result = {'url': f'{start_url}/page/{n}', 'title': f'Page {n}', 'crawl_timestamp': '2026-01-01T00:00:00',
+                  'claude_result': json.dumps({'is_rfp': n % 2 == 0, 'category': 'Technology',
+                                               'title': f'{start_url} bid {n}'})}
+        results.append(result)
+        delay = random.uniform(0, 0.02)
+        thread = threading.Thread(target=lambda result=result, n=n, delay=delay: (
+            time.sleep(delay), on_result(result, [0, n])))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return results
+
+def run_crawler(tmp_path, monkeypatch, name, concurrency):
+    shared_dir = tmp_path / name
+    monkeypatch.setenv('SHARED_DIR', str(shared_dir))
+    monkeypatch.setenv('MAX_CONCURRENT_PAGES', str(concurrency))
+    assert main_crawler.main() == 0
+    with open(shared_dir / 'rfp_scan_results.json') as f:
+        output = json.load(f)
+    return output['rfp_summary'], output['raw_results']
+
+def test_threaded_run_matches_a_sequential_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(main_crawler, 'crawl_site_with_playwright', fake_crawl)
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test-key')
+    monkeypatch.setenv('SCHOOL_DISTRICTS', ','.join(DISTRICTS))
+    monkeypatch.setenv('RESUME_RUNS', 'false')
+    sequential = run_crawler(tmp_path, monkeypatch, 'sequential', 1)
+    threaded = run_crawler(tmp_path, monkeypatch, 'threaded', 4)
+    assert threaded == sequential
+    assert [result['url'] for result in sequential[1]][:2] == [f'{DISTRICTS[0]}/page/0', f'{DISTRICTS[0]}/page/1']
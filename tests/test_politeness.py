@@ -0,0 +1,87 @@
+import time
+import asyncio
+import threading
+
+import pytest
+import requests
+
+from crawler.politeness import PolitenessScheduler, get_page_delay, get_politeness_settings
+
+URL = 'https://district.org/bids'
+
+@pytest.fixture
+def scheduler():
+    return PolitenessScheduler({**get_politeness_settings(), 'adaptive': True, 'initial_delay': 0.0,
+                                'min_delay': 0.0, 'max_delay': 30.0, 'delay_step': 0.1, 'backoff': 2.0,
+                                'max_concurrency': 4, 'slow_seconds': 5.0})
+
+def host(scheduler):
+    return scheduler.hosts['district.org']
+
+def test_healthy_responses_raise_concurrency(scheduler):
+    for _ in range(3):
+        with scheduler.slot(URL) as slot:
+            slot.record(200)
+    assert host(scheduler).concurrency > 1
+    assert host(scheduler).delay == 0.0
+
+def test_429_backs_off_and_honours_retry_after(scheduler):
+    for _ in range(3):
+        with scheduler.slot(URL) as slot:
+            slot.record(200)
+    with scheduler.slot(URL) as slot:
+        slot.record(429, {'Retry-After': '3'})
+    state = host(scheduler)
+    assert state.throttled == 1
+    assert state.concurrency == 1.0
+    # From zero, the first back-off goes to one second
+    assert state.delay == 1.0
+    assert 2.5 < scheduler.ready_in(URL) <= 3.0
+    granted, wait = scheduler.try_acquire(URL)
+    assert not granted and wait > 2.5
+
+def test_repeated_429s_double_the_delay(scheduler):
+    for _ in range(3):
+        scheduler.try_acquire(URL)
+        scheduler.release(URL, 0.1, status=429, headers={'Retry-After': '0'})
+    assert host(scheduler).delay == 4.0
+
+def test_http_error_raised_in_the_slot_counts_as_throttled(scheduler):
+    response = requests.Response()
+    response.status_code = 503
+    with pytest.raises(requests.HTTPError):
+        with scheduler.slot(URL):
+            raise requests.HTTPError(response=response)
+    assert host(scheduler).throttled == 1
+    assert host(scheduler).in_flight == 0
+
+def test_crawl_delay_is_a_floor(scheduler):
+    scheduler.set_crawl_delay(URL, 2)
+    for _ in range(3):
+        scheduler.try_acquire(URL)
+        scheduler.release(URL, 0.1, status=200)
+    assert host(scheduler).delay == 2.0
+    assert host(scheduler).concurrency == 1.0
+
+def test_crawl_delay_is_no_longer_a_page_delay(monkeypatch):
+    monkeypatch.delenv('PAGE_DELAY', raising=False)
+    monkeypatch.setenv('CRAWL_DELAY', '2')
+    assert get_page_delay() == 1.0
+    monkeypatch.setenv('PAGE_DELAY', '0.5')
+    assert get_page_delay() == 0.5
+
+def test_async_waiter_wakes_on_a_release_from_another_thread(scheduler):
+    scheduler.try_acquire(URL)
+    # One slot and no delay: the waiter needs the release, not a timer
+    assert scheduler.try_acquire(URL) == (False, None)
+
+    async def wait_for_slot():
+        started = time.monotonic()
+        await scheduler.acquire_async(URL)
+        return time.monotonic() - started
+
+    threading.Timer(0.2, lambda: scheduler.release(URL, 0.1)).start()
+    waited = asyncio.run(asyncio.wait_for(wait_for_slot(), timeout=5))
+    assert 0.15 < waited < 1.0
+    assert host(scheduler).in_flight == 1
+    assert scheduler._async_waiters == set()
@@ -0,0 +1,28 @@
+import json
+
+from crawler.crawl_with_playwright import error_result
+from crawler.prefilter import extract_features, labeled_examples
+
+def classified(url, is_rfp, features=None, **claude_fields):
+    result = {'url': url, 'title': 'Bids', 'claude_result': json.dumps({'is_rfp': is_rfp, **claude_fields})}
+    if features is not None:
+        result['prefilter'] = {'score': 1.0, 'features': features, 'skipped': False}
+    return result
+
+def test_only_pages_with_stored_features_are_labeled(tmp_path):
+    features = extract_features("Request for proposals: network cabling. Sealed bids due March 15.")
+    raw_results = [
+        classified('https://district.org/bids', True, features),
+        classified('https://district.org/about', False, {}),
+        # From a run with PREFILTER=off: no text to score, so it can't be used
+        classified('https://district.org/old-bids', True),
+        {'url': 'https://district.org/error', 'prefilter': {'score': 1.0, 'features': features, 'skipped': False},
+         'claude_result': error_result('overloaded')},
+        {'url': 'https://district.org/news', 'prefilter': {'score': 0.1, 'features': {}, 'skipped': True},
+         'claude_result': json.dumps({'is_rfp': False, 'prefiltered': True})}
+    ]
+    path = tmp_path / 'rfp_scan_results.json'
+    path.write_text(json.dumps({'raw_results': raw_results}))
+    examples, skipped = labeled_examples([str(path)])
+    assert examples == [(features, True), ({}, False)]
+    assert skipped == 1
@@ -0,0 +1,26 @@
+from crawler.prompt_builder import CHARS_PER_TOKEN, GAP, get_prompt_settings, select_excerpt
+
+SETTINGS = {**get_prompt_settings(), 'window_chars': 200, 'head_chars': 100}
+
+def filler(words):
+    return ' '.join(['lorem'] * words)
+
+def test_short_text_is_sent_whole():
+    text = "Request for proposals: roofing replacement"
+    assert select_excerpt(text, 100, SETTINGS) == text
+
+def test_excerpt_keeps_opening_and_procurement_window():
+    text = (f"Springfield Schools {filler(400)} Request for Proposals for bus transportation, "
+            f"proposals due March 3 to purchasing@springfield.k12.us {filler(400)}")
+    excerpt = select_excerpt(text, 150, SETTINGS)
+    assert len(excerpt) <= 150 * CHARS_PER_TOKEN
+    assert excerpt.startswith("Springfield Schools")
+    assert GAP in excerpt
+    assert "purchasing@springfield.k12.us" in excerpt
+
+def test_no_procurement_terms_falls_back_to_opening():
+    text = f"Welcome {filler(1000)}"
+    excerpt = select_excerpt(text, 100, SETTINGS)
+    assert GAP not in excerpt
+    assert text.startswith(excerpt)
+    assert len(excerpt) <= 100 * CHARS_PER_TOKEN
@@ -0,0 +1,33 @@
+import json
+
+from crawler.crawl_with_playwright import error_result
+from crawler.records import CrawlRecord, parse_classification
+
+def test_dict_result():
+    fields, is_rfp = parse_classification({'is_rfp': True, 'category': 'Technology'})
+    assert fields['category'] == 'Technology'
+    assert is_rfp is True
+
+def test_json_string_with_string_flag():
+    fields, is_rfp = parse_classification(json.dumps({'is_rfp': 'True', 'summary': 'Bus RFP'}))
+    assert fields['summary'] == 'Bus RFP'
+    assert is_rfp is True
+
+def test_truthy_non_boolean_is_not_an_rfp():
+    assert parse_classification({'is_rfp': 'yes'})[1] is False
+    assert parse_classification({'is_rfp': 1})[1] is False
+
+def test_unparseable_text_falls_back_to_pattern():
+    assert parse_classification('not json but "is_rfp": true') == (None, True)
+    assert parse_classification('no idea') == (None, False)
+
+def test_unclassified_and_non_object_results():
+    assert parse_classification(None) == (None, False)
+    assert parse_classification('[1, 2]') == (None, False)
+
+def test_failed_classification_is_unclassified_not_negative():
+    record = CrawlRecord.from_result({'url': 'https://district.org/bids', 'claude_result': error_result('overloaded')})
+    assert record.unclassified
+    assert not record.is_rfp and record.rfp_entry() is None
+    assert 'is_rfp' not in json.loads(error_result('overloaded'))
+    assert not CrawlRecord.from_result({'url': 'https://district.org/', 'claude_result': '{"is_rfp": false}'}).unclassified
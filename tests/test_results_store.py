@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import random
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from crawler.crawl_with_playwright import error_result, page_order, track_result
+from crawler.metrics import get_metrics
+from crawler.results_store import ResultsStore, get_store_settings, write_json_atomic
+
+DISTRICTS = ['https://a.org', 'https://b.org', 'https://c.org']
+
+@pytest.fixture
+def settings():
+    return get_store_settings()
+
+def page(district, n, is_rfp=False):
+    return {'url': f'{district}/page/{n}', 'title': f'Page {n}', 'crawl_timestamp': '2026-01-01T00:00:00',
+            'claude_result': json.dumps({'is_rfp': is_rfp, 'category': 'Technology'})}
+
+def crawl(store, events):
+    """Record (district, n, is_rfp) pages as they would land, with page n's crawl order"""
+    for district in DISTRICTS:
+        store.start_district(district)
+    for district, n, is_rfp in events:
+        store.add_page(district, page(district, n, is_rfp), [0, n])
+    for district in DISTRICTS:
+        store.finish_district(district, True)
+
+def pages(rfp_every=3):
+    return [(district, n, n % rfp_every == 0) for district in DISTRICTS for n in range(6)]
+
+def test_resume_an_interrupted_run(settings):
+    store = ResultsStore.open_run(DISTRICTS, settings)
+    store.start_district(DISTRICTS[0])
+    store.add_page(DISTRICTS[0], page(DISTRICTS[0], 0, True), [0, 0])
+    store.finish_district(DISTRICTS[0], True)
+    store.start_district(DISTRICTS[1])
+    store.add_page(DISTRICTS[1], page(DISTRICTS[1], 0), [0, 0])
+    store.close()
+    # A crash can leave a torn last line
+    with open(store.path, 'a') as f:
+        f.write('{"event": "page", "dist')
+
+    resumed = ResultsStore.open_run(DISTRICTS, settings)
+    assert resumed.resumed and resumed.run_id == store.run_id
+    assert resumed.pending(DISTRICTS) == DISTRICTS[1:]
+    assert resumed.aggregates.total_pages == 2
+    assert len(resumed.aggregates.rfp_results) == 1
+    resumed.add_page(DISTRICTS[1], page(DISTRICTS[1], 1), [0, 1])
+    assert [result['url'] for result in resumed.iter_results()] == [
+        'https://a.org/page/0', 'https://b.org/page/0', 'https://b.org/page/1']
+
+def test_finished_run_is_not_resumed(settings):
+    store = ResultsStore.open_run(DISTRICTS, settings)
+    store.finish()
+    assert ResultsStore.resumable(settings) is None
+
+def test_district_start_drops_earlier_pages(settings):
+    store = ResultsStore.open_run(DISTRICTS, settings)
+    store.start_district(DISTRICTS[0])
+    store.add_page(DISTRICTS[0], page(DISTRICTS[0], 0, True), [0, 0])
+    store.add_page(DISTRICTS[1], page(DISTRICTS[1], 0), [0, 0])
+    # Re-crawled from the start: the first attempt's pages no longer count
+    store.start_district(DISTRICTS[0])
+    store.add_page(DISTRICTS[0], page(DISTRICTS[0], 1), [0, 0])
+    assert store.district_pages(DISTRICTS[0]) == 1
+    assert store.district_rfps(DISTRICTS[0]) == 0
+    assert [result['url'] for result in store.iter_results()] == ['https://a.org/page/1', 'https://b.org/page/0']
+    store.close()
+
+    replayed = ResultsStore(store.path, None, None)
+    replayed.replay()
+    assert replayed.aggregates.total_pages == 2
+    assert [result['url'] for result in replayed.iter_results()] == ['https://a.org/page/1', 'https://b.org/page/0']
+
+def test_finishing_order_does_not_change_the_output(settings, tmp_path):
+    sequential = ResultsStore.create(str(tmp_path / 'run-1.jsonl'), '1', DISTRICTS)
+    crawl(sequential, pages())
+    # Districts crawled side by side, pages classified out of order
+    shuffled = pages()
+    random.Random(7).shuffle(shuffled)
+    concurrent = ResultsStore.create(str(tmp_path / 'run-2.jsonl'), '2', DISTRICTS)
+    crawl(concurrent, shuffled)
+
+    outputs = []
+    for store in (sequential, concurrent):
+        results_file = str(tmp_path / f'results-{store.run_id}.json')
+        store.write_results(results_file, {'run': 'metadata'})
+        with open(results_file) as f:
+            outputs.append(f.read())
+    assert outputs[0] == outputs[1]
+    assert [result['url'] for result in json.loads(outputs[0])['raw_results']][:3] == [
+        'https://a.org/page/0', 'https://a.org/page/1', 'https://a.org/page/2']
+
+def test_a_page_is_recorded_before_its_future_resolves(settings):
+    store = ResultsStore.open_run(DISTRICTS, settings)
+    classified = Future()
+    result = page(DISTRICTS[0], 0)
+    recorded = track_result(result, classified, get_metrics().page(result['url']), lambda result, order: (
+        time.sleep(0.2), store.add_page(DISTRICTS[0], result, order)), page_order(0))
+    threading.Thread(target=classified.set_result, args=(result.pop('claude_result'),)).start()
+    recorded.result(timeout=5)
+    assert store.district_pages(DISTRICTS[0]) == 1
+
+def test_concurrent_atomic_writes_never_collide(tmp_path):
+    path = str(tmp_path / 'rfp_summary.json')
+    threads = [threading.Thread(target=write_json_atomic, args=(path, {'writer': n, 'rfps': list(range(5000))}))
+               for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(path) as f:
+        assert json.load(f)['rfps'] == list(range(5000))
+    assert sorted(os.listdir(tmp_path)) == ['rfp_summary.json']
+
+def test_unclassified_pages_keep_the_district_incomplete(settings):
+    store = ResultsStore.open_run(DISTRICTS[:2], settings)
+    for district in DISTRICTS[:2]:
+        store.start_district(district)
+        store.add_page(district, page(district, 0, True), [0, 0])
+    failed = {'url': f'{DISTRICTS[1]}/page/1', 'claude_result': error_result('overloaded')}
+    store.add_page(DISTRICTS[1], failed, [0, 1])
+    for district in DISTRICTS[:2]:
+        store.finish_district(district, True)
+    assert store.district_pages(DISTRICTS[1]) == 2
+    assert store.district_rfps(DISTRICTS[1]) == 1
+    assert store.aggregates.total_unclassified == 1
+    # Its earlier RFPs may still be live, so a run doesn't retire them
+    assert store.fully_crawled() == [DISTRICTS[0]]
+    store.close()
+
+    replayed = ResultsStore(store.path, None, None)
+    replayed.replay()
+    assert replayed.fully_crawled() == [DISTRICTS[0]]
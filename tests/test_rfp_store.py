@@ -0,0 +1,40 @@
+import pytest
+
+from crawler.rfp_store import RfpIndex
+
+@pytest.fixture
+def index(tmp_path):
+    return RfpIndex(str(tmp_path / 'rfp_index.db'))
+
+def rfp(n, simhash=None):
+    return {'url': f'https://district.org/bids/{n}', 'district': 'https://district.org', 'title': f'Bid {n}',
+            'simhash': f'{simhash:016x}' if simhash is not None else None}
+
+def test_changes_since_returns_deltas(index):
+    index.record_run('r1', '2026-01-01T00:00:00', [rfp(1), rfp(2)])
+    version = index.version_range()[1]
+    index.record_run('r2', '2026-01-02T00:00:00', [rfp(1), rfp(3)])
+    changes = index.changes_since(version)
+    assert not changes['reset']
+    assert [row['url'] for row in changes['upserted']] == ['https://district.org/bids/3']
+    assert [row['url'] for row in changes['removed']] == ['https://district.org/bids/2']
+    assert index.changes_since(changes['version'])['upserted'] == []
+
+def test_changes_since_resets_when_ahead_of_the_index(index):
+    index.record_run('r1', '2026-01-01T00:00:00', [rfp(1)])
+    assert index.changes_since(index.version_range()[1] + 5)['reset']
+
+def test_changes_since_resets_when_behind_the_log(index, monkeypatch):
+    monkeypatch.setenv('RFP_CHANGES_KEEP', '100')
+    index.record_run('r1', '2026-01-01T00:00:00', [rfp(n) for n in range(150)])
+    oldest, latest = index.version_range()
+    assert oldest > 1
+    assert index.changes_since(0)['reset']
+    assert not index.changes_since(oldest - 1)['reset']
+
+def test_partial_run_keeps_unfinished_districts_active(index):
+    other = {'url': 'https://other.org/bids/9', 'district': 'https://other.org', 'title': 'Bid 9'}
+    index.record_run('r1', '2026-01-01T00:00:00', [rfp(1), other])
+    version = index.version_range()[1]
+    index.record_run('r2', '2026-01-02T00:00:00', [], completed_districts=['https://district.org'])
+    assert [row['url'] for row in index.changes_since(version)['removed']] == ['https://district.org/bids/1']
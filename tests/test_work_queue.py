@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import multiprocessing
+
+import pytest
+
+from crawler.work_queue import WorkQueue
+
+DISTRICTS = ['https://a.org', 'https://b.org']
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(worker_id, lease_seconds=60, max_attempts=3):
+        queue = WorkQueue({
+            'enabled': True,
+            'path': str(tmp_path / 'work_queue.db'),
+            'run_id': 'run-1',
+            'worker_id': worker_id,
+            'lease_seconds': lease_seconds,
+            'heartbeat_seconds': lease_seconds / 3,
+            'max_attempts': max_attempts,
+            'run_max_age_hours': 24
+        })
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+def test_workers_never_share_a_live_lease(make_queue):
+    first, second = make_queue('w1'), make_queue('w2')
+    run_id = first.join(DISTRICTS)
+    assert second.join(DISTRICTS) == run_id
+    assert first.claim(run_id) == 'https://a.org'
+    assert second.claim(run_id) == 'https://b.org'
+    assert first.claim(run_id) is None
+
+def test_expired_lease_is_reclaimed(make_queue):
+    crashed, survivor = make_queue('crashed', lease_seconds=0.05), make_queue('survivor')
+    run_id = crashed.join(DISTRICTS[:1])
+    assert crashed.claim(run_id) == 'https://a.org'
+    assert survivor.claim(run_id) is None
+    time.sleep(0.1)
+    assert survivor.claim(run_id) == 'https://a.org'
+    assert survivor.stats['reclaimed'] == 1
+    # The original holder finishing late loses to the new lease
+    assert not crashed.complete(run_id, 'https://a.org', True)
+    assert survivor.complete(run_id, 'https://a.org', True)
+    lease = survivor.districts(run_id)[0]
+    assert (lease['state'], lease['worker'], lease['attempts']) == ('done', 'survivor', 2)
+    assert survivor.claim_merge(run_id)
+
+def test_heartbeat_keeps_the_lease(make_queue):
+    holder, other = make_queue('holder', lease_seconds=0.2), make_queue('other')
+    run_id = holder.join(DISTRICTS[:1])
+    holder.claim(run_id)
+    time.sleep(0.12)
+    assert holder.heartbeat(run_id) == 1
+    time.sleep(0.12)
+    assert other.claim(run_id) is None
+
+def test_district_fails_after_max_attempts(make_queue):
+    queue = make_queue('w1', lease_seconds=0.05, max_attempts=1)
+    run_id = queue.join(DISTRICTS[:1])
+    queue.claim(run_id)
+    time.sleep(0.1)
+    assert queue.claim(run_id) is None
+    assert queue.districts(run_id)[0]['state'] == 'failed'
+    assert queue.outstanding(run_id) == 0
+
+SHARD_DISTRICTS = [f'https://district{n}.org' for n in range(6)]
+
+def shard_settings(shared_dir, worker_id, lease_seconds):
+    return {'enabled': True, 'path': os.path.join(shared_dir, 'work_queue.db'), 'run_id': 'run-1',
+            'worker_id': worker_id, 'lease_seconds': lease_seconds, 'heartbeat_seconds': lease_seconds / 3,
+            'max_attempts': 3, 'run_max_age_hours': 24}
+
+def crash_holding_a_lease(shared_dir):
+    """A worker that dies mid-crawl: its lease on the first district is never completed"""
+    queue = WorkQueue(shard_settings(shared_dir, 'crashed', 0.2))
+    queue.claim(queue.join(SHARD_DISTRICTS))
+    os._exit(1)
+
+def shard_worker(shared_dir, worker_id):
+    """main_crawler.main() in SHARD_MODE, crawling with a fake that logs who crawled what"""
+    import main_crawler
+    log = os.path.join(shared_dir, 'crawled.log')
+
+    def note(line):
+        with open(log, 'a') as f:
+            f.write(line + '\n')
+
+    def fake_crawl(start_url, max_depth=2, max_pages=20, classifier=None, on_result=None, on_stopped=None):
+        note(f'crawl {worker_id} {start_url}')
+        time.sleep(0.05)
+        result = {'url': f'{start_url}/bids', 'title': 'Bids', 'crawl_timestamp': '2026-01-01T00:00:00',
+                  'claude_result': json.dumps({'is_rfp': True, 'category': 'Technology', 'title': start_url})}
+        on_result(result, [0, 0])
+        return [result]
+
+    merge_shards = main_crawler.merge_shards
+
+    def noted_merge(*args, **kwargs):
+        note(f'merge {worker_id}')
+        return merge_shards(*args, **kwargs)
+
+    main_crawler.crawl_site_with_playwright = fake_crawl
+    main_crawler.merge_shards = noted_merge
+    main_crawler.get_work_queue = lambda: WorkQueue(shard_settings(shared_dir, worker_id, 10))
+    sys.exit(main_crawler.main())
+
+def test_worker_processes_share_one_shared_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test-key')
+    monkeypatch.setenv('SCHOOL_DISTRICTS', ','.join(SHARD_DISTRICTS))
+    context = multiprocessing.get_context('fork')
+    shared_dir = str(tmp_path)
+
+    crashed = context.Process(target=crash_holding_a_lease, args=(shared_dir,))
+    crashed.start()
+    crashed.join(timeout=30)
+    time.sleep(0.3)
+    workers = [context.Process(target=shard_worker, args=(shared_dir, f'w{n}')) for n in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+    assert [worker.exitcode for worker in workers] == [0, 0, 0]
+
+    with open(tmp_path / 'crawled.log') as f:
+        lines = [line.split() for line in f.read().splitlines()]
+    # The crashed worker's district was reclaimed; every district was crawled exactly once
+    assert sorted(line[2] for line in lines if line[0] == 'crawl') == SHARD_DISTRICTS
+    assert len([line for line in lines if line[0] == 'merge']) == 1
+
+    queue = WorkQueue(shard_settings(shared_dir, 'check', 10))
+    leases = queue.districts('run-1')
+    queue.close()
+    assert all(lease['state'] == 'done' for lease in leases)
+    assert leases[0]['attempts'] == 2
+    with open(tmp_path / 'rfp_scan_results.json') as f:
+        results = json.load(f)
+    assert [result['url'] for result in results['raw_results']] == [f'{district}/bids' for district in SHARD_DISTRICTS]